@@ -1,8 +1,16 @@
-from flask import Flask
+from flask import Flask, g, request
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
-from app.services.sensor_service import aggregate_old_data
+from app.services.sensor_service import aggregate_old_data, warm_latest_sensor_cache
+from app.services.ingest_service import start_ingest_buffer
+from app.services.feature_service import warm_feature_store
+from app.services.arduino_service import start_arduino_dispatcher
+from app.services.metrics_service import REQUEST_LATENCY, timed_job
+from app.services.retrain_service import run_retrain, RETRAIN_ENABLED, RETRAIN_HOUR
+from app.logger import setup_logging
+from datetime import datetime
 import os
+import time
 
 # --- 전역 객체 생성 ---
 # Flask 'app' 객체를 전역(global)으로 생성합니다.
@@ -14,6 +22,9 @@ def create_app():
     Flask 애플리케이션을 생성하고 초기화(설정)하는 '공장' 함수입니다.
     run.py 파일이 이 함수를 호출하여 서버를 실행시킵니다.
     """
+    # --- 로깅 설정 (LOG_LEVEL) ---
+    setup_logging()
+
     # --- 앱 설정 (Config) ---
     app.config["CORS_ORIGINS"] = "*" # 개발용: 모든 도메인 허용
     # app.config["CORS_ORIGINS"] = os.getenv("FRONTEND_URL") # 배포용
@@ -32,23 +43,62 @@ def create_app():
     from app.routers.relay_routes import relay_bp
     from app.routers.channels_routes import channels_bp
     from app.routers.energy_routes import energy_bp
+    from app.routers.stream_routes import stream_bp
+    from app.routers.metrics_routes import metrics_bp
 
     app.register_blueprint(data_bp)
     app.register_blueprint(relay_bp)
     app.register_blueprint(channels_bp) 
     app.register_blueprint(energy_bp) 
+    app.register_blueprint(stream_bp)
+    app.register_blueprint(metrics_bp)
+
+    # --- 요청 처리 시간 기록 (/metrics) ---
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        start = g.pop("request_start", None)
+        if start is not None:
+            # 라우트 패턴 기준으로 기록 (경로 파라미터별로 라벨이 늘어나지 않도록)
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                method=request.method, route=route, status=response.status_code
+            )
+        return response
+
+    # 최신 센서 데이터 캐시 및 모델 특성 저장소 초기화
+    warm_latest_sensor_cache()
+    warm_feature_store(datetime.now())
+
+    # 센서 데이터 쓰기 버퍼 시작 (SENSOR_BUFFER_ENABLED=true 일 때)
+    start_ingest_buffer()
+
+    # 아두이노 명령 전송 스레드 시작 (ARDUINO_URL 설정 시 릴레이 변경 자동 전송)
+    start_arduino_dispatcher()
 
     # 스케줄러 설정 (리로더 프로세스에서만 실행)
     if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
         scheduler = BackgroundScheduler()
         scheduler.add_job(
-            func=aggregate_old_data,
+            func=timed_job("aggregate_old_data", aggregate_old_data),
             # trigger="interval",
             # seconds=30
             trigger="cron",
             hour="*",
             minute=0
         )
+        # 모델 재학습 (RETRAIN_ENABLED=true 일 때, 매일 RETRAIN_HOUR 시)
+        if RETRAIN_ENABLED:
+            scheduler.add_job(
+                func=timed_job("retrain_model", run_retrain),
+                trigger="cron",
+                hour=RETRAIN_HOUR,
+                minute=30
+            )
         scheduler.start()
 
     # 생성 및 설정이 완료된 app 객체를 반환합니다.
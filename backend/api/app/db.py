@@ -1,40 +1,200 @@
-import mysql.connector
 from dotenv import load_dotenv
+from pathlib import Path
+from app import db_sqlite
 import os
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
 
 # .env 파일 로드
 load_dotenv()
 
+# 저장소 선택 (mysql : MySQL 서버 / sqlite : 내장 SQLite 파일, WAL 모드)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", str(Path(__file__).parent.parent / "data" / "ess.db"))
+
 # env 변수 가져오기
 DB_HOST = os.getenv("DB_HOST")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_DATABASE = os.getenv("DB_DATABASE")
 
+# 커넥션 풀 설정
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5)) # 최대 연결 수
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5)) # 연결 대기 최대 시간 (초)
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", 30)) # 유휴 연결 상태 확인 주기 (초)
+
+# 커넥션 풀 클래스
+class ConnectionPool:
+    """
+    크기가 제한된 DB 커넥션 풀
+    - connect : 새 연결 생성 함수 (MySQL / SQLite)
+    - 최대 size개의 연결만 동시에 사용 (초과 요청은 timeout까지 대기)
+    - 대여 시 오래 쉬었던 연결은 ping으로 상태 확인 후 재연결
+    - 대기 시간 및 사용량 카운터 기록
+    """
+    def __init__(self, size, timeout, ping_interval, connect):
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._idle = queue.LifoQueue() # (conn, 마지막 사용 시각)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._connect_func = connect
+        self._stats = {
+            "checkouts": 0, # 연결 대여 횟수
+            "created": 0, # 새로 생성한 연결 수
+            "reconnects": 0, # 상태 확인 후 재연결 수
+            "discarded": 0, # 폐기한 연결 수
+            "timeouts": 0, # 대기 시간 초과 횟수
+            "in_use": 0, # 현재 사용중인 연결 수
+            "wait_time_total": 0.0, # 누적 대기 시간 (초)
+            "wait_time_max": 0.0 # 최대 대기 시간 (초)
+        }
+
+    def _connect(self):
+        conn = self._connect_func()
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _check(self, conn, last_used):
+        # 최근에 사용한 연결은 ping 생략
+        if time.monotonic() - last_used < self.ping_interval:
+            return conn
+        try:
+            if not conn.is_connected():
+                conn.reconnect(attempts=1, delay=0)
+                with self._lock:
+                    self._stats["reconnects"] += 1
+            return conn
+        except Exception:
+            self._discard(conn)
+            return None
+
+    def _discard(self, conn):
+        with self._lock:
+            self._stats["discarded"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """
+        풀에서 연결 대여 (없으면 새로 생성)
+        """
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise TimeoutError("DB pool : Connection wait timeout")
+        waited = time.monotonic() - start
+
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    break
+                conn = self._check(conn, last_used)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        return conn
+
+    def release(self, conn, discard=False):
+        """
+        사용한 연결을 풀에 반납
+        """
+        try:
+            if discard:
+                self._discard(conn)
+            else:
+                # 미완료 트랜잭션이 다음 사용자에게 넘어가지 않도록 정리
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put((conn, time.monotonic()))
+        except Exception:
+            self._discard(conn)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        result["size"] = self.size
+        result["idle"] = self._idle.qsize()
+        return result
+
+# MySQL 연결 생성
+def _connect_mysql():
+    # SQLite만 사용하는 환경에서는 mysql-connector 설치 불필요
+    import mysql.connector
+    return mysql.connector.connect(
+        host= DB_HOST,
+        user = DB_USER,
+        password = DB_PASSWORD,
+        database = DB_DATABASE
+    )
+
+# SQLite 연결 생성
+def _connect_sqlite():
+    return db_sqlite.connect(SQLITE_PATH, DB_POOL_TIMEOUT)
+
+# 저장소별 연결 생성 함수
+def _get_connect_func(backend):
+    if backend == "sqlite":
+        return _connect_sqlite
+    if backend != "mysql":
+        logger.warning(f"알 수 없는 DB_BACKEND : {backend} (mysql 사용)")
+    return _connect_mysql
+
+# 전역 커넥션 풀
+pool = ConnectionPool(DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_INTERVAL, _get_connect_func(DB_BACKEND))
+
 def get_connection():
     try:
-        conn = mysql.connector.connect(
-            host= DB_HOST,
-            user = DB_USER,
-            password = DB_PASSWORD,
-            database = DB_DATABASE
-        )
-        cursor = conn.cursor(dictionary=True) 
-        
-        # 연결(conn)과 커서(cursor) 객체를 함께 반환
-        return conn, cursor
+        conn = pool.acquire()
     except Exception as e:
-        print(f"DB 연결 실패: {e}")
+        logger.error(f"DB 연결 실패: {e}")
         return None, None # 실패 시 None 반환
 
-def close_connection(conn, cursor):
+    try:
+        cursor = conn.cursor(dictionary=True)
+    except Exception as e:
+        logger.error(f"DB 커서 생성 실패: {e}")
+        pool.release(conn, discard=True)
+        return None, None
+
+    # 연결(conn)과 커서(cursor) 객체를 함께 반환
+    return conn, cursor
+
+def close_connection(conn, cursor, discard=False):
     try:
         if cursor:
             cursor.close() # 커서 먼저 닫기
-        if conn:
-            # (중요) 이제 이 코드는 풀에 반납하는 것이 아니라,
-            # DB 연결을 완전히 끊는 동작을 합니다.
-            conn.close() 
     except Exception as e:
-        print(f"DB 종료 실패: {e}")
+        logger.error(f"DB 커서 종료 실패: {e}")
+    if conn:
+        # 연결을 끊지 않고 풀에 반납 (손상된 연결은 폐기)
+        pool.release(conn, discard=discard)
 
+def get_pool_stats():
+    """
+    커넥션 풀 사용량 및 대기 시간 통계 반환
+    """
+    return pool.stats()
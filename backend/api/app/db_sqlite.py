@@ -0,0 +1,214 @@
+from datetime import date, datetime
+from pathlib import Path
+import re
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 내장 SQLite 저장소 (DB_BACKEND=sqlite, 엣지 게이트웨이/테스트용)
+# 서비스 코드의 MySQL 문법을 연결 단계에서 SQLite 문법으로 변환해 서비스 수정 없이 사용
+
+# 테이블 생성 (backend/schema.sql 과 같은 구조, 최초 연결 시 실행)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sun_data_realtime (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp DATETIME NOT NULL,
+    soc FLOAT,
+    solar_w FLOAT,
+    lux INT
+);
+CREATE INDEX IF NOT EXISTS idx_timestamp ON sun_data_realtime (timestamp);
+
+CREATE TABLE IF NOT EXISTS sun_data_hourly (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date DATE NOT NULL,
+    hour INT NOT NULL,
+    avg_soc FLOAT,
+    avg_solar_w FLOAT,
+    avg_lux INT,
+    sample_count INT NOT NULL DEFAULT 0,
+    UNIQUE (date, hour)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+    job_name VARCHAR(50) PRIMARY KEY,
+    watermark DATETIME,
+    last_run_at DATETIME,
+    last_rows INT,
+    last_duration_ms INT
+);
+
+CREATE TABLE IF NOT EXISTS relay_status (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    relay_name CHAR(5) NOT NULL,
+    status VARCHAR(5) NOT NULL DEFAULT 'off'
+);
+
+CREATE TABLE IF NOT EXISTS trade_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    buyer_id INT NOT NULL REFERENCES relay_status (id),
+    amount FLOAT NOT NULL,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_timestamp_id ON trade_history (timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_buyer_timestamp_id ON trade_history (buyer_id, timestamp, id);
+
+CREATE TABLE IF NOT EXISTS trade_daily_summary (
+    date DATE NOT NULL,
+    buyer_id INT NOT NULL,
+    total_amount DOUBLE NOT NULL DEFAULT 0,
+    trade_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, buyer_id)
+);
+
+-- 초기 릴레이 상태 추가 (비어있을 때만)
+INSERT INTO relay_status (relay_name, status)
+    SELECT column1, column2 FROM (VALUES ('A', 'off'), ('B', 'off'), ('C', 'off'), ('D', 'off'))
+    WHERE NOT EXISTS (SELECT 1 FROM relay_status);
+"""
+
+# ON DUPLICATE KEY UPDATE 충돌 기준 컬럼 (테이블별 UNIQUE / PRIMARY KEY)
+CONFLICT_KEYS = {
+    "sun_data_hourly": "date, hour",
+    "rollup_watermark": "job_name",
+    "trade_daily_summary": "date, buyer_id"
+}
+
+# 조회 결과 타입 변환 (SQLite는 날짜를 문자열로 저장, 컬럼명 기준으로 datetime/date 변환)
+DATETIME_COLUMNS = {"timestamp", "watermark", "last_run_at"}
+DATE_COLUMNS = {"date"}
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+
+_FOR_UPDATE = re.compile(r"\s+FOR UPDATE\b")
+_HOUR = re.compile(r"HOUR\((\w+)\)")
+_INSERT_TABLE = re.compile(r"INSERT INTO (\w+)")
+_VALUES_FUNC = re.compile(r"VALUES\((\w+)\)")
+
+# MySQL 문법 변환
+def translate(sql):
+    """
+    서비스에서 사용하는 MySQL 문법만 변환
+    %s -> ?, HOUR(col) -> strftime, GREATEST -> MAX, FOR UPDATE 제거(쓰기 잠금은 BEGIN IMMEDIATE로 대체),
+    ON DUPLICATE KEY UPDATE col = VALUES(col) -> ON CONFLICT (키) DO UPDATE SET col = excluded.col
+    """
+    sql = sql.replace("%s", "?")
+    sql = _FOR_UPDATE.sub("", sql)
+    sql = _HOUR.sub(r"CAST(strftime('%H', \1) AS INTEGER)", sql)
+    sql = sql.replace("GREATEST(", "MAX(")
+    match = _INSERT_TABLE.search(sql)
+    if match and "ON DUPLICATE KEY UPDATE" in sql:
+        sql = sql.replace("ON DUPLICATE KEY UPDATE", f"ON CONFLICT ({CONFLICT_KEYS[match.group(1)]}) DO UPDATE SET")
+        sql = _VALUES_FUNC.sub(r"excluded.\1", sql)
+    return sql
+
+# 조회 결과 컬럼별 변환 함수 (결과마다 1회 계산)
+def _column_converters(description):
+    converters = []
+    for column in description:
+        if column[0] in DATETIME_COLUMNS:
+            converters.append((column[0], datetime.fromisoformat))
+        elif column[0] in DATE_COLUMNS:
+            converters.append((column[0], date.fromisoformat))
+    return [column[0] for column in description], converters
+
+def _convert_rows(description, rows):
+    names, converters = _column_converters(description)
+    result = [dict(zip(names, row)) for row in rows]
+    for name, convert in converters:
+        for row in result:
+            value = row[name]
+            if isinstance(value, str):
+                row[name] = convert(value)
+    return result
+
+# mysql.connector 커서(dictionary=True)와 같은 인터페이스
+class SQLiteCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn.cursor()
+
+    def execute(self, sql, params=()):
+        # SELECT ... FOR UPDATE : 트랜잭션 시작 시 쓰기 잠금 선점 (읽은 뒤 쓰기 전환 시 충돌 방지)
+        if not self._conn.in_transaction and _FOR_UPDATE.search(sql):
+            self._cursor.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(translate(sql), tuple(params or ()))
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(translate(sql), [tuple(row) for row in rows])
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return _convert_rows(self._cursor.description, [row])[0] if row is not None else None
+
+    def fetchmany(self, size=1):
+        return _convert_rows(self._cursor.description, self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return _convert_rows(self._cursor.description, self._cursor.fetchall())
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+# mysql.connector 연결과 같은 인터페이스 (커넥션 풀에서 사용하는 메서드만)
+class SQLiteConnection:
+    def __init__(self, path, timeout):
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute("PRAGMA synchronous=NORMAL") # WAL 모드에서는 커밋마다 fsync 하지 않아도 손상 없음
+
+    def cursor(self, dictionary=True):
+        return SQLiteCursor(self._conn)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return True
+
+    def reconnect(self, attempts=1, delay=0):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+# SQLite 연결 생성
+def connect(path, timeout):
+    """
+    최초 연결 시 WAL 모드 설정 및 테이블 생성
+    timeout : 다른 연결의 쓰기 잠금 대기 최대 시간 (초)
+    """
+    with _init_lock:
+        if path not in _initialized:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=timeout)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL") # 읽기와 쓰기 동시 진행
+                conn.executescript(SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            _initialized.add(path)
+            logger.info(f"SQLite 저장소 사용 : {path}")
+    return SQLiteConnection(path, timeout)
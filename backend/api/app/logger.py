@@ -0,0 +1,46 @@
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import logging
+import os
+import queue
+import sys
+
+# 로그 레벨 (DEBUG / INFO / WARNING / ERROR / OFF)
+# DEBUG : 요청별 상세 로그 (조회 성공, 계산 과정 등) 포함
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+_listener = None
+
+# 로깅 설정
+def setup_logging():
+    """
+    app 로거 설정 (최초 1회)
+    요청 스레드는 큐에 넣기만 하고, 출력은 별도 스레드(QueueListener)가 처리해 stdout 대기 없음
+    LOG_LEVEL=OFF 이면 로그 출력 안 함
+    """
+    global _listener
+    logger = logging.getLogger("app")
+    if _listener is not None:
+        return logger
+
+    if LOG_LEVEL == "OFF":
+        # 하위 로거(app.*)도 출력 안 함 : 레벨을 CRITICAL 위로 올려 기록 자체를 막고,
+        # 핸들러가 없을 때 stderr로 출력되는 lastResort 대신 NullHandler 사용
+        logger.setLevel(logging.CRITICAL + 1)
+        if not any(isinstance(handler, logging.NullHandler) for handler in logger.handlers):
+            logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+        return logger
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    logger.propagate = False
+    return logger
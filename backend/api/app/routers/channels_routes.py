@@ -1,26 +1,26 @@
-from flask import Blueprint, jsonify
-from app.services.sensor_service import get_latest_sensor_data
-from app.services.relay_service import get_active_relay_list
+from flask import Blueprint, jsonify, request
+from app.services.sensor_service import get_latest_sensor_data, get_sensor_version
+from app.services.relay_service import get_active_relay_list, get_relay_code
+from app.services.stream_service import long_poll, parse_wait
 from app.services.channels_service import get_optimal_combination, get_available_channels
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Blueprint 생성
 channels_bp = Blueprint("channels", __name__)
 
-# 실시간 선택 가능 채널 확인
-@channels_bp.route("/api/channels/available", methods=["GET"])
-def available_channels():
-    """
-    실시간 선택 가능 채널 확인 및 배터리 보호
-    """
+# 선택 가능 채널 계산 + ETag 조회 (long-poll 용)
+def _load_available_channels():
     # 최신 센서 데이터 조회
     sensor_data, message, status_code = get_latest_sensor_data()
     if message:
-        return jsonify({"message": message}), status_code
+        return None, message, status_code, None
 
     # 현재 사용중인 채널 확인
     selected_channels, message, status_code = get_active_relay_list()
     if message:
-        return jsonify({"message": message}), status_code
+        return None, message, status_code, None
 
     # 가능한 채널 조회
     result, message, status_code = get_available_channels(
@@ -28,11 +28,32 @@ def available_channels():
         power=sensor_data["solar_w"],
         selected_channels=selected_channels
     )
+    if message:
+        return None, message, status_code, None
+
+    relay_code = get_relay_code({ch: "on" for ch in selected_channels})
+    etag = f"c-{get_sensor_version(sensor_data)}-{relay_code}"
+    return result, None, status_code, etag
+
+# 실시간 선택 가능 채널 확인
+@channels_bp.route("/api/channels/available", methods=["GET"])
+def available_channels():
+    """
+    실시간 선택 가능 채널 확인 및 배터리 보호
+    ETag(센서 데이터 버전 + 릴레이 상태) 지원, If-None-Match 일치 시 304
+    ?wait=초 : 센서 데이터 또는 릴레이 상태가 바뀔 때까지 대기 (long-poll)
+    """
+    result, message, status_code, etag = long_poll(
+        ("sensor", "relay"), _load_available_channels, request.if_none_match, parse_wait(request.args.get("wait"))
+    )
     if message:
         return jsonify({"message": message}), status_code
-    else:
-        print("\n판매 가능 채널 조회 : 조회 성공")
-        return jsonify(result), status_code
+
+    logger.debug("판매 가능 채널 조회 : 조회 성공")
+    response = jsonify(result)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
 # 최적 판매 조합 추천
 @channels_bp.route("/api/channels/optimal", methods=["GET"])
@@ -1,6 +1,21 @@
-from flask import Blueprint, jsonify, request
-from app.services.sensor_service import get_latest_sensor_data, save_sensor_data
-from app.services.relay_service import get_trade_history
+from flask import Blueprint, jsonify, request, json, Response, stream_with_context
+from app.services.sensor_service import get_latest_sensor_data, get_sensor_version, save_sensor_data, parse_sensor_batch
+from app.services.stream_service import long_poll, parse_wait
+from app.services.ingest_service import ingest_sensor_batch, get_ingest_stats
+from app.services.relay_service import parse_trade_history_filters, get_trade_history_page, stream_trade_history
+from app.services.trade_service import parse_summary_filters, get_trade_summary, is_settled
+from app.services.archive_service import parse_archive_filters, get_archive_range, get_archive_stats
+from app.services.range_service import parse_range_filters, get_sensor_range
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 일괄 수신 최대 건수
+SENSOR_BATCH_MAX = int(os.getenv("SENSOR_BATCH_MAX", 1000))
+
+# 지난 기간 거래 요약 응답 캐시 유효 시간 (1년)
+SUMMARY_MAX_AGE = 365 * 24 * 3600
 
 # Blueprint 생성
 data_bp = Blueprint('data', __name__)
@@ -9,12 +24,26 @@ data_bp = Blueprint('data', __name__)
 # 기능: DB에 저장된 가장 최신의 태양광 데이터를 조회
 @data_bp.route('/api/data/latest', methods=['GET'])
 def get_latest_status():
+        """
+        ETag(최신 데이터 timestamp + id) 지원, If-None-Match 일치 시 304
+        ?wait=초 : 데이터가 바뀔 때까지 대기 (long-poll)
+        """
         # 최신 센서 데이터 조회
-        sensor_data, message, status_code = get_latest_sensor_data()
-        if sensor_data is None:
+        def load():
+            sensor_data, message, status_code = get_latest_sensor_data()
+            etag = f"s-{get_sensor_version(sensor_data)}" if sensor_data else None
+            return sensor_data, message, status_code, etag
+
+        sensor_data, message, status_code, etag = long_poll(
+            ("sensor",), load, request.if_none_match, parse_wait(request.args.get("wait"))
+        )
+        if not sensor_data:
             return jsonify({"message": message}), status_code
 
-        return jsonify(sensor_data), status_code
+        response = jsonify(sensor_data)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
 
 # 아두이노 데이터 받아서 DB에 저장
 @data_bp.route('/api/data/solar', methods=['POST'])
@@ -32,13 +61,13 @@ def receive_sun_data():
 
     # 데이터 유효성 검사
     if soc is None or solar_w is None or lux is None:
-        print("아두이노 데이터 수신 : 필수 데이터 누락")
+        logger.warning("아두이노 데이터 수신 : 필수 데이터 누락")
         return jsonify({"message": "Missing required fields"}), 400
     if not (0 <= soc <= 100) or solar_w < 0 or lux < 0:
-        print("아두이노 데이터 수신 : 필수 데이터 입력값 오류")
+        logger.warning("아두이노 데이터 수신 : 필수 데이터 입력값 오류")
         return jsonify({"message": "Invalid input values"}), 400
     
-    print(f"\nSOC: {soc}%, 전력: {solar_w}W, 조도: {lux}lux")
+    logger.debug(f"SOC: {soc}%, 전력: {solar_w}W, 조도: {lux}lux")
 
     _, message, status_code = save_sensor_data(soc, solar_w, lux)
 
@@ -48,22 +77,156 @@ def receive_sun_data():
     else:
         return jsonify({"success": True}), status_code
 
+# 아두이노 데이터 여러 건을 받아 한 번에 저장
+@data_bp.route('/api/data/solar/batch', methods=['POST'])
+def receive_sun_data_batch():
+    """
+    timestamp가 포함된 센서 데이터 목록을 받아 한 번에 저장
+    요청 형식 : {"readings": [{"soc": .., "solar_w": .., "lux": .., "timestamp": ".."}, ...]}
+    """
+    data = request.get_json(silent=True)
+    readings = data.get("readings") if isinstance(data, dict) else data
+
+    # 데이터 유효성 검사
+    if not isinstance(readings, list) or not readings:
+        logger.warning("아두이노 일괄 수신 : 필수 데이터 누락")
+        return jsonify({"message": "Missing required fields"}), 400
+    if len(readings) > SENSOR_BATCH_MAX:
+        logger.warning("아두이노 일괄 수신 : 최대 건수 초과")
+        return jsonify({"message": f"Too many readings (max {SENSOR_BATCH_MAX})"}), 413
+
+    # 전체 데이터 한 번에 검사 (하나라도 오류가 있으면 전체 거부)
+    rows, errors = parse_sensor_batch(readings)
+    if errors:
+        logger.warning(f"아두이노 일괄 수신 : 입력값 오류 {len(errors)} 건")
+        return jsonify({"message": "Invalid input values", "errors": errors}), 400
+
+    success, message, status_code = ingest_sensor_batch(rows)
+    if not success:
+        return jsonify({"message": message}), status_code
+
+    return jsonify({"success": True, "count": len(rows)}), status_code
+
+# 센서 데이터 쓰기 버퍼 상태 조회
+@data_bp.route('/api/data/ingest/stats', methods=['GET'])
+def get_ingest_status():
+    """
+    버퍼 적재 건수 및 저장 소요 시간 반환
+    """
+    return jsonify(get_ingest_stats()), 200
+
+# 기간 센서 데이터 차트 조회 (다운샘플링)
+@data_bp.route("/api/data/range", methods=["GET"])
+def get_range_route():
+    """
+    기간 길이에 맞는 데이터(원본 / 시간별 집계)를 골라 시계열별 최대 points개로 다운샘플링(LTTB)해 반환
+    쿼리 : from, to (ISO 날짜/날짜시간), points (기본 500), series (soc,solar_w,lux 중 선택)
+    """
+    filters, error = parse_range_filters(request.args)
+    if error:
+        logger.warning(f"기간 데이터 조회 : 입력값 오류 - {error}")
+        return jsonify({"message": error}), 400
+
+    result, message, status_code = get_sensor_range(filters)
+    if message:
+        return jsonify({"message": message}), status_code
+
+    return jsonify(result), status_code
+
+# 보관된 원본 센서 데이터 기간 조회
+@data_bp.route("/api/data/archive", methods=["GET"])
+def get_archive_route():
+    """
+    시간별 집계로 DB에서 삭제된 원본 센서 데이터를 보관소(파일)에서 조회 (DB 조회 없음)
+    쿼리 : start, end (ISO 날짜/날짜시간), columns (soc,solar_w,lux 중 선택)
+    응답 : {"start", "end", "count", "timestamp": [...], "soc": [...], ...} (컬럼별 배열)
+    """
+    filters, error = parse_archive_filters(request.args)
+    if error:
+        logger.warning(f"보관 데이터 조회 : 입력값 오류 - {error}")
+        return jsonify({"message": error}), 400
+
+    result, message, status_code = get_archive_range(filters)
+    if message:
+        return jsonify({"message": message}), status_code
+
+    return jsonify(result), status_code
+
+# 보관소 현황 조회
+@data_bp.route("/api/data/archive/stats", methods=["GET"])
+def get_archive_status():
+    """
+    보관된 날짜 수, 행 수, 디스크 사용량 반환
+    """
+    return jsonify(get_archive_stats()), 200
+
 # 거래 내역 조회
 @data_bp.route("/api/data/history", methods=["GET"])
 def get_trade_history_route():
     """
-    구매채널 및 전력량, 구매 시간 등을 반환
+    구매채널 및 전력량, 구매 시간 등을 반환 (최신순)
+    - limit / cursor 지정 시 : 페이지 조회 {"items": [...], "next_cursor": ..}
+    - format=ndjson : 한 줄에 1건씩 스트림 전송
+    - 그 외 : 전체 목록을 JSON 배열로 스트림 전송 (기존 응답 형식)
     """
-    # 쿼리 파라미터 받아오기
-    user_id = request.args.get("user_id")
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
-    date = request.args.get("date")
-    
-    result, message, status_code = get_trade_history(user_id, start_date, end_date, date)
+    # 쿼리 파라미터 검사
+    filters, error = parse_trade_history_filters(request.args)
+    if error:
+        logger.warning(f"거래 내역 조회 : 입력값 오류 - {error}")
+        return jsonify({"message": error}), 400
+
+    # 페이지 조회
+    if filters["limit"] is not None:
+        result, message, status_code = get_trade_history_page(filters)
+        if message:
+            return jsonify({"message": message}), status_code
 
-    if result is None:
+        logger.debug("거래 내역 조회 : 조회 성공")
+        return jsonify(result), status_code
+
+    # 전체 조회 (fetchmany 단위로 읽어 바로 전송)
+    rows, message, status_code = stream_trade_history(filters)
+    if message:
+        return jsonify({"message": message}), status_code
+
+    if request.args.get("format") == "ndjson":
+        def generate():
+            for row in rows:
+                yield json.dumps(row) + "\n"
+        mimetype = "application/x-ndjson"
+    else:
+        def generate():
+            yield "["
+            for index, row in enumerate(rows):
+                yield ("," if index else "") + json.dumps(row)
+            yield "]"
+        mimetype = "application/json"
+
+    logger.debug("거래 내역 조회 : 스트림 전송 시작")
+    return Response(stream_with_context(generate()), mimetype=mimetype), status_code
+
+# 구매채널별 기간 거래 요약 조회
+@data_bp.route("/api/data/history/summary", methods=["GET"])
+def get_trade_summary_route():
+    """
+    구매채널별 일/주/월 거래 합계 반환 (쿼리: period, start_date, end_date, user_id)
+    지난 기간 응답은 바뀌지 않으므로 ETag + 장기 캐시 허용
+    """
+    filters, error = parse_summary_filters(request.args)
+    if error:
+        logger.warning(f"거래 요약 조회 : 입력값 오류 - {error}")
+        return jsonify({"message": error}), 400
+
+    result, message, status_code = get_trade_summary(filters)
+    if message:
         return jsonify({"message": message}), status_code
 
-    print("\n거래 내역 조회 : 조회 성공")
-    return jsonify(result), status_code
\ No newline at end of file
+    response = jsonify(result)
+    if is_settled(filters):
+        response.headers["Cache-Control"] = f"public, max-age={SUMMARY_MAX_AGE}, immutable"
+    else:
+        # 오늘이 포함된 기간은 매번 재검증
+        response.headers["Cache-Control"] = "no-cache"
+    response.add_etag()
+    # If-None-Match 일치 시 304 반환
+    return response.make_conditional(request)
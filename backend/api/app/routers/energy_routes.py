@@ -1,5 +1,12 @@
-from flask import Blueprint, jsonify
-from app.services.energy_service import get_latest_sensor_data_for_model, predict_solar_generation
+from flask import Blueprint, jsonify, request
+from app.services.energy_service import (
+    get_forecast,
+    get_forecast_cache_stats,
+    predict_solar_generation_batch,
+    parse_quantiles,
+    FORECAST_BATCH_MAX
+)
+from app.services.retrain_service import get_model_info, start_retrain
 
 # Blueprint 생성
 energy_bp = Blueprint("energy", __name__)
@@ -9,15 +16,70 @@ energy_bp = Blueprint("energy", __name__)
 def predict_generation():
     """
     1h, 2h, 3h 뒤 발전량 예측
+    ?interval=true 또는 ?quantiles=10,50,90 : 트리별 예측값 분포의 분위수(P10/P50/P90 등) 포함
     """
-    # 최신 데이터 조회
-    data, message, status_code = get_latest_sensor_data_for_model()
-    if data is None:
+    quantiles = None
+    if request.args.get("interval", "").lower() == "true" or request.args.get("quantiles"):
+        quantiles, error = parse_quantiles(request.args.get("quantiles"))
+        if error:
+            return jsonify({"message": f"Model Prediction : {error}"}), 400
+
+    # 최신 데이터 조회 및 모델 예측 (같은 입력이면 캐시 결과 사용)
+    result, message, status_code = get_forecast(quantiles)
+    if result is None:
         return jsonify({"message": message}), status_code
-    
-    # 모델 예측
-    result, message, status_code = predict_solar_generation(data)
+
+    return jsonify(result), status_code
+
+# 예측 결과 캐시 상태 조회
+@energy_bp.route("/api/energy/cache/stats", methods=["GET"])
+def forecast_cache_stats():
+    """
+    예측 결과 캐시 hit/miss 카운터 반환
+    """
+    return jsonify(get_forecast_cache_stats()), 200
+
+# 모델 일괄 예측 API
+@energy_bp.route("/api/energy/predicted/batch", methods=["POST"])
+def predict_generation_batch():
+    """
+    여러 특성 행(과거 시간대, 여러 사이트 등)의 1h, 2h, 3h 뒤 발전량 일괄 예측
+    요청 형식 : {"rows": [{"year": .., "month": .., "day": .., "time": .., "generation": ..,
+                          "prev_generation": .., "yesterday_generation": .., "lux": ..}, ...]}
+    """
+    data = request.get_json(silent=True)
+    rows = data.get("rows") if isinstance(data, dict) else data
+
+    # 데이터 유효성 검사
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"message": "Model Prediction : Missing required fields"}), 400
+    if len(rows) > FORECAST_BATCH_MAX:
+        return jsonify({"message": f"Model Prediction : Too many rows (max {FORECAST_BATCH_MAX})"}), 413
+
+    # 모델 일괄 예측 (입력 순서 유지)
+    result, message, status_code = predict_solar_generation_batch(rows)
     if result is None:
         return jsonify({"message": message}), status_code
 
-    return jsonify(result), status_code
\ No newline at end of file
+    return jsonify(result), status_code
+
+# 모델 버전 및 재학습 상태 조회
+@energy_bp.route("/api/energy/model", methods=["GET"])
+def model_info():
+    """
+    현재 예측에 사용 중인 모델 버전 및 마지막 재학습 결과 반환
+    """
+    return jsonify(get_model_info()), 200
+
+# 모델 재학습 수동 실행
+@energy_bp.route("/api/energy/model/retrain", methods=["POST"])
+def retrain_model():
+    """
+    스케줄과 같은 재학습을 백그라운드로 시작하고 바로 202 반환 (학습은 별도 프로세스, 검증 통과 시 모델 교체)
+    진행 상태와 결과는 GET /api/energy/model 로 확인, 이미 실행 중이면 409
+    """
+    result, message, status_code = start_retrain()
+    if result is False:
+        return jsonify({"message": message}), status_code
+
+    return jsonify(result), status_code
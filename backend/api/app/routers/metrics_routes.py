@@ -0,0 +1,22 @@
+from flask import Blueprint, Response
+from app.db import get_pool_stats
+from app.services.metrics_service import registry, render_metrics
+from app.services.stream_service import hub
+
+# Blueprint 생성
+metrics_bp = Blueprint("metrics", __name__)
+
+# 기존 통계 값 노출 (조회 시점에 읽음)
+registry.gauge_function("db_pool_in_use", "사용중인 DB 연결 수", lambda: get_pool_stats()["in_use"])
+registry.gauge_function("db_pool_idle", "유휴 DB 연결 수", lambda: get_pool_stats()["idle"])
+registry.gauge_function("db_pool_timeouts", "DB 연결 대기 시간 초과 누적 횟수", lambda: get_pool_stats()["timeouts"])
+registry.gauge_function("stream_subscribers", "실시간 스트림 구독자 수", lambda: hub.stats()["subscribers"])
+
+# Prometheus 지표 조회
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    라우트별 요청 지연 시간, DB 트랜잭션 시간/행 수, 모델 추론 시간, 스케줄러 작업 시간
+    (Prometheus 텍스트 형식)
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
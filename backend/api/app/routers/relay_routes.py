@@ -1,13 +1,25 @@
 from flask import Blueprint, jsonify, request, make_response
 from app.services.relay_service import (
-    update_relay_status_in_db,
+    apply_relay_update,
     get_current_relay_status,
-    save_relay_state_changes
+    get_relay_version,
+    get_relay_code
 )
+from app.services.stream_service import long_poll, parse_wait
+from app.services.arduino_service import get_arduino_stats
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Blueprint 생성
 relay_bp = Blueprint('relay', __name__)
 
+# 현재 릴레이 상태 + ETag 조회 (long-poll 용)
+def _load_relay_status():
+    current_status, message, status_code = get_current_relay_status()
+    etag = f"r-{get_relay_code(current_status)}" if current_status else None
+    return current_status, message, status_code, etag
+
 # 웹에서 릴레이 채널 제어 정보를 받아 DB에 업데이트 및 거래 내역 저장
 @relay_bp.route("/api/relay/update", methods=["POST"])
 def update_relay():
@@ -15,21 +27,11 @@ def update_relay():
 
     # 데이터 유효성 검사
     if not data or "A" not in data or "B" not in data or "C" not in data or "D" not in data:
-        print("\n릴레이 유효성 검사 : 필수 데이터 누락")
+        logger.warning("릴레이 유효성 검사 : 필수 데이터 누락")
         return jsonify({"message": "Relay : Missing required fields"}), 400
 
-    # 현재 릴레이 상태 조회
-    current_status, message, status_code = get_current_relay_status()
-    if current_status is None:
-        return jsonify({"message": message}), status_code
-
-    # DB 저장 함수 호출
-    success, message, status_code = update_relay_status_in_db(data)
-    if not success:
-        return jsonify({"message": message}), status_code
-    
-    # 거래 내역 DB에 저장
-    success, message, status_code = save_relay_state_changes(data, current_status)
+    # 릴레이 상태 변경 및 거래 내역 저장 (한 트랜잭션)
+    success, message, status_code = apply_relay_update(data)
     return jsonify({"message": message}), status_code
 
 
@@ -38,30 +40,58 @@ def update_relay():
 #       DB에 저장된 릴레이의 '현재' 상태를 조회
 @relay_bp.route("/api/relay/status", methods=["GET"])
 def get_all_relay_status():
+    """
+    ETag(릴레이 상태) 지원, If-None-Match 일치 시 304
+    ?wait=초 : 상태가 바뀔 때까지 대기 (long-poll)
+    """
     # 현재 릴레이 상태 조회
-    current_status, message, status_code = get_current_relay_status()
-
-    if current_status is None:
+    current_status, message, status_code, etag = long_poll(
+        ("relay",), _load_relay_status, request.if_none_match, parse_wait(request.args.get("wait"))
+    )
+    if not current_status:
         return jsonify({"message": message}), status_code
     
     # 결과 가공 (JSON 형식 변경)
     status_map = {key: (value == "on") for key, value in current_status.items()}
 
-    return jsonify(status_map), status_code
+    response = jsonify(status_map)
+    response.headers["X-Relay-Version"] = str(get_relay_version())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
 # 아두이노 요청 엔드포인트 DB에 저장된 릴레이 채널 정보를 JSON 형식으로 반환
 @relay_bp.route("/api/relay/control", methods=["GET"])
 def control_relay():
+    """
+    If-None-Match 를 보낸 경우에만 ETag 응답 (상태가 같으면 본문 없이 304)
+    ?wait=초 : 상태가 바뀔 때까지 대기 (long-poll)
+    """
     # DB 최신 상태 조회
-    current_status, message, status_code = get_current_relay_status()
-    if current_status is None:
+    current_status, message, status_code, etag = long_poll(
+        ("relay",), _load_relay_status, request.if_none_match, parse_wait(request.args.get("wait"))
+    )
+    if not current_status:
         return jsonify({"message": message}), status_code
 
     # 결과 가공
-    result = "".join("1" if current_status.get(ch) == "on" else "0" for ch in ["A", "B", "C", "D"])
+    result = get_relay_code(current_status)
 
-    print("\n릴레이 제어 : DB 상태 응답 전송")
+    logger.debug("릴레이 제어 : 상태 응답 전송")
     response = make_response(result)
     response.headers.clear()
 
+    # 조건부 요청을 보내는 보드에만 ETag 전송 (기존 보드 응답 형식 유지)
+    if request.if_none_match:
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
     return response
+
+# 아두이노 명령 전송 상태 조회
+@relay_bp.route("/api/relay/dispatch/stats", methods=["GET"])
+def get_dispatch_status():
+    """
+    아두이노 전송/재시도/실패 건수 및 장치별 마지막 전송 결과 반환
+    """
+    return jsonify(get_arduino_stats()), 200
@@ -0,0 +1,63 @@
+from flask import Blueprint, jsonify, Response, stream_with_context
+from app.services.stream_service import hub, format_event, STREAM_HEARTBEAT
+from app.services.sensor_service import get_latest_sensor_data
+from app.services.relay_service import get_current_relay_status
+import queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Blueprint 생성
+stream_bp = Blueprint("stream", __name__)
+
+# 실시간 센서/릴레이 변경 스트림 (Server-Sent Events)
+@stream_bp.route("/api/stream", methods=["GET"])
+def stream_updates():
+    """
+    센서 데이터 저장 및 릴레이 상태 변경 시 이벤트 전송
+    - event: sensor  -> /api/data/latest 와 같은 형식 (id 포함, 일괄 수신 시 가장 최신 행)
+    - event: relay   -> /api/relay/status 와 같은 형식
+    연결 직후 현재 상태를 1회 전송하고, 이후 변경분과 하트비트만 전송
+    """
+    # 구독 등록은 generate() 안에서 (응답 전송 전에 연결이 끊겨 generator가 실행되지 않아도 구독자가 남지 않음)
+    if hub.is_full():
+        logger.warning("스트림 연결 : 구독자 수 초과")
+        return jsonify({"message": "Stream : Too many subscribers"}), 503
+
+    def generate():
+        subscriber = hub.subscribe()
+        if subscriber is None:
+            # 확인 후 다른 연결이 먼저 등록된 경우 : 재연결 대기 시간만 전달하고 종료
+            logger.warning("스트림 연결 : 구독자 수 초과")
+            yield "retry: 5000\n\n"
+            return
+        try:
+            yield "retry: 5000\n\n"
+            # 연결 직후 현재 상태 전송 (구독 등록 후 조회하므로 그 사이 변경도 누락 없음, 캐시에서 조회)
+            sensor_data, _, _ = get_latest_sensor_data()
+            if sensor_data:
+                yield format_event("sensor", sensor_data)
+            current_status, _, _ = get_current_relay_status()
+            if current_status:
+                yield format_event("relay", {key: (value == "on") for key, value in current_status.items()})
+            while True:
+                try:
+                    yield subscriber.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # 프록시/브라우저 연결 유지용 하트비트
+                    yield ": heartbeat\n\n"
+        finally:
+            hub.unsubscribe(subscriber)
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no" # nginx 버퍼링 해제
+    return response
+
+# 스트림 상태 조회
+@stream_bp.route("/api/stream/stats", methods=["GET"])
+def stream_stats():
+    """
+    구독자 수 및 발행/버려진 이벤트 수 반환
+    """
+    return jsonify(hub.stats()), 200
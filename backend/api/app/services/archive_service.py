@@ -0,0 +1,300 @@
+from app.services.common_service import DBException, handle_errors
+from datetime import datetime, date as date_type, timedelta
+from pathlib import Path
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 원본 센서 데이터 보관소 설정
+# 시간별 집계 시 삭제 전 원본 행을 일별 디렉토리에 컬럼별 .npy 파일로 저장 (DB 조회 없이 메모리 매핑으로 읽기)
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", str(Path(__file__).parent.parent.parent / "data" / "archive")))
+ARCHIVE_MAX_ROWS = int(os.getenv("ARCHIVE_MAX_ROWS", 200000)) # API 한 번에 반환할 최대 행 수
+ARCHIVE_COMPACT_MIN_PARTS = int(os.getenv("ARCHIVE_COMPACT_MIN_PARTS", 24)) # 지난 날짜 병합 기준 part 수 (시간별 집계 1회 = 1시간 1 part)
+ARCHIVE_DEFAULT_HOURS = 24 # 기간 미지정 시 조회 시간
+
+# 저장 컬럼 (id, timestamp 는 항상 저장)
+ARCHIVE_COLUMNS = ("soc", "solar_w", "lux")
+COLUMN_DTYPES = {
+    "id": np.int64,
+    "timestamp": "datetime64[s]",
+    "soc": np.float32,
+    "solar_w": np.float32,
+    "lux": np.float32 # NULL 값을 NaN으로 저장하기 위해 실수형 사용
+}
+
+# 일별 디렉토리 구조 : ARCHIVE_DIR/YYYY-MM-DD/part-<첫 id>-<마지막 id>-<id 목록 해시>/<컬럼>.npy
+# part 이름은 저장한 id 집합으로 결정 (id 집합이 완전히 같은 part만 같은 이름)
+# part 디렉토리는 임시 이름으로 쓴 뒤 rename 하므로 읽는 쪽은 완성된 part만 확인
+# 병합 part는 포함한 part 이름을 sources.json 에 기록 (기존 part 삭제 전에 중단되어도 중복 조회 없음)
+PART_PREFIX = "part-"
+SOURCES_FILE = "sources.json"
+
+# 시각 변환 기준 (로컬 시각 그대로 저장)
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+_write_lock = threading.Lock()
+
+def _part_name(ids):
+    digest = hashlib.sha1(np.ascontiguousarray(ids, dtype=np.int64).tobytes()).hexdigest()[:12]
+    return f"{PART_PREFIX}{int(ids[0]):012d}-{int(ids[-1]):012d}-{digest}"
+
+# 컬럼 배열로 part 디렉토리 저장 (timestamp, id 순 정렬, 같은 id는 1행만 저장)
+def _write_part(day_dir, columns, sources=None):
+    """
+    sources : 병합 시 포함한 part 이름 목록 (sources.json 으로 함께 저장)
+    반환 : (part 디렉토리, 저장 행 수) - 같은 id 집합의 part가 이미 있으면 저장 행 수 0
+    """
+    _, unique_index = np.unique(columns["id"], return_index=True)
+    columns = {name: values[unique_index] for name, values in columns.items()}
+    order = np.lexsort((columns["id"], columns["timestamp"]))
+    part_dir = day_dir / _part_name(np.sort(columns["id"]))
+
+    # 같은 행을 이미 저장함 (저장 후 DB 커밋 실패로 재실행된 경우)
+    if part_dir.exists():
+        return part_dir, 0
+
+    tmp_dir = day_dir / f".tmp-{part_dir.name}-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    for name, values in columns.items():
+        np.save(tmp_dir / f"{name}.npy", values[order])
+    if sources:
+        (tmp_dir / SOURCES_FILE).write_text(json.dumps(sorted(sources)))
+    os.rename(tmp_dir, part_dir)
+    return part_dir, len(order)
+
+# 삭제 전 원본 행 저장 (시간별 집계 트랜잭션 안에서 호출)
+def archive_rows(rows):
+    """
+    rows : [{"id", "timestamp", "soc", "solar_w", "lux"}, ...]
+    저장 실패 시 예외 발생 -> 집계 트랜잭션 롤백 (저장되지 않은 행은 삭제되지 않음)
+    반환 : 저장한 행 수
+    """
+    if not ARCHIVE_ENABLED or not rows:
+        return 0
+
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(row["timestamp"].date(), []).append(row)
+
+    archived = 0
+    with _write_lock:
+        for day, day_rows in by_day.items():
+            columns = {
+                "id": np.fromiter((row["id"] for row in day_rows), dtype=COLUMN_DTYPES["id"], count=len(day_rows)),
+                # datetime 목록을 바로 datetime64 로 변환하는 것보다 정수 초로 변환 후 형 변환이 빠름
+                "timestamp": np.fromiter(
+                    ((row["timestamp"] - EPOCH) // SECOND for row in day_rows), dtype=np.int64, count=len(day_rows)
+                ).astype(COLUMN_DTYPES["timestamp"])
+            }
+            for name in ARCHIVE_COLUMNS:
+                columns[name] = np.fromiter(
+                    (np.nan if row[name] is None else row[name] for row in day_rows),
+                    dtype=COLUMN_DTYPES[name], count=len(day_rows)
+                )
+            archived += _write_part(ARCHIVE_DIR / day.isoformat(), columns)[1]
+    return archived
+
+def _read_sources(part_dir):
+    try:
+        return set(json.loads((part_dir / SOURCES_FILE).read_text()))
+    except FileNotFoundError:
+        return set()
+
+# 일별 디렉토리의 유효한 part 목록
+def _list_parts(day_dir):
+    """
+    병합 part의 sources.json 에 기록된 part는 제외 (병합 후 기존 part 삭제 전에 중단된 경우)
+    반환 : (유효한 part 목록, 병합 part에 포함된 part 목록)
+    """
+    parts = sorted(path for path in day_dir.iterdir() if path.name.startswith(PART_PREFIX))
+    merged = set()
+    for path in parts:
+        merged |= _read_sources(path)
+    return [path for path in parts if path.name not in merged], [path for path in parts if path.name in merged]
+
+def _load_column(part_dir, name):
+    return np.load(part_dir / f"{name}.npy", mmap_mode="r")
+
+# 기존 part의 모든 id가 병합 part에 저장되어 있는지 확인
+def _is_stored_in(part_dir, merged_ids):
+    return bool(np.isin(_load_column(part_dir, "id"), merged_ids).all())
+
+# 지난 날짜의 part 병합 (하루 1개 part로 정리)
+@handle_errors("Sensor Archive")
+def compact_archive(before):
+    """
+    before 이전 날짜(더 이상 시간별 집계가 추가되지 않는 날짜) 중 part가 ARCHIVE_COMPACT_MIN_PARTS 개 이상인 날짜를 병합
+    병합 part를 먼저 저장한 뒤, 모든 id가 병합 part에 있는 것을 확인한 기존 part만 삭제하므로 중단되어도 데이터 유실 없음
+    """
+    if not ARCHIVE_ENABLED or not ARCHIVE_DIR.exists():
+        return 0, None, 200
+
+    merged_days = 0
+    with _write_lock:
+        for day_dir in sorted(ARCHIVE_DIR.iterdir()):
+            try:
+                day = date_type.fromisoformat(day_dir.name)
+            except ValueError:
+                continue
+            if day >= before:
+                continue
+
+            # 중단된 임시 디렉토리 삭제 (지난 날짜에는 새로 쓰는 part 없음)
+            for path in day_dir.iterdir():
+                if path.name.startswith(".tmp-"):
+                    shutil.rmtree(path, ignore_errors=True)
+
+            parts, covered = _list_parts(day_dir)
+            if len(parts) >= max(ARCHIVE_COMPACT_MIN_PARTS, 2):
+                columns = {
+                    name: np.concatenate([_load_column(part, name) for part in parts])
+                    for name in COLUMN_DTYPES
+                }
+                # 병합한 part가 포함하던 part도 기록 (이전 병합의 기존 part가 남아있는 경우)
+                sources = {part.name for part in parts}
+                for part in parts:
+                    sources |= _read_sources(part)
+                merged_dir, _ = _write_part(day_dir, columns, sources)
+                covered += [part for part in parts if part != merged_dir]
+                merged_days += 1
+
+            # 병합 part에 포함된 기존 part 삭제 (모든 id 저장 확인 후)
+            if covered:
+                current = [part for part in _list_parts(day_dir)[0] if part not in covered]
+                merged_ids = np.concatenate([_load_column(part, "id") for part in current])
+                for path in covered:
+                    if _is_stored_in(path, merged_ids):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        logger.error(f"센서 보관소 : 병합 part에 없는 행이 있어 삭제하지 않음 - {path}")
+
+    if merged_days:
+        logger.info(f"센서 보관소 : {merged_days} 일 병합")
+    return merged_days, None, 200
+
+# 기간 데이터 조회 (메모리 매핑)
+def read_archive(start, end, columns=ARCHIVE_COLUMNS, max_rows=None):
+    """
+    start <= timestamp < end (datetime) 인 행을 컬럼별 배열로 반환 (DB 조회 없음)
+    columns : 읽을 컬럼 (timestamp는 항상 포함, 나머지 컬럼 파일은 읽지 않음)
+    max_rows : 초과 시 DBException(413)
+    반환 : {"timestamp": datetime64 배열, 컬럼: float32 배열, ...} (timestamp 순)
+    """
+    start64 = np.datetime64(start, "s")
+    end64 = np.datetime64(end, "s")
+
+    # 1) part별 범위 계산 (timestamp 파일만 읽음)
+    slices = []
+    day = start.date()
+    last_day = (end - timedelta(microseconds=1)).date()
+    while day <= last_day:
+        day_dir = ARCHIVE_DIR / day.isoformat()
+        if day_dir.is_dir():
+            for part in _list_parts(day_dir)[0]:
+                timestamps = _load_column(part, "timestamp")
+                lo, hi = np.searchsorted(timestamps, [start64, end64])
+                if hi > lo:
+                    slices.append((part, timestamps, lo, hi))
+        day += timedelta(days=1)
+
+    total = sum(hi - lo for _, _, lo, hi in slices)
+    if max_rows is not None and total > max_rows:
+        raise DBException(f"Sensor Archive : Too many rows ({total}, max {max_rows})", 413)
+
+    # 2) 필요한 컬럼의 해당 범위만 복사
+    if not slices:
+        return {name: np.array([], dtype=COLUMN_DTYPES[name]) for name in ("timestamp", *columns)}
+    result = {"timestamp": np.concatenate([timestamps[lo:hi] for _, timestamps, lo, hi in slices])}
+    for name in columns:
+        result[name] = np.concatenate([_load_column(part, name)[lo:hi] for part, _, lo, hi in slices])
+
+    if len(slices) > 1:
+        # 같은 행이 여러 part에 있으면 1행만 사용 (저장 후 DB 커밋 실패로 재실행되어 겹친 part)
+        ids = np.concatenate([_load_column(part, "id")[lo:hi] for part, _, lo, hi in slices])
+        _, unique_index = np.unique(ids, return_index=True)
+        if len(unique_index) < len(ids):
+            result = {name: values[np.sort(unique_index)] for name, values in result.items()}
+
+        # 늦게 수신된 데이터 part가 있으면 시간순 재정렬
+        if np.any(np.diff(result["timestamp"].astype(np.int64)) < 0):
+            order = np.argsort(result["timestamp"], kind="stable")
+            result = {name: values[order] for name, values in result.items()}
+    return result
+
+# 조회 조건 검사 및 변환
+def parse_archive_filters(args, now=None):
+    """
+    쿼리 파라미터(start, end, columns)를 검사해 변환
+    start/end : ISO 날짜 또는 날짜시간 (미지정 시 최근 24시간)
+    columns : 쉼표로 구분한 컬럼 (soc, solar_w, lux / 미지정 시 전체)
+    반환 : (filters, error) - 오류가 있으면 filters는 None
+    """
+    now = now or datetime.now()
+    try:
+        end = datetime.fromisoformat(args["end"]) if args.get("end") else now
+        start = datetime.fromisoformat(args["start"]) if args.get("start") else end - timedelta(hours=ARCHIVE_DEFAULT_HOURS)
+    except ValueError:
+        return None, "Invalid datetime format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"
+    if start >= end:
+        return None, "start must be before end"
+
+    columns = ARCHIVE_COLUMNS
+    if args.get("columns"):
+        columns = tuple(name.strip() for name in args["columns"].split(",") if name.strip())
+        invalid = [name for name in columns if name not in ARCHIVE_COLUMNS]
+        if invalid or not columns:
+            return None, f"Invalid columns ({', '.join(ARCHIVE_COLUMNS)})"
+
+    return {"start": start, "end": end, "columns": columns}, None
+
+# 기간 데이터 조회 (API 응답용)
+@handle_errors("Sensor Archive")
+def get_archive_range(filters):
+    """
+    반환 : {"start", "end", "count", "timestamp": [...], 컬럼: [...]} (컬럼별 배열, NULL은 None)
+    """
+    data = read_archive(filters["start"], filters["end"], filters["columns"], max_rows=ARCHIVE_MAX_ROWS)
+
+    result = {
+        "start": filters["start"].isoformat(),
+        "end": filters["end"].isoformat(),
+        "count": len(data["timestamp"]),
+        "timestamp": np.datetime_as_string(data["timestamp"], unit="s").tolist()
+    }
+    for name in filters["columns"]:
+        values = data[name].astype(np.float64).round(4)
+        result[name] = [None if value != value else value for value in values.tolist()]
+    return result, None, 200
+
+# 보관소 현황 조회
+def get_archive_stats():
+    """
+    저장된 날짜 수, part 수, 행 수, 디스크 사용량 반환
+    """
+    stats = {"enabled": ARCHIVE_ENABLED, "days": 0, "parts": 0, "rows": 0, "bytes": 0, "first_day": None, "last_day": None}
+    if not ARCHIVE_DIR.exists():
+        return stats
+
+    for day_dir in sorted(ARCHIVE_DIR.iterdir()):
+        if not day_dir.is_dir() or day_dir.name.startswith("."):
+            continue
+        parts, _ = _list_parts(day_dir)
+        if not parts:
+            continue
+        stats["days"] += 1
+        stats["parts"] += len(parts)
+        stats["first_day"] = stats["first_day"] or day_dir.name
+        stats["last_day"] = day_dir.name
+        for part in parts:
+            stats["rows"] += len(_load_column(part, "timestamp"))
+            stats["bytes"] += sum(path.stat().st_size for path in part.iterdir())
+    return stats
@@ -0,0 +1,179 @@
+from app.services.stream_service import add_event_listener
+from datetime import datetime
+import atexit
+import os
+import random
+import requests
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 아두이노 전송 설정
+ARDUINO_URL = os.getenv("ARDUINO_URL") # 릴레이 상태를 전송할 아두이노 주소 (미설정 시 전송 안 함)
+ARDUINO_TIMEOUT = float(os.getenv("ARDUINO_TIMEOUT", 5)) # 요청 1회 응답 대기 시간 (초)
+ARDUINO_MAX_RETRIES = int(os.getenv("ARDUINO_MAX_RETRIES", 5)) # 전송 실패 시 최대 재시도 횟수
+ARDUINO_RETRY_BASE = float(os.getenv("ARDUINO_RETRY_BASE", 0.5)) # 첫 재시도 대기 시간 (초, 실패할 때마다 2배)
+ARDUINO_RETRY_MAX = float(os.getenv("ARDUINO_RETRY_MAX", 30)) # 재시도 대기 시간 상한 (초)
+
+# 아두이노 명령 비동기 전송 클래스
+class ArduinoDispatcher:
+    """
+    요청 스레드 대신 백그라운드 스레드 1개가 아두이노로 명령 전송
+    - 연결 재사용 (requests.Session)
+    - 같은 장치에 전송 대기 중인 명령이 있으면 최신 명령으로 교체 (마지막 상태만 전송)
+    - 실패 시 지수 백오프로 재시도, 장치별 전송 결과 기록
+    """
+    def __init__(self, timeout, max_retries, retry_base, retry_max):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._jobs = {} # url -> {"data", "seq", "attempts", "next_at"}
+        self._status = {} # url -> 장치별 전송 결과
+        self._cond = threading.Condition()
+        self._session = requests.Session()
+        self._thread = None
+        self._closed = False
+        self._seq = 0
+        self._stats = {
+            "submitted": 0, # 접수된 명령 수
+            "coalesced": 0, # 최신 명령으로 교체되어 전송하지 않은 명령 수
+            "delivered": 0, # 전송 성공 수
+            "retries": 0, # 재시도 수
+            "failed": 0 # 재시도 횟수 초과로 포기한 명령 수
+        }
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="arduino-dispatcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, url, data):
+        """
+        명령 전송 예약 (바로 반환)
+        """
+        with self._cond:
+            if self._closed:
+                return False, "Arduino : Dispatcher closed", 503
+            self._seq += 1
+            self._stats["submitted"] += 1
+            if url in self._jobs:
+                self._stats["coalesced"] += 1
+            self._jobs[url] = {"data": data, "seq": self._seq, "attempts": 0, "next_at": 0.0}
+            status = self._status.setdefault(url, {"state": "pending", "attempts": 0, "last_error": None, "delivered_seq": None, "delivered_at": None})
+            status["state"] = "pending"
+            status["submitted_seq"] = self._seq
+            self._cond.notify()
+        return True, None, 202
+
+    def _next_job(self):
+        # 전송할 명령이 생길 때까지 대기 (종료 시 재시도 대기 무시)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = [url for url, job in self._jobs.items() if self._closed or job["next_at"] <= now]
+                if ready:
+                    url = min(ready, key=lambda key: self._jobs[key]["seq"])
+                    return url, self._jobs.pop(url)
+                if self._closed:
+                    return None, None
+                timeout = min(job["next_at"] for job in self._jobs.values()) - now if self._jobs else None
+                self._cond.wait(timeout)
+
+    def _deliver(self, url, data):
+        try:
+            response = self._session.post(url, json=data, timeout=self.timeout)
+            if response.status_code != 200:
+                return f"response error (status: {response.status_code})"
+        except requests.exceptions.Timeout:
+            return "timeout"
+        except requests.exceptions.ConnectionError:
+            return "connection failed"
+        except Exception as e:
+            return f"request error - {e}"
+        return None
+
+    def _run(self):
+        while True:
+            url, job = self._next_job()
+            if url is None:
+                return
+
+            job["attempts"] += 1
+            error = self._deliver(url, job["data"])
+
+            with self._cond:
+                status = self._status[url]
+                status["attempts"] = job["attempts"]
+                status["last_error"] = error
+                if error is None:
+                    self._stats["delivered"] += 1
+                    status["delivered_seq"] = job["seq"]
+                    status["delivered_at"] = datetime.now().isoformat(timespec="seconds")
+                    if url not in self._jobs:
+                        status["state"] = "delivered"
+                    continue
+
+                logger.error(f"아두이노 제어 : 전송 실패 ({url}, {job['attempts']}회) - {error}")
+                if url in self._jobs:
+                    # 실패 중에 새 명령이 들어오면 이전 명령은 재시도하지 않음
+                    self._stats["coalesced"] += 1
+                elif self._closed or job["attempts"] > self.max_retries:
+                    self._stats["failed"] += 1
+                    status["state"] = "failed"
+                else:
+                    # 지수 백오프 (+ 여러 장치가 동시에 재시도하지 않도록 지터)
+                    delay = min(self.retry_base * 2 ** (job["attempts"] - 1), self.retry_max)
+                    job["next_at"] = time.monotonic() + delay * random.uniform(0.5, 1.0)
+                    self._jobs[url] = job
+                    self._stats["retries"] += 1
+                    status["state"] = "retrying"
+
+    def close(self, timeout=10):
+        """
+        대기 중인 명령을 1회씩 전송 후 종료
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+        self._session.close()
+
+    def stats(self):
+        with self._cond:
+            result = dict(self._stats)
+            result["pending"] = len(self._jobs)
+            result["devices"] = {url: dict(status) for url, status in self._status.items()}
+        return result
+
+# 전역 아두이노 전송기
+arduino_dispatcher = ArduinoDispatcher(ARDUINO_TIMEOUT, ARDUINO_MAX_RETRIES, ARDUINO_RETRY_BASE, ARDUINO_RETRY_MAX)
+atexit.register(arduino_dispatcher.close)
+
+# 릴레이 상태 변경 시 아두이노로 전송
+def _on_event(event, data):
+    if event == "relay":
+        arduino_dispatcher.submit(ARDUINO_URL, data)
+
+# 아두이노 전송기 시작
+def start_arduino_dispatcher():
+    """
+    백그라운드 전송 스레드 시작
+    ARDUINO_URL 설정 시 릴레이 상태가 바뀔 때마다 아두이노로 전송 (아두이노의 /api/relay/control 조회와 함께 사용 가능)
+    """
+    arduino_dispatcher.start()
+    if ARDUINO_URL:
+        add_event_listener(_on_event)
+
+# 아두이노 전송 상태 조회
+def get_arduino_stats():
+    """
+    전송/재시도/실패 건수 및 장치별 마지막 전송 결과 반환
+    """
+    return arduino_dispatcher.stats()
@@ -1,7 +1,8 @@
-import traceback
 import json
 from pathlib import Path
-from itertools import combinations
+import logging
+
+logger = logging.getLogger(__name__)
 
 # config.json 불러오기
 CONFIG_PATH = Path(__file__).parent.parent / "config" / "config_arduino.json"
@@ -33,64 +34,207 @@ def _init_power(battery, power, channel_config=None, duration_minutes=None):
 
     # 총 가용 전력
     available_power = battery_w + power
-    print(f"\n배터리 잔량 : {battery} % \n실시간 생산량 : {power} W \n총 가용 전력({duration_minutes}분 기준) : {available_power:.2f} W")
+    logger.debug(f"배터리 잔량 : {battery} %, 실시간 생산량 : {power} W, 총 가용 전력({duration_minutes}분 기준) : {available_power:.2f} W")
 
     return available_power, channel_config, duration_minutes
 
+# 부동소수점 비교 허용 오차
+EPS = 1e-9
+
+# 동적 계획법에 사용할 전력 단위 및 최대 상태 수
+GRID_SCALES = (1, 10, 100, 1000)
+GRID_MAX_UNITS = 1_000_000
+
+# 소비 전력을 정수 단위로 변환 (모든 채널이 같은 소수점 단위일 때만)
+def _to_power_grid(powers, available_power):
+    for scale in GRID_SCALES:
+        units = [round(p * scale) for p in powers]
+        if all(abs(u - p * scale) <= EPS * scale for u, p in zip(units, powers)):
+            capacity = int(available_power * scale + EPS * scale)
+            if capacity > GRID_MAX_UNITS:
+                return None
+            return units, capacity
+    return None
+
+# 가중치가 없을 때 최적 조합 탐색 (채널 수별 도달 가능 전력 합 비트셋 DP)
+def _solve_by_power_grid(powers, k, available_power):
+    """
+    k개 채널로 만들 수 있는 전력 합 중 가용 전력 이하 최대값 탐색
+    reach[c]의 b번째 비트 = c개 채널로 전력 합 b(정수 단위) 도달 가능
+    반환값 : 선택한 채널 인덱스 리스트 (정수 단위 변환 불가 시 None)
+    """
+    grid = _to_power_grid(powers, available_power)
+    if grid is None:
+        return None
+    units, capacity = grid
+    mask = (1 << (capacity + 1)) - 1
+
+    # 채널별 처리 후 상태 기록 (역추적용)
+    reach = [1] + [0] * k
+    history = [reach]
+    for unit in units:
+        reach = list(reach)
+        for c in range(k, 0, -1):
+            reach[c] |= (reach[c - 1] << unit) & mask
+        history.append(reach)
+
+    # k개 채널로 도달 가능한 최대 전력 합
+    if reach[k] == 0:
+        return None
+    target, remaining = reach[k].bit_length() - 1, k
+
+    # 역추적 : 이전 상태에서 이미 도달 가능했다면 해당 채널 미선택
+    picked = []
+    for i in range(len(units), 0, -1):
+        if (history[i - 1][remaining] >> target) & 1:
+            continue
+        picked.append(i - 1)
+        target -= units[i - 1]
+        remaining -= 1
+    return picked
+
+# 최적 채널 조합 탐색 (분기 한정법)
+def _solve_optimal_channels(channel_config, available_power, channel_weights=None):
+    """
+    가용 전력 이내에서 최적 채널 조합 탐색
+    우선순위 : 채널 수 최대 -> 가치 합 최대 -> 소비 전력 합 최대
+    가치 = 채널 가중치(우선순위/단가, 기본 1) * 소비 전력 (가중치 미지정 시 소비 전력 최대와 동일)
+    전체 조합(2^n)을 만들지 않고, 가능한 최대 채널 수 k를 먼저 구한 뒤 k개 조합만 탐색
+    - 가중치가 모두 같으면 비트셋 DP (O(n * k * 전력 단위 / 워드 크기))
+    - 그 외에는 상한 조건으로 가지치기하는 분기 한정법
+    """
+    if channel_weights is None:
+        channel_weights = {}
+
+    items = []
+    for ch, ch_power in channel_config.items():
+        weight = channel_weights.get(ch, 1.0)
+        if ch_power < 0 or weight < 0:
+            raise ValueError("채널 설정값이 잘못되었습니다.")
+        items.append((ch, ch_power, weight * ch_power))
+
+    # 가능한 최대 채널 수 (소비 전력이 작은 채널부터 채울 때의 개수)
+    k, total = 0, 0.0
+    for ch_power in sorted(item[1] for item in items):
+        if total + ch_power > available_power + EPS:
+            break
+        total += ch_power
+        k += 1
+    if k == 0:
+        return []
+
+    # 가중치가 모두 같으면 가치 = 전력이므로 비트셋 DP로 정확하게 탐색
+    if len({round(item[2] / item[1], 9) for item in items if item[1] > 0}) <= 1:
+        picked = _solve_by_power_grid([item[1] for item in items], k, available_power)
+        if picked is not None:
+            chosen = {items[i][0] for i in picked}
+            return [ch for ch in channel_config if ch in chosen]
+
+    # 가치 내림차순 정렬 (앞에서부터 r개 선택이 가치 상한)
+    items.sort(key=lambda item: (item[2], item[1]), reverse=True)
+    n = len(items)
+    powers = [item[1] for item in items]
+    values = [item[2] for item in items]
+
+    # 위치 i 이후 채널의 최대 가중치 (남은 전력 1W당 얻을 수 있는 최대 가치)
+    max_weight = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        ratio = values[i] / powers[i] if powers[i] > 0 else 0.0
+        max_weight[i] = max(max_weight[i + 1], ratio)
+
+    # 가치 누적합 (i번째부터 r개 가치 합 = value_prefix[i + r] - value_prefix[i])
+    value_prefix = [0.0]
+    for value in values:
+        value_prefix.append(value_prefix[-1] + value)
+
+    # 위치 i 이후 채널 중 r개를 고를 때 최소/최대 전력 합
+    min_power_sum, max_power_sum = [], []
+    for i in range(n + 1):
+        suffix = sorted(powers[i:])
+        ascending, descending = [0.0], [0.0]
+        for j in range(len(suffix)):
+            ascending.append(ascending[-1] + suffix[j])
+            descending.append(descending[-1] + suffix[-1 - j])
+        min_power_sum.append(ascending)
+        max_power_sum.append(descending)
+
+    best = {"value": -1.0, "power": -1.0, "picked": None}
+    picked = []
+
+    def search(i, remaining, cur_power, cur_value):
+        if remaining == 0:
+            better = cur_value > best["value"] + EPS or (
+                cur_value >= best["value"] - EPS and cur_power > best["power"] + EPS
+            )
+            if better or best["picked"] is None:
+                best.update(value=cur_value, power=cur_power, picked=list(picked))
+            return
+        if n - i < remaining:
+            return
+        # 남은 채널로 가용 전력을 지킬 수 없으면 중단
+        if cur_power + min_power_sum[i][remaining] > available_power + EPS:
+            return
+        # 상한이 현재 최적보다 나을 수 없으면 중단
+        bound_value = min(
+            cur_value + value_prefix[i + remaining] - value_prefix[i],
+            cur_value + max_weight[i] * (available_power - cur_power)
+        )
+        bound_power = min(available_power, cur_power + max_power_sum[i][remaining])
+        if best["picked"] is not None:
+            if bound_value < best["value"] - EPS:
+                return
+            if bound_value <= best["value"] + EPS and bound_power <= best["power"] + EPS:
+                return
+
+        # i번째 채널 선택
+        if cur_power + powers[i] <= available_power + EPS:
+            picked.append(i)
+            search(i + 1, remaining - 1, cur_power + powers[i], cur_value + values[i])
+            picked.pop()
+        # i번째 채널 미선택
+        search(i + 1, remaining, cur_power, cur_value)
+
+    search(0, k, 0.0, 0.0)
+
+    # 설정 파일 순서대로 반환
+    chosen = {items[i][0] for i in best["picked"]}
+    return [ch for ch in channel_config if ch in chosen]
+
 # 최적 판매 조합 추천 함수
-def get_optimal_combination(battery, power, channel_config=None, duration_minutes=None):
+def get_optimal_combination(battery, power, channel_config=None, duration_minutes=None, channel_weights=None):
     """
     매개변수
     battery : 배터리 저장 전력 %
     power : 실시간 생산 전력
     channel_config : 각 채널별 소비 전력
     duration_minutes : 유지 시간
+    channel_weights : 채널별 우선순위/단가 가중치 (미지정 시 config의 channel_weights, 없으면 모두 1)
     """
     try:
         # 공통 로직 함수 불러오기
         available_power, channel_config, _ = _init_power(battery, power, channel_config, duration_minutes)
 
-        # 모든 조합 생성
-        channels = [ch for ch in config["channel_config"]]
-        all_combinations = []
-
-        # 1개 ~ 4개 조합 생성
-        for i in range(1, len(channels) + 1):
-            for combi in combinations(channels, i):
-                all_combinations.append(list(combi))
-
-        # 유효 조합
-        valid_combinations = []
-
-        for combi in all_combinations:
-            # 조합의 총 소비 전력 계산
-            total_power = sum(channel_config[ch] for ch in combi)
-
-            # 현재 가용 전력으로 사용 가능한지 확인
-            if total_power <= available_power:
-                valid_combinations.append({
-                    "channels": combi,
-                    "power": total_power
-                })
-        print(f"\n유효 조합 수 : {len(valid_combinations)} 개")
-
-        # 최적 조합 선택 (가장 많은 채널 활성화 -> 더 큰 전력 소비 기준)
-        if not valid_combinations:
-            print("\n최적 조합 추천 : 판매 가능한 채널이 없습니다.")
+        # 채널별 가중치 설정
+        if channel_weights is None:
+            channel_weights = config.get("channel_weights")
+
+        # 최적 조합 선택 (가장 많은 채널 활성화 -> 더 큰 가치 -> 더 큰 전력 소비 기준)
+        best = _solve_optimal_channels(channel_config, available_power, channel_weights)
+
+        if not best:
+            logger.info("최적 조합 추천 : 판매 가능한 채널이 없습니다.")
             return [], None, 200
 
-        best = max(valid_combinations, key=lambda x: (len(x["channels"]), x["power"]))
-        print(f"\n최적 판매 조합 : {best['channels']}")
+        logger.debug(f"최적 판매 조합 : {best}")
 
-        return best["channels"], None, 200
+        return best, None, 200
 
     except ValueError as e:
-        print(f"\n최적 조합 추천 : 입력값 오류 - {e}")
+        logger.warning(f"최적 조합 추천 : 입력값 오류 - {e}")
         return None, str(e), 400
 
     except Exception as e:
-        print(f"\n최적 조합 추천 : 오류 - {e}")
-        traceback.print_exc()
+        logger.exception(f"최적 조합 추천 : 오류 - {e}")
         return None, "Channels : Internal server error", 500
 
 # 실시간 선택 가능 채널 확인 및 배터리 보호 함수
@@ -113,7 +257,7 @@ def get_available_channels(battery, power, selected_channels=[], channel_config=
             battery_protection_threshold = config["battery_protection_threshold"]
 
         if battery < battery_protection_threshold:
-            print(f"\n배터리 잔량이 {battery_protection_threshold} % 미만이므로 판매가 불가합니다.")
+            logger.info(f"배터리 잔량이 {battery_protection_threshold} % 미만이므로 판매가 불가합니다.")
             return {
                 "A": False,
                 "B": False,
@@ -124,11 +268,11 @@ def get_available_channels(battery, power, selected_channels=[], channel_config=
         # 이미 선택된 채널 전력 계산
         selected_power = sum(channel_config[ch] for ch in selected_channels)
         if selected_channels:
-            print(f"\n현재 판매중인 채널 : {selected_channels}\n소비중인 전력 : {selected_power:.2f} W")
+            logger.debug(f"현재 판매중인 채널 : {selected_channels}, 소비중인 전력 : {selected_power:.2f} W")
 
         # 남은 전력
         remaining_power = available_power - selected_power
-        print(f"\n현재 가용 전력({duration_minutes}분 기준) : {remaining_power:.2f} W")
+        logger.debug(f"현재 가용 전력({duration_minutes}분 기준) : {remaining_power:.2f} W")
 
         # 결과 딕셔너리 반환
         result = {}
@@ -138,15 +282,14 @@ def get_available_channels(battery, power, selected_channels=[], channel_config=
                 result[key] = False
             else:
                 result[key] = value <= remaining_power
-        print(f"\n판매 가능 채널 : {[ch for ch, val in result.items() if val]}")
+        logger.debug(f"판매 가능 채널 : {[ch for ch, val in result.items() if val]}")
 
         return result, None, 200
 
     except ValueError as e:
-        print(f"\n판매 가능 채널 조회 : 입력값 오류 - {e}")
+        logger.warning(f"판매 가능 채널 조회 : 입력값 오류 - {e}")
         return None, "Channels : Invalid input values", 400
 
     except Exception as e:
-        print(f"\n판매 가능 채널 조회 : 오류 - {e}")
-        traceback.print_exc()
+        logger.exception(f"판매 가능 채널 조회 : 오류 - {e}")
         return None, "Channels : Internal server error", 500
\ No newline at end of file
@@ -1,8 +1,12 @@
 import json
 from pathlib import Path
 from app.db import get_connection, close_connection
+from app.services.metrics_service import DB_TRANSACTION_LATENCY, DB_ROWS_RETURNED, DB_TRANSACTION_ERRORS
 from contextlib import contextmanager
-import traceback
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 # Config channel_config 데이터 접근
 try:
@@ -10,7 +14,7 @@ try:
     with open(CONFIG_PATH, "r") as f:
         CHANNEL_CONFIG = json.load(f)["channel_config"]
 except Exception as e:
-    print(f"\nconfig 읽기 오류 - {e}")
+    logger.error(f"config 읽기 오류 - {e}")
     CHANNEL_CONFIG = {}
 
 # 채널명을 buyer_id로 변환
@@ -42,37 +46,77 @@ def handle_errors(context): # 데코레이터 생성
             except DBException as e:
                 return False, e.message, e.status_code
             except Exception as e:
-                print(f"\n{context} : 오류 - {e}")
-                traceback.print_exc()
+                logger.exception(f"{context} : 오류 - {e}")
                 return False, f"{context} : Internal server error", 500
         return wrapper
     return decorator
 
+# 조회 행 수를 세는 커서 래퍼 (db_rows_returned 지표용)
+class _RowCountingCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.rows_returned = 0
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self.rows_returned += 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._cursor.fetchmany(size)
+        self.rows_returned += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self.rows_returned += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
 # DB 연결 함수
 @contextmanager
 def db_transaction():
     """
     DB 연결 및 종료 처리
+    소요 시간, 조회 행 수, 실패 횟수를 지표로 기록
     """
     # DB에서 데이터 조회
+    start = time.perf_counter()
     conn, cursor = None, None
+    counting_cursor = None
+    broken = False
+    failed = False
     try:
         conn, cursor = get_connection()
         if conn is None:
-            print("\nDB 연결 실패")
+            failed = True
+            logger.error("DB 연결 실패")
             raise DBException("Database Error : Connection failed", 503)
+        counting_cursor = _RowCountingCursor(cursor)
         # 함수 일시 정지(with as로 변수 전달)
-        yield conn, cursor 
+        yield conn, counting_cursor
         # 항상 커밋 실행
         conn.commit()
     # 에러 발생 시 내용 catch
     except DBException:
         raise
     except Exception as e:
-        print(f"\nDB 오류 : {e}")
+        failed = True
+        logger.error(f"DB 오류 : {e}")
         if conn:
-            conn.rollback() # 에러 발생 시 롤백
+            try:
+                conn.rollback() # 에러 발생 시 롤백
+            except Exception:
+                broken = True # 롤백 불가 연결은 풀에서 폐기
         raise DBException(f"Database Error : {e}", 500)
 
     finally:
-        close_connection(conn, cursor)
\ No newline at end of file
+        close_connection(conn, cursor, discard=broken)
+        DB_TRANSACTION_LATENCY.observe(time.perf_counter() - start)
+        if counting_cursor is not None:
+            DB_ROWS_RETURNED.observe(counting_cursor.rows_returned)
+        if failed:
+            DB_TRANSACTION_ERRORS.inc()
@@ -1,26 +1,192 @@
 from app.services.common_service import db_transaction, handle_errors
-import traceback, pickle
+from app.services.sensor_service import get_latest_sensor_data
+from app.services.stream_service import add_event_listener
+from app.services.forest_service import CompactForest
+from app.services.feature_service import feature_store
+from app.services.metrics_service import MODEL_INFERENCE_LATENCY
+import math
+import pickle, os
+import threading
+import time
 import numpy as np
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from pathlib import Path
-from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
 
 # 모델 불러오기
 MODEL_PATH = Path(__file__).parent.parent.parent.parent / "models" / "rf_production_model.pkl"
+# 압축 포레스트 (forest_service로 변환한 배열 파일, 있으면 우선 사용)
+COMPACT_MODEL_PATH = MODEL_PATH.with_name("rf_production_model_compact")
+# 추론 엔진 선택 (compact : 압축 포레스트 우선 / sklearn : pickle 모델만 사용)
+FOREST_ENGINE = os.getenv("FOREST_ENGINE", "compact")
 
-# 모델 사용시에만 로드
-@lru_cache(maxsize=1)
-def _load_model():
+# 재학습 모델 저장 경로 (버전별 디렉토리 + 현재 버전 파일)
+RETRAINED_MODEL_DIR = Path(os.getenv("RETRAIN_DIR", str(MODEL_PATH.parent / "retrained")))
+CURRENT_MODEL_FILE = RETRAINED_MODEL_DIR / "current"
+# 다른 워커 프로세스가 교체한 모델 확인 주기 (초)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", 60))
+
+# 현재 사용 모델 (model, version) - 교체 시 튜플 전체를 바꾸므로 요청은 시작 시점의 모델을 끝까지 사용
+_model_lock = threading.Lock()
+_current_model = None
+_model_checked_at = 0.0
+
+# 재학습 모델 현재 버전 조회
+def read_current_version():
+    try:
+        return CURRENT_MODEL_FILE.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+# 저장된 모델 로드 (재학습 모델 > 압축 포레스트 > pickle 순)
+def _load_stored_model():
     """
-    모델 사용시에만 최초 1회만 로드 진행
-    @lru_cache으로 모델 로드 캐시 저장
+    압축 포레스트는 메모리 매핑으로 로드 (pickle 해제 없이 빠른 시작, 워커 간 메모리 공유)
+    반환 : (model, version)
     """
+    version = read_current_version()
+    if version and (RETRAINED_MODEL_DIR / version / "meta.json").exists():
+        logger.info(f"모델 예측 : 재학습 모델 로드 성공 ({version})")
+        return CompactForest.load(RETRAINED_MODEL_DIR / version), version
+
+    if FOREST_ENGINE == "compact" and (COMPACT_MODEL_PATH / "meta.json").exists():
+        logger.info("모델 예측 : 압축 포레스트 로드 성공")
+        return CompactForest.load(COMPACT_MODEL_PATH), "base"
+
     if not MODEL_PATH.exists():
-        print("\n모델 예측 : 모델 파일 없음")
+        logger.warning("모델 예측 : 모델 파일 없음")
         raise FileNotFoundError("Model Prediction : Model not found")
     
     with open(MODEL_PATH, "rb") as f:
-        print("\n모델 예측 : 모델 로드 성공\n")
-        return pickle.load(f)
+        logger.info("모델 예측 : 모델 로드 성공")
+        return pickle.load(f), "base"
+
+# 현재 모델 조회
+def get_current_model():
+    """
+    모델 사용시에만 최초 1회 로드
+    MODEL_RELOAD_INTERVAL 마다 현재 버전 파일을 확인해 다른 프로세스에서 교체한 모델 반영
+    반환 : (model, version)
+    """
+    global _current_model, _model_checked_at
+    current = _current_model
+    now = time.monotonic()
+    if current is not None and now - _model_checked_at < MODEL_RELOAD_INTERVAL:
+        return current
+
+    with _model_lock:
+        if _current_model is None:
+            _current_model = _load_stored_model()
+        elif now - _model_checked_at >= MODEL_RELOAD_INTERVAL:
+            version = read_current_version()
+            if version and version != _current_model[1] and (RETRAINED_MODEL_DIR / version / "meta.json").exists():
+                _current_model = (CompactForest.load(RETRAINED_MODEL_DIR / version), version)
+                forecast_cache.clear()
+                logger.info(f"모델 예측 : 재학습 모델 반영 ({version})")
+        _model_checked_at = now
+        return _current_model
+
+def _load_model():
+    return get_current_model()[0]
+
+# 사용 모델 교체 (재학습 완료 시)
+def set_model(model, version):
+    """
+    진행 중인 요청은 기존 모델로 끝나고, 이후 요청부터 새 모델 사용 (중단 없음)
+    """
+    global _current_model, _model_checked_at
+    with _model_lock:
+        _current_model = (model, version)
+        _model_checked_at = time.monotonic()
+    forecast_cache.clear()
+    logger.info(f"모델 예측 : 모델 교체 ({version})")
+
+# 예측 결과 캐시 설정
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", 300)) # 캐시 유효 시간 (초)
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", 128)) # 최대 저장 개수
+
+# 예측 결과 캐시 클래스
+class ForecastCache:
+    """
+    TTL + 크기 제한(LRU) 예측 결과 캐시
+    새 센서 데이터가 들어오면 전체 무효화
+    """
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict() # key -> (저장 시각, 결과)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self._entries.clear()
+                self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+            result["size"] = len(self._entries)
+        result["max_size"] = self.max_size
+        result["ttl"] = self.ttl
+        return result
+
+# 전역 예측 결과 캐시
+forecast_cache = ForecastCache(FORECAST_CACHE_TTL, FORECAST_CACHE_SIZE)
+
+# 새 센서 데이터 수신 시 예측 결과 캐시 무효화
+def _on_event(event, _):
+    if event == "sensor":
+        forecast_cache.clear()
+
+add_event_listener(_on_event)
+
+# 일괄 예측 최대 행 수
+FORECAST_BATCH_MAX = int(os.getenv("FORECAST_BATCH_MAX", 50000))
+
+# 예측 구간 분위수 (백분위, interval 모드 기본값)
+FORECAST_QUANTILES = tuple(float(q) for q in os.getenv("FORECAST_QUANTILES", "10,50,90").split(","))
+FORECAST_MAX_QUANTILES = 9 # 요청 가능한 최대 분위수 개수
+
+# 모델 입력 특성 순서
+FEATURE_COLUMNS = [
+    "year", "month", "day", "time",
+    "generation", "prev_generation",
+    "yesterday_generation", "insolation"
+]
+
+# 숫자 입력값 검사 (bool, 문자열, NaN/inf 제외)
+def _is_number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
 
 # lux -> 일사량 변환
 def lux_to_insolation(lux):
@@ -28,96 +194,225 @@ def lux_to_insolation(lux):
     mj = wm2 * 0.0036
     return mj
 
+# 예측 결과 딕셔너리 생성 (1h/2h/3h)
+def _to_result(y_row):
+    return {
+        "1h": round(float(y_row[0]), 2),
+        "2h": round(float(y_row[1]), 2),
+        "3h": round(float(y_row[2]), 2)
+    }
+
+# 분위수 결과 딕셔너리 생성 ({"1h": {"p10": .., "p50": .., "p90": ..}, ...})
+def _to_quantile_result(quantiles, q_row):
+    """
+    q_row : (분위수 개수, 3) - 분위수별 1h/2h/3h 값
+    """
+    return {
+        horizon: {f"p{q:g}": round(float(q_row[i][h]), 2) for i, q in enumerate(quantiles)}
+        for h, horizon in enumerate(("1h", "2h", "3h"))
+    }
+
+# 분위수 조회 조건 검사 및 변환
+def parse_quantiles(value):
+    """
+    value : 쉼표로 구분한 백분위 (예 : "10,50,90", 미지정 시 FORECAST_QUANTILES)
+    반환 : (quantiles, error) - 오름차순 튜플, 오류가 있으면 quantiles는 None
+    """
+    if not value:
+        return FORECAST_QUANTILES, None
+    try:
+        quantiles = tuple(sorted({float(q) for q in value.split(",") if q.strip()}))
+    except ValueError:
+        return None, "Invalid quantiles (comma separated percentiles, e.g. 10,50,90)"
+    if not quantiles or len(quantiles) > FORECAST_MAX_QUANTILES or not all(0 <= q <= 100 for q in quantiles):
+        return None, f"Invalid quantiles (1 ~ {FORECAST_MAX_QUANTILES} percentiles between 0 and 100)"
+    return quantiles, None
+
+# 분위수 계산용 압축 포레스트 (pickle 모델은 최초 1회 변환 후 재사용)
+_interval_forest = (None, None)
+
+def _get_interval_forest(model):
+    global _interval_forest
+    if hasattr(model, "predict_interval"):
+        return model
+    source, forest = _interval_forest
+    if source is not model:
+        forest = CompactForest.from_model(model)
+        _interval_forest = (model, forest)
+    return forest
+
 # 모델 예측용 데이터 조회
 @handle_errors("Model Prediction")
 def get_latest_sensor_data_for_model():
     """
-    DB에서 모델 예측용 최신 태양광 데이터 조회
+    모델 예측용 최신 태양광 데이터 조회
+    특성 저장소(센서 수신/시간별 집계 시 갱신)를 우선 사용하고, 비어있으면 DB 단일 쿼리로 조회
     """
+    now = datetime.now()
+
+    # 특성 저장소에서 O(1) 조회 (센서 캐시의 최신 시각과 비교해 뒤처졌으면 사용 안 함)
+    sensor_data, _, _ = get_latest_sensor_data()
+    latest_timestamp = sensor_data["timestamp"] if sensor_data else None
+    feature_row = feature_store.get_feature_row(now, latest_timestamp)
+    if feature_row is not None:
+        return feature_row, None, 200
+
+    # 저장소가 비어있을 때 : 단일 쿼리로 조회
     with db_transaction() as (_, cursor):
-        # 현재 데이터(year, month, day, time, generation, lux)
-        sql_current = """
+        yesterday = now - timedelta(days=1)
+        sql = """
             SELECT
-                YEAR(timestamp) as year,
-                MONTH(timestamp) as month,
-                DAY(timestamp) as day,
-                HOUR(timestamp) as time,
+                timestamp,
                 solar_w as generation,
-                lux
+                lux,
+                (SELECT solar_w
+                 FROM sun_data_realtime
+                 WHERE timestamp <= %s
+                 ORDER BY timestamp DESC
+                 LIMIT 1) as prev_generation,
+                (SELECT avg_solar_w
+                 FROM sun_data_hourly
+                 WHERE date = %s AND hour = %s
+                 LIMIT 1) as yesterday_generation
             FROM sun_data_realtime
             ORDER BY timestamp DESC
             LIMIT 1
         """
-        cursor.execute(sql_current)
-        current_data = cursor.fetchone()
+        cursor.execute(sql, (now - timedelta(hours=1), yesterday.date(), now.hour))
+        row = cursor.fetchone()
 
-        # 1시간 전 데이터(prev_generation)
-        sql_prev = """
-            SELECT solar_w
-            FROM sun_data_realtime
-            WHERE timestamp <= NOW() - INTERVAL 1 HOUR
-            ORDER BY timestamp DESC
-            LIMIT 1
-        """
-        cursor.execute(sql_prev)
-        prev_data = cursor.fetchone()
-
-        # 24시간 전 데이터(yesterday_generation)
-        sql_yesterday = """
-            SELECT avg_solar_w
-            FROM sun_data_hourly
-            WHERE date = CURDATE() - INTERVAL 1 DAY
-            AND hour = HOUR(NOW())
-            LIMIT 1
-        """
-        cursor.execute(sql_yesterday)
-        yesterday_data = cursor.fetchone()
+    # 데이터 확인
+    if not row or row["prev_generation"] is None or row["yesterday_generation"] is None:
+        logger.warning("모델 예측 : 데이터가 존재하지 않습니다.")
+        return None, "Model Prediction : Data not found", 404
 
-        # 데이터 확인
-        if not current_data or not prev_data or not yesterday_data:
-            print("모델 예측 : 데이터가 존재하지 않습니다.")
-            return None, "Model Prediction : Data not found", 404
-        
-        # 데이터 결합
-        current_data["prev_generation"] = prev_data["solar_w"]
-        current_data["yesterday_generation"] = yesterday_data["avg_solar_w"]
-
-        return current_data, None, 200
+    # 시간 정보는 Python에서 계산
+    timestamp = row["timestamp"]
+    return {
+        "year": timestamp.year,
+        "month": timestamp.month,
+        "day": timestamp.day,
+        "time": timestamp.hour,
+        "generation": row["generation"],
+        "lux": row["lux"],
+        "prev_generation": row["prev_generation"],
+        "yesterday_generation": row["yesterday_generation"]
+    }, None, 200
 
 # 예측 모델 실행
-def predict_solar_generation(data):
+def predict_solar_generation(data, quantiles=None):
     """
     발전량 예측 모델 실행
+    quantiles : 백분위 목록 (지정 시 트리별 예측값 분포의 분위수를 "quantiles"에 추가)
     """
     try:
         # 일사량 데이터로 변환
         data["insolation"] = lux_to_insolation(data["lux"])
         del data["lux"]
 
-        # 모델 예측
-        model = _load_model()
+        # 모델 예측 (교체 중에도 같은 모델과 버전 사용)
+        model, version = get_current_model()
 
-        X = np.array([[
-            data["year"], data["month"], data["day"], data["time"],
-            data["generation"], data["prev_generation"],
-            data["yesterday_generation"], data["insolation"]
-        ]])
+        X = np.array([[data[col] for col in FEATURE_COLUMNS]])
 
-        y = model.predict(X)
+        if quantiles:
+            # 모든 트리의 리프 값을 한 번에 구해 평균과 분위수 계산
+            forest = _get_interval_forest(model)
+            with MODEL_INFERENCE_LATENCY.time(mode="interval"):
+                y, y_quantiles = forest.predict_interval(X, quantiles)
+        else:
+            with MODEL_INFERENCE_LATENCY.time(mode="single"):
+                y = model.predict(X)
 
         # 결과 출력 딕셔너리 생성
         # y shape : (1, 3) - 첫 번째 차원은 샘플, 두 번째는 1h/2h/3h 예측
-        result = {
-            "1h": round(float(y[0][0]), 2),
-            "2h": round(float(y[0][1]), 2),
-            "3h": round(float(y[0][2]), 2)
-        }
+        result = _to_result(y[0])
+        if quantiles:
+            # y_quantiles shape : (분위수 개수, 1, 3)
+            result["quantiles"] = _to_quantile_result(quantiles, y_quantiles[:, 0])
+        result["model_version"] = version
 
         # 결과 반환
-        print(f"\n모델 예측 : 성공 - {result}")
+        logger.debug(f"모델 예측 : 성공 - {result}")
         return result, None, 200
     
     except Exception as e:
-        print(f"\n모델 예측 : 오류 - {e}")
-        traceback.print_exc()
-        return None, "Model Prediction : Prediction failed", 500
\ No newline at end of file
+        logger.exception(f"모델 예측 : 오류 - {e}")
+        return None, "Model Prediction : Prediction failed", 500
+
+# 여러 행 일괄 예측
+def predict_solar_generation_batch(rows):
+    """
+    여러 시점/사이트의 특성 행을 하나의 행렬로 만들어 한 번에 예측
+    rows : FEATURE_COLUMNS 값을 가진 딕셔너리 리스트 (insolation 대신 lux 가능)
+    반환값 : ({"predictions": 입력 순서와 같은 순서의 1h/2h/3h 예측 리스트, "model_version": 모델 버전}, message, status_code)
+    """
+    # 입력값 검사 및 특성 행렬 생성 (한 번에 처리)
+    X = np.empty((len(rows), len(FEATURE_COLUMNS)), dtype=np.float64)
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            return None, f"Model Prediction : Invalid row format (index {index})", 400
+        values = []
+        for col in FEATURE_COLUMNS:
+            value = row.get(col)
+            # insolation이 없으면 lux에서 변환 (변환 전에 lux 값 검사)
+            if col == "insolation" and value is None and row.get("lux") is not None:
+                if not _is_number(row["lux"]):
+                    return None, f"Model Prediction : Invalid 'lux' (index {index})", 400
+                value = lux_to_insolation(row["lux"])
+            if not _is_number(value):
+                return None, f"Model Prediction : Invalid '{col}' (index {index})", 400
+            values.append(value)
+        X[index] = values
+
+    try:
+        model, version = get_current_model()
+
+        # 행렬 전체를 한 번의 predict 호출로 예측
+        with MODEL_INFERENCE_LATENCY.time(mode="batch"):
+            y = model.predict(X)
+
+        result = [_to_result(y_row) for y_row in y]
+        logger.debug(f"모델 일괄 예측 : 성공 - {len(result)} 건")
+        return {"predictions": result, "model_version": version}, None, 200
+
+    except Exception as e:
+        logger.exception(f"모델 일괄 예측 : 오류 - {e}")
+        return None, "Model Prediction : Prediction failed", 500
+
+# 최신 데이터 기준 발전량 예측 (캐시 사용)
+def get_forecast(quantiles=None):
+    """
+    최신 센서 데이터 기준 1h/2h/3h 발전량 예측
+    quantiles : 지정 시 1h/2h/3h 별 분위수 포함 (interval 모드)
+    최신 데이터 시각 + 현재 시(hour) + 분위수가 같으면 DB 조회와 모델 실행 없이 캐시 결과 반환
+    """
+    # 캐시 키 : 최신 센서 데이터 시각 (센서 캐시에서 조회) + 현재 시간대 + 분위수
+    sensor_data, _, _ = get_latest_sensor_data()
+    key = None
+    if sensor_data:
+        key = (sensor_data["timestamp"], datetime.now().replace(minute=0, second=0, microsecond=0), quantiles)
+        cached = forecast_cache.get(key)
+        if cached is not None:
+            return cached, None, 200
+
+    # 모델 예측용 데이터 조회
+    data, message, status_code = get_latest_sensor_data_for_model()
+    if not data:
+        return None, message, status_code
+
+    # 모델 예측
+    result, message, status_code = predict_solar_generation(data, quantiles)
+    if result is None:
+        return None, message, status_code
+
+    if key is not None:
+        forecast_cache.put(key, result)
+    return result, None, status_code
+
+# 예측 결과 캐시 통계 조회
+def get_forecast_cache_stats():
+    """
+    예측 결과 캐시 hit/miss 및 크기 반환
+    """
+    return forecast_cache.stats()
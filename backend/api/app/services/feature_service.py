@@ -0,0 +1,142 @@
+from app.services.common_service import db_transaction, handle_errors
+from bisect import insort
+from collections import deque
+from datetime import timedelta
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 모델 특성 계산 기준
+PREV_INTERVAL = timedelta(hours=1) # prev_generation : 1시간 전 발전량
+HOURLY_KEEP_DAYS = 2 # 보관할 시간별 평균 일수
+READINGS_MARGIN = timedelta(minutes=5) # 추가 시 정리 기준 여유 (보드 시계가 서버보다 빠른 경우 대비)
+
+# 모델 예측용 특성 저장소 클래스
+class FeatureStore:
+    """
+    모델 입력 특성 행을 O(1)로 만들기 위한 프로세스 내부 저장소
+    - readings : 최근 1시간(+ 기준 시각 직전 1건) 센서 데이터 (timestamp 오름차순)
+    - hourly : 최근 시간별 평균 발전량 {(date, hour): avg_solar_w}
+    센서 수신 경로와 시간별 집계 작업이 갱신
+    """
+    def __init__(self):
+        self._readings = deque() # (timestamp, solar_w, lux)
+        self._hourly = {}
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    def record_reading(self, timestamp, solar_w, lux):
+        """
+        센서 데이터 1건 추가 (늦게 들어온 데이터는 정렬 위치에 삽입)
+        추가할 때마다 보관 구간(최신 데이터 기준 1시간 + 여유 + 직전 1건)으로 정리해 크기 유지
+        """
+        with self._lock:
+            item = (timestamp, solar_w, lux)
+            if not self._readings or timestamp >= self._readings[-1][0]:
+                self._readings.append(item)
+            elif timestamp < self._readings[0][0]:
+                # 보관 구간보다 오래된 데이터 : 기준 시각 이전 데이터가 이미 있으면 필요 없음
+                if self._readings[0][0] <= self._readings[-1][0] - PREV_INTERVAL - READINGS_MARGIN:
+                    return
+                self._readings.appendleft(item)
+            else:
+                # 보관 구간 안에서만 삽입하므로 비용은 구간 크기로 제한
+                insort(self._readings, item)
+            self._trim_readings(self._readings[-1][0] - READINGS_MARGIN)
+
+    def seed(self, readings, hourly):
+        """
+        DB 조회 결과로 저장소 초기화
+        """
+        with self._lock:
+            seeded = sorted(readings)
+            # 조회 이후 기록된 데이터는 유지
+            if seeded:
+                seeded += [item for item in self._readings if item[0] > seeded[-1][0]]
+            self._readings = deque(seeded)
+            if seeded:
+                self._trim_readings(seeded[-1][0] - READINGS_MARGIN)
+            self._hourly = dict(hourly)
+            self._seeded = True
+
+    def _trim_readings(self, now):
+        # 기준 시각(now - 1시간) 이전 데이터는 가장 최근 1건만 유지
+        boundary = now - PREV_INTERVAL
+        while len(self._readings) >= 2 and self._readings[1][0] <= boundary:
+            self._readings.popleft()
+
+    def _trim(self, now):
+        self._trim_readings(now)
+        # 오래된 시간별 평균 제거
+        oldest = now.date() - timedelta(days=HOURLY_KEEP_DAYS)
+        if len(self._hourly) > HOURLY_KEEP_DAYS * 24 + 24:
+            self._hourly = {key: value for key, value in self._hourly.items() if key[0] >= oldest}
+
+    def get_feature_row(self, now, latest_timestamp=None):
+        """
+        모델 입력 특성 행 반환 (필요한 데이터가 없으면 None)
+        latest_timestamp : 다른 경로(센서 캐시)에서 확인한 최신 데이터 시각, 저장소가 뒤처졌는지 확인용
+        """
+        with self._lock:
+            if not self._seeded or not self._readings:
+                return None
+            self._trim(now)
+
+            latest_ts, generation, lux = self._readings[-1]
+            # 다른 워커가 저장한 데이터가 반영되지 않은 경우
+            if latest_timestamp is not None and latest_timestamp > latest_ts:
+                return None
+
+            prev_ts, prev_generation, _ = self._readings[0]
+            if prev_ts > now - PREV_INTERVAL:
+                return None
+
+            yesterday = now - timedelta(days=1)
+            yesterday_generation = self._hourly.get((yesterday.date(), now.hour))
+            if yesterday_generation is None:
+                return None
+
+        return {
+            "year": latest_ts.year,
+            "month": latest_ts.month,
+            "day": latest_ts.day,
+            "time": latest_ts.hour,
+            "generation": generation,
+            "lux": lux,
+            "prev_generation": prev_generation,
+            "yesterday_generation": yesterday_generation
+        }
+
+# 전역 특성 저장소
+feature_store = FeatureStore()
+
+# DB에서 특성 저장소 채우기
+@handle_errors("Feature Store")
+def warm_feature_store(now):
+    """
+    최근 1시간 센서 데이터와 최근 시간별 평균으로 특성 저장소 초기화
+    서버 시작 시와 시간별 집계 작업 후 실행
+    """
+    with db_transaction() as (_, cursor):
+        # 기준 시각 직전 1건 + 이후 데이터
+        sql_readings = """
+            SELECT timestamp, solar_w, lux
+            FROM sun_data_realtime
+            WHERE timestamp >= COALESCE(
+                (SELECT MAX(timestamp) FROM sun_data_realtime WHERE timestamp <= %s), %s
+            )
+            ORDER BY timestamp
+        """
+        boundary = now - PREV_INTERVAL
+        cursor.execute(sql_readings, (boundary, boundary))
+        readings = [(row["timestamp"], row["solar_w"], row["lux"]) for row in cursor.fetchall()]
+
+        # 최근 시간별 평균
+        sql_hourly = "SELECT date, hour, avg_solar_w FROM sun_data_hourly WHERE date >= %s"
+        cursor.execute(sql_hourly, (now.date() - timedelta(days=HOURLY_KEEP_DAYS),))
+        hourly = {(row["date"], row["hour"]): row["avg_solar_w"] for row in cursor.fetchall()}
+
+    feature_store.seed(readings, hourly)
+    logger.info(f"특성 저장소 : 초기화 완료 (센서 {len(readings)} 건, 시간별 {len(hourly)} 건)")
+    return True, None, 200
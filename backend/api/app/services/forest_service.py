@@ -0,0 +1,176 @@
+import json
+import sys
+import numpy as np
+from pathlib import Path
+
+# 압축 포레스트 파일 형식 버전
+FOREST_FORMAT_VERSION = 1
+
+# 저장할 배열 목록 (배열별 .npy 파일 1개)
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+# 학습된 RandomForest를 연속된 NumPy 배열로 변환
+def flatten_forest(model):
+    """
+    모든 트리의 노드를 하나의 배열로 이어 붙임
+    - feature / threshold : 분기 특성 번호 / 기준값
+    - left / right : 자식 노드 (전체 배열 기준 인덱스, 리프는 자기 자신을 가리킴)
+    - value : 노드 예측값 (노드 수, 출력 수)
+    - roots : 트리별 루트 노드 인덱스
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        # 리프는 자기 자신을 가리키도록 하여 순회 반복 횟수를 트리 깊이와 무관하게 고정
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        values.append(tree.value.reshape(tree.node_count, -1))
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "value": np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        "roots": np.asarray(roots, dtype=np.int32)
+    }
+    meta = {
+        "format_version": FOREST_FORMAT_VERSION,
+        "n_trees": len(roots),
+        "n_features": int(model.n_features_in_),
+        "n_outputs": int(arrays["value"].shape[1]),
+        "n_nodes": int(offset),
+        "max_depth": int(max_depth)
+    }
+    return arrays, meta
+
+# 압축 포레스트 저장
+def export_forest(model, out_dir):
+    """
+    RandomForest를 배열별 .npy 파일 + meta.json 으로 저장 (np.load mmap 가능 형식)
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    arrays, meta = flatten_forest(model)
+    for name in FOREST_ARRAYS:
+        np.save(out_dir / f"{name}.npy", arrays[name])
+    # meta.json은 마지막에 저장 (meta.json이 있으면 저장 완료된 것으로 판단)
+    with open(out_dir / "meta.json", "w") as f:
+        json.dump(meta, f)
+    return meta
+
+# 압축 포레스트 추론 클래스
+class CompactForest:
+    """
+    순수 NumPy RandomForest 추론 엔진
+    모든 샘플 x 모든 트리를 한 번에 한 단계씩 내려가며 리프 값을 구함 (반복 횟수 = 최대 깊이)
+    """
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.n_features_in_ = meta["n_features"]
+        self.n_estimators = meta["n_trees"]
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        저장된 압축 포레스트 로드 (mmap=True 이면 메모리 매핑으로 워커 간 페이지 공유)
+        """
+        path = Path(path)
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FOREST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format : {meta.get('format_version')}")
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in FOREST_ARRAYS}
+        return cls(arrays, meta)
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        메모리의 RandomForest 모델을 바로 변환
+        """
+        arrays, meta = flatten_forest(model)
+        return cls(arrays, meta)
+
+    def apply(self, X):
+        """
+        샘플별, 트리별 리프 노드 인덱스 반환 (n_samples, n_trees)
+        """
+        # sklearn과 동일하게 입력을 float32로 변환 후 비교
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, expected {self.n_features_in_}")
+
+        # 1차원 인덱스로 접근 (행 시작 위치 + 특성 번호)
+        X_flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.meta["max_depth"]):
+            go_left = X_flat[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_trees(self, X):
+        """
+        트리별 예측값 반환 (n_samples, n_trees, n_outputs)
+        """
+        return self.value[self.apply(X)]
+
+    def predict(self, X):
+        """
+        트리 평균 예측값 반환 (n_samples, n_outputs) - RandomForestRegressor.predict 와 동일
+        """
+        return self.predict_trees(X).mean(axis=1)
+
+    def predict_interval(self, X, quantiles):
+        """
+        트리 평균 + 트리별 예측값 분포의 분위수를 한 번의 순회로 계산
+        quantiles : 백분위 목록 (0~100)
+        반환 : (평균 (n_samples, n_outputs), 분위수 (n_quantiles, n_samples, n_outputs))
+        np.percentile(linear) 과 같은 값을 트리 축 정렬 1회 + 선형 보간으로 계산 (호출당 검사 비용 제거)
+        """
+        trees = self.predict_trees(X)
+        sorted_trees = np.sort(trees, axis=1)
+        position = np.asarray(quantiles, dtype=np.float64) / 100 * (trees.shape[1] - 1)
+        lower = np.floor(position).astype(np.intp)
+        upper = np.minimum(lower + 1, trees.shape[1] - 1)
+        weight = (position - lower)[:, None]
+        values = sorted_trees[:, lower] * (1 - weight) + sorted_trees[:, upper] * weight
+        return trees.mean(axis=1), values.transpose(1, 0, 2)
+
+# 명령행 실행 : 모델 파일을 압축 포레스트로 변환
+# 사용법 : cd backend/api && python -m app.services.forest_service <model.pkl> <out_dir>
+if __name__ == "__main__":
+    import pickle
+
+    if len(sys.argv) != 3:
+        print("사용법 : python -m app.services.forest_service <model.pkl> <out_dir>")
+        sys.exit(1)
+
+    with open(sys.argv[1], "rb") as f:
+        model = pickle.load(f)
+    meta = export_forest(model, sys.argv[2])
+    print(f"압축 포레스트 저장 완료 : {meta}")
+
+    # 변환 결과 검증 (임의 입력으로 sklearn 예측과 비교)
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 100, size=(1000, meta["n_features"]))
+    forest = CompactForest.load(sys.argv[2])
+    diff = np.abs(forest.predict(X) - model.predict(X)).max()
+    print(f"sklearn 예측 대비 최대 오차 : {diff:.3e}")
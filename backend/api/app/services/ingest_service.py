@@ -0,0 +1,242 @@
+from app.services.sensor_service import save_sensor_data_batch
+from datetime import datetime
+from pathlib import Path
+import atexit
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 쓰기 버퍼 설정
+SENSOR_BUFFER_ENABLED = os.getenv("SENSOR_BUFFER_ENABLED", "false").lower() == "true" # 버퍼 사용 여부
+SENSOR_BUFFER_MAX_ROWS = int(os.getenv("SENSOR_BUFFER_MAX_ROWS", 500)) # 이 건수 이상 쌓이면 즉시 저장
+SENSOR_BUFFER_FLUSH_INTERVAL = float(os.getenv("SENSOR_BUFFER_FLUSH_INTERVAL", 1)) # 최대 저장 지연 시간 (초)
+SENSOR_BUFFER_MAX_QUEUE = int(os.getenv("SENSOR_BUFFER_MAX_QUEUE", 50000)) # 버퍼 최대 적재 건수
+SENSOR_BUFFER_MAX_BACKOFF = float(os.getenv("SENSOR_BUFFER_MAX_BACKOFF", 30)) # 저장 실패 후 최대 재시도 대기 시간 (초)
+SENSOR_BUFFER_MAX_RETRIES = int(os.getenv("SENSOR_BUFFER_MAX_RETRIES", 8)) # 같은 묶음 최대 저장 시도 횟수 (초과 시 dead-letter 파일로 이동)
+SENSOR_BUFFER_DEAD_LETTER = Path(os.getenv(
+    "SENSOR_BUFFER_DEAD_LETTER", str(Path(__file__).parent.parent.parent / "data" / "sensor_dead_letter.jsonl")
+))
+
+# 센서 데이터 쓰기 버퍼 클래스
+class SensorWriteBuffer:
+    """
+    센서 데이터 write-behind 버퍼
+    - 수신 데이터를 메모리에 쌓아두고 건수/시간 조건 충족 시 한 트랜잭션으로 저장
+    - 저장 실패 시 실패한 묶음만 따로 보관해 지수 백오프(flush_interval ~ max_backoff) 후 재시도
+    - 같은 묶음이 max_retries 번 실패하면 dead-letter 파일(JSON Lines)로 옮기고 다음 데이터 저장 진행
+    - 서버 종료 시 남은 데이터 저장 (실패 시 dead-letter 파일로 이동)
+    """
+    def __init__(self, max_rows, flush_interval, max_queue, max_backoff=SENSOR_BUFFER_MAX_BACKOFF,
+                 max_retries=SENSOR_BUFFER_MAX_RETRIES, dead_letter_path=SENSOR_BUFFER_DEAD_LETTER):
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_backoff = max(max_backoff, flush_interval)
+        self.max_retries = max_retries
+        self.dead_letter_path = Path(dead_letter_path)
+        self._rows = []
+        self._retry_rows = [] # 저장 실패한 묶음 (재시도 대기)
+        self._retry_attempts = 0 # 재시도 대기 묶음의 저장 시도 횟수
+        self._consecutive_failures = 0 # 연속 저장 실패 횟수 (백오프 계산)
+        self._retry_at = 0.0 # 이 시각(monotonic) 전에는 저장하지 않음
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._stats = {
+            "accepted": 0, # 버퍼에 적재된 건수
+            "rejected": 0, # 버퍼 초과로 거부된 건수
+            "flushed": 0, # DB에 저장된 건수
+            "flushes": 0, # 저장 횟수
+            "failed_flushes": 0, # 저장 실패 횟수
+            "dead_lettered": 0, # dead-letter 파일로 옮긴 건수
+            "last_flush_latency": 0.0, # 마지막 저장 소요 시간 (초)
+            "max_flush_latency": 0.0, # 최대 저장 소요 시간 (초)
+            "total_flush_latency": 0.0 # 누적 저장 소요 시간 (초)
+        }
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="sensor-write-buffer", daemon=True)
+            self._thread.start()
+
+    def submit(self, rows):
+        """
+        센서 데이터를 버퍼에 적재
+        """
+        with self._cond:
+            if self._closed:
+                return False, "Sensor Buffer : Buffer closed", 503
+            if len(self._rows) + len(self._retry_rows) + len(rows) > self.max_queue:
+                self._stats["rejected"] += len(rows)
+                logger.warning("센서 데이터 버퍼 : 버퍼 용량 초과")
+                return False, "Sensor Buffer : Buffer full", 503
+            self._rows.extend(rows)
+            self._stats["accepted"] += len(rows)
+            if len(self._rows) >= self.max_rows:
+                self._cond.notify()
+        return True, None, 202
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # 건수 조건 또는 시간 조건 충족까지 대기 (저장 실패 후에는 백오프 시간까지 대기)
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed:
+                    now = time.monotonic()
+                    if now < self._retry_at:
+                        self._cond.wait(self._retry_at - now)
+                        continue
+                    if len(self._rows) >= self.max_rows or now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+                closed = self._closed
+            if closed:
+                self._drain()
+                return
+            self.flush()
+
+    def flush(self):
+        """
+        버퍼에 쌓인 데이터를 한 번에 저장 (재시도 대기 묶음이 있으면 그 묶음만 저장)
+        """
+        with self._flush_lock:
+            with self._cond:
+                retry = bool(self._retry_rows)
+                if retry:
+                    rows, self._retry_rows = self._retry_rows, []
+                else:
+                    rows, self._rows = self._rows, []
+            if not rows:
+                return True
+
+            start = time.monotonic()
+            success, message, _ = save_sensor_data_batch(rows)
+            latency = time.monotonic() - start
+
+            dead_rows = None
+            with self._cond:
+                self._stats["flushes"] += 1
+                self._stats["last_flush_latency"] = latency
+                self._stats["max_flush_latency"] = max(self._stats["max_flush_latency"], latency)
+                self._stats["total_flush_latency"] += latency
+                if success:
+                    self._stats["flushed"] += len(rows)
+                    self._retry_attempts = 0
+                    self._consecutive_failures = 0
+                    self._retry_at = 0.0
+                else:
+                    self._stats["failed_flushes"] += 1
+                    self._retry_attempts = self._retry_attempts + 1 if retry else 1
+                    self._consecutive_failures += 1
+                    # 지수 백오프 (flush_interval, 2배씩 증가, 최대 max_backoff)
+                    backoff = min(self.flush_interval * 2 ** (self._consecutive_failures - 1), self.max_backoff)
+                    self._retry_at = time.monotonic() + backoff
+                    if self._retry_attempts >= self.max_retries:
+                        # 같은 묶음 반복 실패 : dead-letter 파일로 옮기고 다음 데이터 진행
+                        dead_rows = rows
+                        self._retry_attempts = 0
+                        logger.error(f"센서 데이터 버퍼 : {self.max_retries} 회 저장 실패 ({len(rows)} 건 dead-letter 이동) - {message}")
+                    else:
+                        self._retry_rows = rows
+                        logger.error(f"센서 데이터 버퍼 : 저장 실패 ({len(rows)} 건, {backoff:.1f} 초 후 재시도 {self._retry_attempts}/{self.max_retries}) - {message}")
+            if dead_rows is not None:
+                self._write_dead_letter(dead_rows, message)
+            return success
+
+    def _drain(self):
+        """
+        종료 시 남은 데이터 저장 (백오프 없이 1회씩 시도, 실패 시 남은 데이터 dead-letter 이동)
+        """
+        while True:
+            with self._cond:
+                if not self._rows and not self._retry_rows:
+                    return
+            if not self.flush():
+                break
+        with self._flush_lock, self._cond:
+            rows = self._retry_rows + self._rows
+            self._retry_rows, self._rows = [], []
+        if rows:
+            logger.error(f"센서 데이터 버퍼 : 종료 시 저장 실패 ({len(rows)} 건 dead-letter 이동)")
+            self._write_dead_letter(rows, "Buffer closed")
+
+    def _write_dead_letter(self, rows, message):
+        """
+        저장하지 못한 데이터를 JSON Lines 파일에 추가 (수동 재처리용)
+        """
+        failed_at = datetime.now().isoformat(timespec="seconds")
+        try:
+            self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.dead_letter_path, "a") as f:
+                for soc, solar_w, lux, timestamp in rows:
+                    f.write(json.dumps({
+                        "soc": soc, "solar_w": solar_w, "lux": lux,
+                        "timestamp": timestamp.isoformat() if hasattr(timestamp, "isoformat") else timestamp,
+                        "error": message, "failed_at": failed_at
+                    }) + "\n")
+        except OSError as e:
+            logger.exception(f"센서 데이터 버퍼 : dead-letter 저장 실패 ({len(rows)} 건 유실) - {e}")
+            return
+        with self._cond:
+            self._stats["dead_lettered"] += len(rows)
+
+    def close(self):
+        """
+        버퍼 종료 및 남은 데이터 저장
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=10)
+        else:
+            self._drain()
+
+    def stats(self):
+        with self._cond:
+            result = dict(self._stats)
+            result["queue_depth"] = len(self._rows) + len(self._retry_rows)
+            result["retry_rows"] = len(self._retry_rows)
+            result["retry_attempts"] = self._retry_attempts
+            result["backoff_remaining"] = round(max(self._retry_at - time.monotonic(), 0.0), 3)
+        result["enabled"] = True
+        return result
+
+# 전역 쓰기 버퍼 (SENSOR_BUFFER_ENABLED=true 일 때만 생성)
+sensor_buffer = None
+if SENSOR_BUFFER_ENABLED:
+    sensor_buffer = SensorWriteBuffer(SENSOR_BUFFER_MAX_ROWS, SENSOR_BUFFER_FLUSH_INTERVAL, SENSOR_BUFFER_MAX_QUEUE)
+    atexit.register(sensor_buffer.close)
+
+# 버퍼 저장 스레드 시작
+def start_ingest_buffer():
+    if sensor_buffer is not None:
+        sensor_buffer.start()
+        logger.info("센서 데이터 버퍼 : 시작")
+
+# 센서 데이터 일괄 저장 (버퍼 사용 시 버퍼에 적재)
+def ingest_sensor_batch(rows):
+    """
+    센서 데이터 일괄 저장
+    버퍼 사용 시 즉시 202 반환 후 백그라운드에서 저장
+    """
+    if sensor_buffer is not None:
+        return sensor_buffer.submit(rows)
+    return save_sensor_data_batch(rows)
+
+# 버퍼 상태 조회
+def get_ingest_stats():
+    """
+    버퍼 적재 건수(queue depth) 및 저장 소요 시간 반환
+    """
+    if sensor_buffer is None:
+        return {"enabled": False, "queue_depth": 0}
+    return sensor_buffer.stats()
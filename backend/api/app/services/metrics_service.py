@@ -0,0 +1,198 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+import os
+import threading
+import time
+
+# 지표 수집 여부 (false 이면 기록하지 않음, /metrics 는 빈 값 반환)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# 기본 지연 시간 구간 (초)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# 행 수 구간
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# 라벨 값 이스케이프 (Prometheus 텍스트 형식)
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+# 카운터 지표
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+# 히스토그램 지표
+class Histogram:
+    """
+    구간(bucket)별 관측 횟수 + 합계 + 개수
+    라벨 조합별로 구간 카운트를 따로 저장 (출력 시 누적값으로 변환)
+    """
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {} # 라벨 값 -> [구간별 횟수 ... , +Inf 횟수, 합계]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        with 블록 실행 시간 기록
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts[:-1]):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {counts[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+# 조회 시점에 값을 읽는 게이지 (풀 사용량 등 기존 통계 노출용)
+class GaugeFunction:
+    def __init__(self, name, help_text, func):
+        self.name = name
+        self.help_text = help_text
+        self.func = func
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            lines.append(f"{self.name} {float(self.func())}")
+        except Exception:
+            pass
+        return lines
+
+# 지표 저장소
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def gauge_function(self, name, help_text, func):
+        return self.register(GaugeFunction(name, help_text, func))
+
+    def render(self):
+        """
+        Prometheus 텍스트 형식(version 0.0.4)으로 출력
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# 전역 지표 저장소
+registry = MetricsRegistry()
+
+# 공통 지표
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP 요청 처리 시간 (라우트별)", ("method", "route", "status")
+)
+DB_TRANSACTION_LATENCY = registry.histogram(
+    "db_transaction_duration_seconds", "db_transaction 1회 소요 시간 (연결 획득 ~ 반납)"
+)
+DB_ROWS_RETURNED = registry.histogram(
+    "db_rows_returned", "db_transaction 1회에서 조회(fetch)한 행 수", buckets=ROW_BUCKETS
+)
+DB_TRANSACTION_ERRORS = registry.counter(
+    "db_transaction_errors_total", "실패한 db_transaction 수"
+)
+MODEL_INFERENCE_LATENCY = registry.histogram(
+    "model_inference_duration_seconds", "모델 predict 호출 시간", ("mode",)
+)
+SCHEDULER_JOB_LATENCY = registry.histogram(
+    "scheduler_job_duration_seconds", "스케줄러 작업 실행 시간", ("job",),
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+)
+SCHEDULER_JOB_FAILURES = registry.counter(
+    "scheduler_job_failures_total", "실패한 스케줄러 작업 수", ("job",)
+)
+
+# 스케줄러 작업 실행 시간 기록
+def timed_job(name, func):
+    """
+    스케줄러 작업 함수를 감싸 실행 시간 및 실패 횟수 기록
+    (result, message, status_code) 반환 함수는 result가 False 이면 실패로 기록
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = isinstance(result, tuple) and bool(result) and result[0] is False
+            return result
+        finally:
+            SCHEDULER_JOB_LATENCY.observe(time.perf_counter() - start, job=name)
+            if failed:
+                SCHEDULER_JOB_FAILURES.inc(job=name)
+    return wrapper
+
+# 지표 출력
+def render_metrics():
+    return registry.render()
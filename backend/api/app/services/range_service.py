@@ -0,0 +1,213 @@
+from app.services.common_service import db_transaction, handle_errors, DBException
+from app.services.archive_service import read_archive, ARCHIVE_ENABLED
+from datetime import datetime, timedelta
+import numpy as np
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 기간 차트 조회 설정
+RANGE_SERIES = ("soc", "solar_w", "lux")
+RANGE_DEFAULT_POINTS = 500 # 시계열별 기본 최대 점 개수
+RANGE_MAX_POINTS = int(os.getenv("RANGE_MAX_POINTS", 5000)) # 요청 가능한 최대 점 개수
+RANGE_DEFAULT_HOURS = 24 # 기간 미지정 시 조회 시간
+RANGE_RAW_MAX_ROWS = int(os.getenv("RANGE_RAW_MAX_ROWS", 100000)) # 원본 모드 최대 행 수 (초과 시 시간별 집계로 전환)
+
+# 시각 계산 기준 (DB와 보관소 모두 로컬 시각으로 저장하므로 시간대 변환 없이 초 단위로 계산)
+EPOCH = datetime(1970, 1, 1)
+
+# LTTB (Largest-Triangle-Three-Buckets) 다운샘플링
+def lttb(x, y, points):
+    """
+    시계열 모양(최고/최저점, 급변 구간)을 유지하면서 points개 이하로 줄임
+    x : 시각 (오름차순 실수 배열), y : 값, points : 3 이상
+    반환 : 선택된 원본 인덱스 배열 (첫 점, 마지막 점 포함)
+    버킷 경계와 다음 버킷 평균은 한 번에 계산하고, 버킷별 선택만 순서대로 진행 (반복 횟수 = points)
+    """
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+
+    # 첫 점, 마지막 점을 제외한 구간을 points - 2개 버킷으로 분할
+    edges = np.floor(np.linspace(1, n - 1, points - 1)).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # 다음 버킷 평균 (마지막 버킷의 다음은 마지막 점)
+    csum_x = np.concatenate(([0.0], np.cumsum(x)))
+    csum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = ends - starts
+    avg_x = (csum_x[ends] - csum_x[starts]) / counts
+    avg_y = (csum_y[ends] - csum_y[starts]) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(points - 2):
+        lo, hi = starts[i], ends[i]
+        # 이전 선택점 - 후보점 - 다음 버킷 평균으로 만든 삼각형 넓이가 최대인 점 선택
+        area = np.abs(
+            (x[prev] - next_x[i]) * (y[lo:hi] - y[prev])
+            - (x[prev] - x[lo:hi]) * (next_y[i] - y[prev])
+        )
+        prev = lo + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+# 조회 조건 검사 및 변환
+def parse_range_filters(args, now=None):
+    """
+    쿼리 파라미터(from, to, points, series)를 검사해 변환
+    from/to : ISO 날짜 또는 날짜시간 (미지정 시 최근 24시간)
+    반환 : (filters, error) - 오류가 있으면 filters는 None
+    """
+    now = now or datetime.now()
+    try:
+        end = datetime.fromisoformat(args["to"]) if args.get("to") else now
+        start = datetime.fromisoformat(args["from"]) if args.get("from") else end - timedelta(hours=RANGE_DEFAULT_HOURS)
+    except ValueError:
+        return None, "Invalid datetime format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"
+    if start >= end:
+        return None, "from must be before to"
+
+    points = args.get("points", RANGE_DEFAULT_POINTS)
+    if not str(points).isdigit() or not 3 <= int(points) <= RANGE_MAX_POINTS:
+        return None, f"Invalid points (3 ~ {RANGE_MAX_POINTS})"
+
+    series = RANGE_SERIES
+    if args.get("series"):
+        series = tuple(name.strip() for name in args["series"].split(",") if name.strip())
+        if not series or any(name not in RANGE_SERIES for name in series):
+            return None, f"Invalid series ({', '.join(RANGE_SERIES)})"
+
+    return {"start": start, "end": end, "points": int(points), "series": series}, None
+
+# 행 목록을 컬럼 배열로 변환 (timestamp : EPOCH 기준 초)
+def _to_columns(rows, series):
+    columns = {"timestamp": np.array([(row["timestamp"] - EPOCH).total_seconds() for row in rows], dtype=np.float64)}
+    for name in series:
+        columns[name] = np.array([np.nan if row[name] is None else row[name] for row in rows], dtype=np.float64)
+    return columns
+
+def _concat(parts, series):
+    parts = [part for part in parts if len(part["timestamp"])]
+    if not parts:
+        return {name: np.array([], dtype=np.float64) for name in ("timestamp", *series)}
+    result = {name: np.concatenate([part[name] for part in parts]) for name in ("timestamp", *series)}
+    order = np.argsort(result["timestamp"], kind="stable")
+    return {name: values[order] for name, values in result.items()}
+
+# 시간 단위 평균 (시간별 집계 테이블과 같은 단위로 변환)
+def _bucket_hourly(columns, series):
+    if not len(columns["timestamp"]):
+        return columns
+    hours = np.floor(columns["timestamp"] / 3600).astype(np.int64)
+    keys, index = np.unique(hours, return_inverse=True)
+    result = {"timestamp": keys * 3600.0}
+    for name in series:
+        values = columns[name]
+        valid = ~np.isnan(values)
+        sums = np.bincount(index[valid], weights=values[valid], minlength=len(keys))
+        counts = np.bincount(index[valid], minlength=len(keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[name] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return result
+
+# 시간별 집계 테이블 조회 (시작 시각 기준)
+def _fetch_hourly(cursor, start, end, series):
+    sql = """
+        SELECT date, hour, avg_soc as soc, avg_solar_w as solar_w, avg_lux as lux
+        FROM sun_data_hourly
+        WHERE date >= %s AND date <= %s
+        ORDER BY date, hour
+    """
+    cursor.execute(sql, (start.date(), end.date()))
+    rows = []
+    for row in cursor.fetchall():
+        timestamp = datetime.combine(row["date"], datetime.min.time()) + timedelta(hours=row["hour"])
+        if start - timedelta(hours=1) < timestamp < end:
+            row["timestamp"] = timestamp
+            rows.append(row)
+    return _to_columns(rows, series)
+
+# 원본 테이블 조회 (시간별 집계 전 최근 데이터)
+def _fetch_realtime(cursor, start, end, series):
+    sql = """
+        SELECT timestamp, soc, solar_w, lux
+        FROM sun_data_realtime
+        WHERE timestamp >= %s AND timestamp < %s
+        ORDER BY timestamp
+    """
+    cursor.execute(sql, (start, end))
+    return _to_columns(cursor.fetchall(), series)
+
+# 보관소 원본 데이터 조회 (시간별 집계로 DB에서 삭제된 데이터)
+def _read_archive(start, end, series, max_rows):
+    if not ARCHIVE_ENABLED:
+        return _to_columns([], series)
+    data = read_archive(start, end, series, max_rows=max_rows)
+    columns = {"timestamp": data["timestamp"].astype(np.int64).astype(np.float64)}
+    for name in series:
+        columns[name] = data[name].astype(np.float64)
+    return columns
+
+# 시간 단위 키 집합에 없는 행만 선택
+def _exclude_hours(columns, hour_keys, series):
+    hours = np.floor(columns["timestamp"] / 3600).astype(np.int64)
+    keep = ~np.isin(hours, hour_keys)
+    return {name: columns[name][keep] for name in ("timestamp", *series)}
+
+# 기간 센서 데이터 조회 + 다운샘플링 (통계 차트용)
+@handle_errors("Sensor Range")
+def get_sensor_range(filters):
+    """
+    기간에 맞는 가장 거친 데이터를 선택해 시계열별 points개 이하로 반환
+    - 기간 시간 수 >= points : 시간별 집계 (아직 집계되지 않은 최근 원본은 시간 평균으로 변환해 합침)
+    - 그 외 : 원본 (보관소 + 원본 테이블, 원본이 없는 시간은 시간별 집계로 채움)
+      원본 행 수가 RANGE_RAW_MAX_ROWS 를 넘으면 시간별 집계로 전환 (보관소는 행 수만 세고 복사하지 않음)
+    이후 시계열별로 LTTB 다운샘플링
+    반환 : {"from", "to", "resolution", "series": {이름: {"timestamp": [...], "value": [...]}}}
+    """
+    start, end, series = filters["start"], filters["end"], filters["series"]
+    hourly_mode = (end - start) / timedelta(hours=1) >= filters["points"]
+
+    with db_transaction() as (_, cursor):
+        hourly = _fetch_hourly(cursor, start, end, series)
+        realtime = _fetch_realtime(cursor, start, end, series)
+
+    if not hourly_mode and len(realtime["timestamp"]) > RANGE_RAW_MAX_ROWS:
+        hourly_mode = True
+    if not hourly_mode:
+        try:
+            archive = _read_archive(start, end, series, max(RANGE_RAW_MAX_ROWS - len(realtime["timestamp"]), 0))
+        except DBException as e:
+            if e.status_code != 413:
+                raise
+            logger.debug(f"기간 조회 : 원본 행 수 초과로 시간별 집계 사용 - {e.message}")
+            hourly_mode = True
+
+    hourly_keys = np.floor(hourly["timestamp"] / 3600).astype(np.int64)
+    if hourly_mode:
+        data = _concat([hourly, _exclude_hours(_bucket_hourly(realtime, series), hourly_keys, series)], series)
+    else:
+        raw = _concat([archive, realtime], series)
+        raw_keys = np.unique(np.floor(raw["timestamp"] / 3600).astype(np.int64))
+        data = _concat([raw, _exclude_hours(hourly, raw_keys, series)], series)
+
+    result = {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "resolution": "hourly" if hourly_mode else "raw",
+        "series": {}
+    }
+    for name in series:
+        valid = ~np.isnan(data[name])
+        x, y = data["timestamp"][valid], data[name][valid]
+        selected = lttb(x, y, filters["points"])
+        result["series"][name] = {
+            "timestamp": np.datetime_as_string(x[selected].astype("datetime64[s]"), unit="s").tolist(),
+            "value": np.round(y[selected], 4).tolist()
+        }
+    return result, None, 200
@@ -1,5 +1,50 @@
-from app.services.common_service import db_transaction, handle_errors, get_buyer_id_from_channel, CHANNEL_CONFIG
-import requests
+from app.services.common_service import db_transaction, handle_errors, get_buyer_id_from_channel, CHANNEL_CONFIG, DBException
+from app.services.stream_service import publish_event
+from app.services.trade_service import add_trades_to_summary
+from app.services.arduino_service import arduino_dispatcher
+from datetime import datetime, date as date_type, timedelta
+import base64
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 릴레이 상태 캐시 유효 시간 (초)
+# 다른 워커 프로세스에서 바꾼 상태는 이 주기로 DB에서 다시 읽어 반영
+RELAY_CACHE_TTL = float(os.getenv("RELAY_CACHE_TTL", 5))
+
+# 거래 내역 조회 설정
+TRADE_PAGE_SIZE = int(os.getenv("TRADE_PAGE_SIZE", 100)) # cursor만 지정했을 때 기본 페이지 크기
+TRADE_PAGE_MAX = int(os.getenv("TRADE_PAGE_MAX", 1000)) # 페이지 최대 크기
+TRADE_EXPORT_CHUNK = int(os.getenv("TRADE_EXPORT_CHUNK", 500)) # 스트림 조회 시 한 번에 읽는 행 수 (키셋 페이지 크기)
+
+# 릴레이 상태 캐시 (프로세스 단위)
+_relay_lock = threading.Lock()
+_relay_write_lock = threading.Lock() # DB 반영 ~ 캐시 갱신 구간 직렬화 (커밋 순서대로 캐시 갱신)
+_relay_cache = {
+    "status": None, # {"A": "on", "B": "off", ...}
+    "version": 0, # 상태가 바뀔 때마다 증가
+    "checked_at": 0.0 # 마지막으로 DB와 일치를 확인한 시각
+}
+
+# 릴레이 상태 캐시 갱신 (변경 시 버전 증가 및 스트림 구독자에게 전송)
+def _update_relay_cache(changes, replace=False):
+    with _relay_lock:
+        current = _relay_cache["status"]
+        new_status = {} if replace or current is None else dict(current)
+        new_status.update(changes)
+        changed = new_status != current
+        # 최초 DB 로드는 변경 이벤트로 보지 않음
+        notify = changed and not (replace and current is None)
+        if changed:
+            _relay_cache["status"] = new_status
+            _relay_cache["version"] += 1
+        _relay_cache["checked_at"] = time.monotonic()
+
+    if notify:
+        publish_event("relay", {key: (value == "on") for key, value in new_status.items()})
 
 # DB에 릴레이 상태 저장 함수
 @handle_errors("DB Relay")
@@ -7,108 +52,275 @@ def update_relay_status_in_db(data):
     """
     릴레이 상태를 DB에 업데이트
     """
-    with db_transaction() as (_, cursor):
-        # 상태 저장할 빈 리스트 생성
-        relays_to_update = []
-        for relay_ch, ch_status in data.items():
-            # True -> "on", False -> "off"
-            status_string = "on" if ch_status else "off"
-            relays_to_update.append((status_string, relay_ch))
-        print(f"\n릴레이 상태 저장 : 업데이트할 데이터 - {relays_to_update}")
-
-        # DB UPDATE
-        sql = "UPDATE relay_status SET status = %s WHERE relay_name = %s"
-        cursor.executemany(sql, relays_to_update)
-        print("\n릴레이 상태 저장 : 저장 완료")
-        return True, None, 201
-
-# DB에 거래 내역 저장
-@handle_errors("DB Trade")
-def insert_trade_history(buyer_id, amount):
+    with _relay_write_lock:
+        with db_transaction() as (_, cursor):
+            # 상태 저장할 빈 리스트 생성
+            relays_to_update = []
+            for relay_ch, ch_status in data.items():
+                # True -> "on", False -> "off"
+                status_string = "on" if ch_status else "off"
+                relays_to_update.append((status_string, relay_ch))
+            logger.debug(f"릴레이 상태 저장 : 업데이트할 데이터 - {relays_to_update}")
+
+            # DB UPDATE
+            sql = "UPDATE relay_status SET status = %s WHERE relay_name = %s"
+            cursor.executemany(sql, relays_to_update)
+
+            # 커밋될 전체 상태 조회 (요청 값이 아닌 DB 값으로 캐시 갱신)
+            sql = "SELECT relay_name, status FROM relay_status WHERE relay_name IN ('A','B','C','D') FOR UPDATE"
+            cursor.execute(sql)
+            current_status = {row['relay_name']: row['status'] for row in cursor.fetchall()}
+
+        # 커밋 완료 후 캐시 갱신
+        _update_relay_cache(current_status, replace=True)
+
+    logger.debug("릴레이 상태 저장 : 저장 완료")
+    return True, None, 201
+
+# 릴레이 상태 변경 및 거래 내역 저장 (단일 트랜잭션)
+@handle_errors("DB Relay")
+def apply_relay_update(data):
     """
-    거래 내역을 DB에 저장
+    릴레이 행을 잠근(SELECT ... FOR UPDATE) 상태에서 현재 상태와 비교해
+    변경된 릴레이 UPDATE + OFF -> ON 채널 거래 내역 INSERT + 일별 요약 갱신을 한 번에 커밋
+    동시에 여러 화면에서 제어해도 같은 OFF -> ON 전환이 중복 기록되지 않음
     """
-    with db_transaction() as (_, cursor):
-        # DB INSERT
-        sql = "INSERT INTO trade_history (buyer_id, amount) VALUES (%s, %s)"
-        cursor.execute(sql, (buyer_id, amount))
-        print("\n거래 내역 저장 : 커밋 완료")
-        return True, None, 201
+    now = datetime.now().replace(microsecond=0)
+    with _relay_write_lock:
+        with db_transaction() as (_, cursor):
+            # 현재 상태 조회 및 행 잠금 (커밋 전까지 다른 요청은 대기)
+            sql = "SELECT relay_name, status FROM relay_status WHERE relay_name IN ('A','B','C','D') ORDER BY id FOR UPDATE"
+            cursor.execute(sql)
+            current_status = {row['relay_name']: row['status'] for row in cursor.fetchall()}
 
-# 거래 내역 조회
-@handle_errors("DB Trade")
-def get_trade_history(user_id=None, start_date=None, end_date=None, date=None):
+            relays_to_update = []
+            trades = []
+            for channel, new_state in data.items():
+                old_state = current_status.get(channel, "off")
+                # True -> "on", False -> "off"
+                status_string = "on" if new_state else "off"
+                if old_state != status_string:
+                    relays_to_update.append((status_string, channel))
+
+                # OFF -> ON 전환 시 거래 발생
+                if old_state == "off" and new_state == True:
+                    # 채널명을 buyer_id로 변환, 채널별 소비전력 조회
+                    buyer_id = get_buyer_id_from_channel(channel)
+                    amount = CHANNEL_CONFIG.get(channel)
+                    if buyer_id not in [1,2,3,4] or amount is None or amount < 0:
+                        logger.warning("릴레이 제어 : 필수 데이터 입력값 오류")
+                        raise DBException("Invalid input values", 400)
+                    trades.append((channel, buyer_id, amount))
+            logger.debug(f"릴레이 상태 저장 : 업데이트할 데이터 - {relays_to_update}")
+
+            # DB UPDATE (변경된 릴레이만)
+            if relays_to_update:
+                sql = "UPDATE relay_status SET status = %s WHERE relay_name = %s"
+                cursor.executemany(sql, relays_to_update)
+
+            # 거래 내역 일괄 INSERT 및 일별 요약 갱신
+            if trades:
+                sql = "INSERT INTO trade_history (buyer_id, amount, timestamp) VALUES (%s, %s, %s)"
+                cursor.executemany(sql, [(buyer_id, amount, now) for _, buyer_id, amount in trades])
+                add_trades_to_summary(cursor, [(now.date(), buyer_id, amount) for _, buyer_id, amount in trades])
+
+        # 커밋 완료 후 캐시 갱신 (잠금 상태에서 읽은 값 + 변경분 = 커밋된 상태)
+        new_status = dict(current_status)
+        new_status.update({channel: status_string for status_string, channel in relays_to_update if channel in current_status})
+        _update_relay_cache(new_status, replace=True)
+
+    for channel, _, amount in trades:
+        logger.debug(f"성공 내역 : ({channel}) / {amount}W")
+    logger.debug("릴레이 제어 : 저장 완료")
+    return True, "Relay state updated successfully", 201
+
+# 거래 내역 필터 검사 및 변환
+def parse_trade_history_filters(args):
     """
-    거래 내역 조회 (필터 옵션)
+    쿼리 파라미터(user_id, start_date, end_date, date, limit, cursor)를 검사해 변환
+    반환 : (filters, error) - 오류가 있으면 filters는 None
     """
-    with db_transaction() as (_, cursor):
-        sql = "SELECT * FROM trade_history WHERE 1=1"
-        params = []
+    filters = {"user_id": None, "start": None, "end": None, "limit": None, "cursor": None}
 
-        # 쿼리 파라미터 조건 추가
-        if user_id:
-            sql += " AND buyer_id = %s"
-            params.append(user_id)
+    user_id = args.get("user_id")
+    if user_id:
+        if not str(user_id).isdigit():
+            return None, "Invalid user_id"
+        filters["user_id"] = int(user_id)
+
+    # 날짜 조건은 반열린 구간 [start, end) 으로 변환 (timestamp 인덱스 사용 가능)
+    try:
+        start_date = args.get("start_date")
         if start_date:
-            sql += " AND timestamp >= %s"
-            params.append(start_date)
+            filters["start"] = datetime.fromisoformat(start_date)
+        end_date = args.get("end_date")
         if end_date:
-            sql += " AND DATE(timestamp) <= %s"
-            params.append(end_date)
+            filters["end"] = datetime.combine(date_type.fromisoformat(end_date) + timedelta(days=1), datetime.min.time())
+        date = args.get("date")
         if date:
-            sql += " AND DATE(timestamp) = %s"
-            params.append(date)
-        sql += " ORDER BY timestamp DESC"
+            day_start = datetime.combine(date_type.fromisoformat(date), datetime.min.time())
+            filters["start"] = max(filters["start"], day_start) if filters["start"] else day_start
+            day_end = day_start + timedelta(days=1)
+            filters["end"] = min(filters["end"], day_end) if filters["end"] else day_end
+    except ValueError:
+        return None, "Invalid date format (YYYY-MM-DD)"
+
+    limit = args.get("limit")
+    if limit is not None:
+        if not str(limit).isdigit() or not (1 <= int(limit) <= TRADE_PAGE_MAX):
+            return None, f"Invalid limit (1 ~ {TRADE_PAGE_MAX})"
+        filters["limit"] = int(limit)
+
+    cursor = args.get("cursor")
+    if cursor:
+        filters["cursor"] = _decode_trade_cursor(cursor)
+        if filters["cursor"] is None:
+            return None, "Invalid cursor"
+        if filters["limit"] is None:
+            filters["limit"] = TRADE_PAGE_SIZE
+
+    return filters, None
+
+# 페이지 커서 변환 : 마지막 행의 (timestamp, id)
+def _encode_trade_cursor(row):
+    raw = f"{row['timestamp'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_trade_cursor(value):
+    try:
+        timestamp, trade_id = base64.urlsafe_b64decode(value.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(trade_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
 
+# 거래 내역 조회 쿼리 생성
+def _build_trade_history_query(filters):
+    sql = "SELECT id, buyer_id, amount, timestamp FROM trade_history WHERE 1=1"
+    params = []
+
+    if filters["user_id"] is not None:
+        sql += " AND buyer_id = %s"
+        params.append(filters["user_id"])
+    if filters["start"] is not None:
+        sql += " AND timestamp >= %s"
+        params.append(filters["start"])
+    if filters["end"] is not None:
+        sql += " AND timestamp < %s"
+        params.append(filters["end"])
+    # 키셋 페이지네이션 : 이전 페이지 마지막 행 다음부터
+    if filters["cursor"] is not None:
+        timestamp, trade_id = filters["cursor"]
+        sql += " AND (timestamp < %s OR (timestamp = %s AND id < %s))"
+        params.extend([timestamp, timestamp, trade_id])
+    sql += " ORDER BY timestamp DESC, id DESC"
+
+    return sql, params
+
+# 거래 내역 페이지 조회
+@handle_errors("DB Trade")
+def get_trade_history_page(filters):
+    """
+    거래 내역 1페이지 조회 (최신순, limit 건)
+    반환 : {"items": [...], "next_cursor": 다음 페이지 커서 또는 None}
+    """
+    sql, params = _build_trade_history_query(filters)
+    sql += " LIMIT %s"
+    # 다음 페이지 존재 여부 확인용으로 1건 더 조회
+    params.append(filters["limit"] + 1)
+
+    with db_transaction() as (_, cursor):
         cursor.execute(sql, params)
-        result = cursor.fetchall()
+        rows = cursor.fetchall()
 
-        return result, None, 200
+    items = rows[:filters["limit"]]
+    next_cursor = _encode_trade_cursor(items[-1]) if len(rows) > filters["limit"] else None
+    return {"items": items, "next_cursor": next_cursor}, None, 200
+
+# 거래 내역 스트림용 1페이지 조회 (연결은 조회 후 바로 반환)
+def _fetch_trade_chunk(filters):
+    sql, params = _build_trade_history_query(filters)
+    sql += " LIMIT %s"
+    params.append(TRADE_EXPORT_CHUNK)
+
+    with db_transaction() as (_, cursor):
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+# 거래 내역 순차 조회 (TRADE_EXPORT_CHUNK 건씩 키셋 조회)
+def _iter_trade_rows(filters, rows):
+    # 전송 중에는 연결을 잡고 있지 않음 (느린 다운로드가 연결 풀을 점유하지 않음)
+    while rows:
+        yield from rows
+        if len(rows) < TRADE_EXPORT_CHUNK:
+            return
+        # 다음 페이지 : 마지막 행 (timestamp, id) 다음부터
+        last = rows[-1]
+        filters = dict(filters, cursor=(last["timestamp"], last["id"]))
+        rows = _fetch_trade_chunk(filters)
+
+# 거래 내역 전체 스트림 조회
+@handle_errors("DB Trade")
+def stream_trade_history(filters):
+    """
+    조건에 맞는 거래 내역을 한 번에 메모리에 올리지 않고 순차 반환하는 generator 생성
+    페이지마다 연결을 잠깐 사용 후 반환, 첫 페이지 연결/쿼리 오류는 응답 전송 전에 여기서 반환
+    """
+    rows = _fetch_trade_chunk(filters)
+    return _iter_trade_rows(filters, rows), None, 200
 
 # 현재 릴레이 상태 조회
 @handle_errors("DB Relay")
 def get_current_relay_status():
     """
     현재 릴레이 상태 조회
+    캐시가 있으면 DB 조회 없이 반환 (최초 1회 또는 RELAY_CACHE_TTL 만료 시에만 DB 조회)
+    다른 워커 프로세스의 변경은 최대 RELAY_CACHE_TTL 초 후 반영
     """
-    with db_transaction() as (_, cursor):
-        sql = "SELECT relay_name, status FROM relay_status WHERE relay_name IN ('A','B','C','D')"
-        cursor.execute(sql)
-        current_status = {row['relay_name']: row['status'] for row in cursor.fetchall()}
+    with _relay_lock:
+        cached = _relay_cache["status"]
+        expired = time.monotonic() - _relay_cache["checked_at"] >= RELAY_CACHE_TTL
 
-        print("\n릴레이 상태 조회 : 조회 성공")
-        return current_status, None, 200
+    if cached is not None and not expired:
+        return dict(cached), None, 200
 
-# 아두이노에 릴레이 제어 전송
-def send_to_arduino(data, arduino_url):
-    """
-    아두이노에 릴레이 제어 전송
-    """
-    try:
-        if not arduino_url:
-            print("\n아두이노 제어 : URL 미설정")
-            return False, "Arduino : Arduino URL not configured", 503
+    # 조회 중 커밋된 변경을 이전 값으로 덮어쓰지 않도록 변경 구간과 직렬화
+    with _relay_write_lock:
+        with db_transaction() as (_, cursor):
+            sql = "SELECT relay_name, status FROM relay_status WHERE relay_name IN ('A','B','C','D')"
+            cursor.execute(sql)
+            current_status = {row['relay_name']: row['status'] for row in cursor.fetchall()}
 
-        response = requests.post(arduino_url, json=data, timeout=5)
+        _update_relay_cache(current_status, replace=True)
 
-        if response.status_code != 200:
-            print(f"\n아두이노 제어 : 응답 오류 (status: {response.status_code})")
-            return False, "Arduino : Arduino response error", 502
+    logger.debug("릴레이 상태 조회 : 조회 성공")
+    return current_status, None, 200
 
-    except requests.exceptions.Timeout:
-        print("\n아두이노 제어 : 응답 시간 초과")
-        return False, "Arduino : Arduino timeout", 504
+# 릴레이 상태 버전 조회
+def get_relay_version():
+    """
+    릴레이 상태 버전 반환 (상태가 바뀔 때마다 증가)
+    """
+    with _relay_lock:
+        return _relay_cache["version"]
 
-    except requests.exceptions.ConnectionError:
-        print("\n아두이노 제어 : 연결 실패")
-        return False, "Arduino : Arduino connection failed", 503
+# 릴레이 상태 문자열 변환 (예: "1010")
+def get_relay_code(current_status):
+    """
+    A~D 채널 상태를 "1"(on) / "0"(off) 문자열로 변환 (아두이노 제어 응답 및 ETag 용)
+    """
+    return "".join("1" if current_status.get(ch) == "on" else "0" for ch in ["A", "B", "C", "D"])
 
-    except Exception as e:
-        print(f"\n아두이노 제어 : 통신 오류 - {e}")
-        return False, "Arduino : Failed to process request", 500
+# 아두이노에 릴레이 제어 전송
+def send_to_arduino(data, arduino_url):
+    """
+    아두이노에 릴레이 제어 전송 예약 (백그라운드 전송, 바로 202 반환)
+    전송 결과는 get_arduino_stats() 로 확인
+    """
+    if not arduino_url:
+        logger.warning("아두이노 제어 : URL 미설정")
+        return False, "Arduino : Arduino URL not configured", 503
 
-    print("\n아두이노 제어 : 성공")
-    return True, None, 200
+    return arduino_dispatcher.submit(arduino_url, data)
 
 # 현재 사용중인 채널 확인
 def get_active_relay_list():
@@ -123,12 +335,12 @@ def get_active_relay_list():
     # 활성화 채널만 필터링
     active_list = [name for name, status in current_status.items() if status == "on"]
 
-    print(f"\n현재 사용중인 채널 : {active_list}")
+    logger.debug(f"현재 사용중인 채널 : {active_list}")
     return active_list, None, 200
 
 # 서버 실행 시 자동으로 릴레이 off
 def reset_relay():
-    print("\n릴레이 제어 : 릴레이 초기화 시작")
+    logger.info("릴레이 제어 : 릴레이 초기화 시작")
     data = {
         "A": False,
         "B": False,
@@ -138,31 +350,6 @@ def reset_relay():
     # DB 저장 함수 호출
     success, message, status_code = update_relay_status_in_db(data)
     if success:
-        print("\n릴레이 제어 : 릴레이 초기화 완료\n")
+        logger.info("릴레이 제어 : 릴레이 초기화 완료")
     return success, message, status_code
 
-# 거래 내역 DB에 저장
-def save_relay_state_changes(data, current_status):
-    """
-    릴레이 변경 사항(OFF -> ON)을 DB에 저장
-    """
-    for channel, new_state in data.items():
-        old_state = current_status.get(channel, "off")
-        if old_state == "off" and new_state == True:
-            # 채널명을 buyer_id로 변환
-            buyer_id = get_buyer_id_from_channel(channel)
-            # 채널별 소비전력 조회
-            amount = CHANNEL_CONFIG.get(channel)
-            if buyer_id in [1,2,3,4] and amount >= 0:
-                # DB에 거래 내역 저장
-                success, message, status_code = insert_trade_history(buyer_id, amount)
-                if not success:
-                    print(f"저장 실패 : ({channel}) / {message}")
-                    return success, message, status_code
-                else:
-                    print(f"성공 내역 : ({channel}) / {amount}W")
-            else:
-                print("\n릴레이 제어 : 필수 데이터 입력값 오류")
-                return False, "Invalid input values", 400
-    print("\n릴레이 제어 : 저장 완료")
-    return True, "Relay state updated successfully", 201
@@ -0,0 +1,296 @@
+from app.services.common_service import DBException, db_transaction, handle_errors
+from app.services.energy_service import (
+    get_current_model,
+    set_model,
+    lux_to_insolation,
+    FEATURE_COLUMNS,
+    RETRAINED_MODEL_DIR,
+    CURRENT_MODEL_FILE
+)
+from app.services.forest_service import CompactForest, export_forest
+from datetime import datetime, timedelta
+from pathlib import Path
+import multiprocessing
+import numpy as np
+import json
+import os
+import shutil
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 모델 재학습 설정
+# 시간별 집계 테이블로 학습 데이터 생성 -> 별도 프로세스에서 학습 -> 최근 구간(holdout)으로 현재 모델과 비교 -> 통과 시 교체
+RETRAIN_ENABLED = os.getenv("RETRAIN_ENABLED", "false").lower() == "true"
+RETRAIN_HOUR = int(os.getenv("RETRAIN_HOUR", 3)) # 스케줄 실행 시각 (매일)
+RETRAIN_DAYS = int(os.getenv("RETRAIN_DAYS", 365)) # 학습 데이터 기간 (일)
+RETRAIN_HOLDOUT = float(os.getenv("RETRAIN_HOLDOUT", 0.2)) # 검증용 최근 데이터 비율
+RETRAIN_TOLERANCE = float(os.getenv("RETRAIN_TOLERANCE", 0.0)) # 허용 RMSE 증가 비율 (0.05 : 현재 모델보다 5% 나쁜 것까지 허용)
+RETRAIN_MIN_ROWS = int(os.getenv("RETRAIN_MIN_ROWS", 200)) # 최소 학습 행 수
+RETRAIN_KEEP = int(os.getenv("RETRAIN_KEEP", 3)) # 보관할 이전 버전 수
+RETRAIN_TIMEOUT = int(os.getenv("RETRAIN_TIMEOUT", 1800)) # 학습 프로세스 최대 실행 시간 (초)
+RETRAIN_N_JOBS = int(os.getenv("RETRAIN_N_JOBS") or max(1, (os.cpu_count() or 1) - 1)) # 학습에 사용할 코어 수 (기본 : 1코어는 API 처리용으로 남김)
+
+# 하이퍼 파라미터 (ml/config.json, 탐색 결과 그대로 사용)
+ML_CONFIG_PATH = Path(__file__).parent.parent.parent.parent.parent / "ml" / "config.json"
+DEFAULT_PARAMS = {"n_estimators": 100, "max_depth": 20, "min_samples_split": 5, "min_samples_leaf": 5}
+
+# 예측 시간 (1h/2h/3h)
+HORIZONS = (1, 2, 3)
+# 예측 대상 시간 (학습 스크립트와 같이 15시 이후 행 제외)
+MAX_FEATURE_HOUR = 15
+
+_run_lock = threading.Lock()
+_stats = {
+    "last_run_at": None,
+    "last_status": None,
+    "last_message": None,
+    "candidate_version": None,
+    "candidate_rmse": None,
+    "current_rmse": None,
+    "train_rows": 0,
+    "holdout_rows": 0,
+    "duration_ms": None
+}
+
+def _load_params():
+    try:
+        with open(ML_CONFIG_PATH) as f:
+            config = json.load(f)
+        return {key: config.get(key, value) for key, value in DEFAULT_PARAMS.items()}
+    except (OSError, ValueError) as e:
+        logger.warning(f"모델 재학습 : config 읽기 실패, 기본값 사용 - {e}")
+        return dict(DEFAULT_PARAMS)
+
+# 시간별 집계 행 -> 학습 행렬
+def build_training_set(rows):
+    """
+    rows : [{"date", "hour", "avg_solar_w", "avg_lux"}, ...]
+    시간 단위 배열에 값을 채운 뒤 이전 시간 / 전날 같은 시간 / 1~3시간 뒤 값을 인덱스로 한 번에 조회
+    특성 순서는 FEATURE_COLUMNS 와 동일, 필요한 값이 하나라도 없는 행은 제외
+    반환 : (X, y) - 시간순 정렬
+    """
+    if not rows:
+        return np.empty((0, len(FEATURE_COLUMNS))), np.empty((0, len(HORIZONS)))
+
+    first_day = min(row["date"] for row in rows)
+    slots = np.array([(row["date"] - first_day).days * 24 + row["hour"] for row in rows], dtype=np.int64)
+    n_slots = int(slots.max()) + 1 + max(HORIZONS)
+
+    generation = np.full(n_slots, np.nan)
+    lux = np.full(n_slots, np.nan)
+    generation[slots] = [np.nan if row["avg_solar_w"] is None else row["avg_solar_w"] for row in rows]
+    lux[slots] = [np.nan if row["avg_lux"] is None else row["avg_lux"] for row in rows]
+
+    # 특성 기준 시간 (전날 데이터가 필요하므로 첫날 제외)
+    hours = slots % 24
+    base = np.sort(slots[(hours <= MAX_FEATURE_HOUR) & (slots >= 24)])
+
+    targets = np.stack([generation[base + h] for h in HORIZONS], axis=1)
+    days = (np.datetime64(first_day, "D") + base // 24).astype(object)
+    X = np.column_stack([
+        [day.year for day in days],
+        [day.month for day in days],
+        [day.day for day in days],
+        base % 24,
+        generation[base],
+        generation[base - 1],
+        generation[base - 24],
+        lux_to_insolation(lux[base])
+    ]).astype(np.float64)
+
+    valid = ~(np.isnan(X).any(axis=1) | np.isnan(targets).any(axis=1))
+    return X[valid], targets[valid]
+
+# 학습 데이터 조회
+def _fetch_training_rows(today):
+    with db_transaction() as (_, cursor):
+        sql = """
+            SELECT date, hour, avg_solar_w, avg_lux
+            FROM sun_data_hourly
+            WHERE date >= %s
+            ORDER BY date, hour
+        """
+        cursor.execute(sql, (today - timedelta(days=RETRAIN_DAYS),))
+        return cursor.fetchall()
+
+# 학습 프로세스 작업 (요청 처리 프로세스와 GIL을 공유하지 않음)
+def _train_worker(X, y, params, out_dir, n_jobs):
+    """
+    RandomForest 학습 후 압축 포레스트로 저장 (부모 프로세스는 메모리 매핑으로 로드)
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    model = RandomForestRegressor(**params, n_jobs=n_jobs, random_state=42)
+    model.fit(X, y)
+    return export_forest(model, out_dir)
+
+# 학습 프로세스 실행 (RETRAIN_TIMEOUT 초과 시 강제 종료)
+def _run_training_process(X, y, params, out_dir):
+    """
+    종료 코드 0 + meta.json 저장 완료일 때만 성공, 그 외에는 예외 발생
+    """
+    process = multiprocessing.get_context("spawn").Process(
+        target=_train_worker, args=(X, y, params, str(out_dir), RETRAIN_N_JOBS), name="retrain-model", daemon=True
+    )
+    process.start()
+    process.join(RETRAIN_TIMEOUT)
+    if process.is_alive():
+        process.terminate()
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        raise DBException(f"Model Retrain : Training exceeded {RETRAIN_TIMEOUT} seconds", 504)
+    if process.exitcode != 0 or not (Path(out_dir) / "meta.json").exists():
+        raise DBException(f"Model Retrain : Training process failed (exit code {process.exitcode})", 500)
+
+# 재학습 결과 기록
+def _finish(start, status, message=None):
+    _stats.update(last_status=status, last_message=message, duration_ms=int((time.perf_counter() - start) * 1000))
+    return dict(_stats)
+
+def _rmse(model, X, y):
+    return float(np.sqrt(np.mean((model.predict(X) - y) ** 2)))
+
+# 현재 버전 파일 교체 (임시 파일에 쓴 뒤 rename)
+def _write_current_version(version):
+    tmp_path = CURRENT_MODEL_FILE.with_name(f".{CURRENT_MODEL_FILE.name}.tmp-{os.getpid()}")
+    tmp_path.write_text(version + "\n")
+    os.replace(tmp_path, CURRENT_MODEL_FILE)
+
+# 오래된 버전 삭제 (현재 버전 + 최근 RETRAIN_KEEP 개 유지)
+def _prune_versions(current_version):
+    versions = sorted(
+        path for path in RETRAINED_MODEL_DIR.iterdir()
+        if path.is_dir() and not path.name.startswith(".") and path.name != current_version
+    )
+    for path in versions[:max(len(versions) - RETRAIN_KEEP, 0)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+# 모델 재학습 실행 (스케줄러)
+@handle_errors("Model Retrain")
+def run_retrain(now=None):
+    """
+    재학습을 현재 스레드에서 실행 (이미 실행 중이면 409)
+    반환 : (재학습 결과 통계, message, status_code)
+    """
+    if not _run_lock.acquire(blocking=False):
+        raise DBException("Model Retrain : Already running", 409)
+    try:
+        return _retrain(now)
+    finally:
+        _run_lock.release()
+
+# 모델 재학습 백그라운드 실행 (수동 실행 API)
+def start_retrain():
+    """
+    별도 스레드에서 재학습 시작 후 바로 반환 (요청 스레드가 학습 종료를 기다리지 않음)
+    이미 실행 중이면 409, 결과는 get_model_info() 의 retrain 항목으로 확인
+    """
+    if not _run_lock.acquire(blocking=False):
+        return False, "Model Retrain : Already running", 409
+
+    _stats.update(last_status="running", last_message=None)
+    try:
+        thread = threading.Thread(target=_run_retrain_in_background, name="model-retrain", daemon=True)
+        thread.start()
+    except Exception:
+        _run_lock.release()
+        raise
+    logger.info("모델 재학습 : 백그라운드 실행 시작")
+    return get_model_info()["retrain"], None, 202
+
+# 백그라운드 재학습 (start_retrain 에서 잡은 실행 잠금을 종료 시 해제)
+def _run_retrain_in_background():
+    try:
+        _retrain_job()
+    finally:
+        _run_lock.release()
+
+@handle_errors("Model Retrain")
+def _retrain_job():
+    return _retrain()
+
+# 모델 재학습 (호출 전에 _run_lock 획득 필요)
+def _retrain(now=None):
+    """
+    1) sun_data_hourly 로 학습 행렬 생성 후 시간순으로 학습 / 검증(최근 RETRAIN_HOLDOUT 비율) 분리
+    2) 별도 프로세스(spawn)에서 학습 -> 임시 디렉토리에 압축 포레스트 저장
+    3) 검증 구간 RMSE가 현재 모델 RMSE x (1 + RETRAIN_TOLERANCE) 이하이면
+       버전 디렉토리로 이동 -> 현재 버전 파일 교체 -> 메모리 모델 교체 (요청 중단 없음)
+    반환 : (재학습 결과 통계, message, status_code)
+    """
+    start = time.perf_counter()
+    now = now or datetime.now()
+    tmp_dir = None
+    try:
+        X, y = build_training_set(_fetch_training_rows(now.date()))
+        holdout_rows = int(len(X) * RETRAIN_HOLDOUT)
+        train_rows = len(X) - holdout_rows
+        _stats.update(
+            last_run_at=now.isoformat(timespec="seconds"), candidate_version=None,
+            candidate_rmse=None, current_rmse=None, train_rows=train_rows, holdout_rows=holdout_rows
+        )
+        if train_rows < RETRAIN_MIN_ROWS or holdout_rows == 0:
+            logger.info(f"모델 재학습 : 학습 데이터 부족 ({train_rows} 행) - 건너뜀")
+            return _finish(start, "skipped", f"Not enough rows ({train_rows}, min {RETRAIN_MIN_ROWS})"), None, 200
+
+        version = now.strftime("%Y%m%d-%H%M%S")
+        RETRAINED_MODEL_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_dir = RETRAINED_MODEL_DIR / f".tmp-{version}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        # 별도 프로세스에서 학습 (spawn : 부모의 스레드/DB 연결을 복제하지 않음)
+        _run_training_process(X[:train_rows], y[:train_rows], _load_params(), tmp_dir)
+
+        # 검증 구간으로 새 모델 / 현재 모델 비교
+        X_holdout, y_holdout = X[train_rows:], y[train_rows:]
+        candidate_rmse = _rmse(CompactForest.load(tmp_dir), X_holdout, y_holdout)
+        try:
+            current_model, current_version = get_current_model()
+            current_rmse = _rmse(current_model, X_holdout, y_holdout)
+        except FileNotFoundError:
+            current_version, current_rmse = None, None
+        _stats.update(candidate_version=version, candidate_rmse=round(candidate_rmse, 4),
+                      current_rmse=None if current_rmse is None else round(current_rmse, 4))
+
+        if current_rmse is not None and candidate_rmse > current_rmse * (1 + RETRAIN_TOLERANCE):
+            logger.info(f"모델 재학습 : 검증 실패 - RMSE {candidate_rmse:.3f} > 현재 {current_rmse:.3f} ({current_version})")
+            return _finish(start, "rejected", f"Candidate RMSE is worse than current model ({current_version})"), None, 200
+
+        # 통과 : 버전 디렉토리 이동 -> 현재 버전 파일 교체 -> 메모리 모델 교체
+        version_dir = RETRAINED_MODEL_DIR / version
+        os.rename(tmp_dir, version_dir)
+        tmp_dir = None
+        _write_current_version(version)
+        set_model(CompactForest.load(version_dir), version)
+        _prune_versions(version)
+
+        logger.info(f"모델 재학습 : 모델 교체 {current_version} -> {version} (RMSE {candidate_rmse:.3f}, 현재 {current_rmse})")
+        return _finish(start, "accepted"), None, 200
+
+    except Exception as e:
+        _finish(start, "failed", str(e))
+        raise
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+# 모델 버전 및 재학습 상태 조회
+def get_model_info():
+    """
+    현재 사용 모델 버전, 트리 수 및 마지막 재학습 결과 반환
+    """
+    try:
+        model, version = get_current_model()
+        n_trees = getattr(model, "n_estimators", None)
+    except FileNotFoundError:
+        version, n_trees = None, None
+    return {
+        "version": version,
+        "n_trees": n_trees,
+        "retrain": {"enabled": RETRAIN_ENABLED, "running": _run_lock.locked(), **_stats}
+    }
@@ -1,77 +1,387 @@
 from app.services.common_service import db_transaction, handle_errors
-from datetime import datetime
+from app.services.stream_service import publish_event
+from app.services.feature_service import feature_store, warm_feature_store
+from app.services.archive_service import archive_rows, compact_archive
+from datetime import datetime, timedelta
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 최신 센서 데이터 캐시 유효 시간 (초)
+# 다른 워커 프로세스가 저장한 데이터는 이 시간 안에 반영됨 (0 : 캐시 미사용)
+SENSOR_CACHE_TTL = float(os.getenv("SENSOR_CACHE_TTL", 10))
+
+# 일괄 수신 데이터의 timestamp 허용 오차 (보드 시계 오차 대비)
+SENSOR_FUTURE_TOLERANCE = timedelta(minutes=5)
+
+# 최신 센서 데이터 캐시 (프로세스 단위)
+_latest_lock = threading.Lock()
+_latest_cache = {
+    "data": None, # 최신 센서 데이터 행
+    "checked_at": 0.0 # 마지막으로 DB와 일치를 확인한 시각
+}
+
+# 캐시 갱신 (더 최신 데이터일 때만)
+def _update_latest_cache(sensor_data):
+    with _latest_lock:
+        cached = _latest_cache["data"]
+        if cached is None or sensor_data["timestamp"] >= cached["timestamp"]:
+            _latest_cache["data"] = sensor_data
+        _latest_cache["checked_at"] = time.monotonic()
+
+# DB에서 최신 센서 데이터 조회
+def _fetch_latest_sensor_data():
+    with db_transaction() as (_, cursor):
+        sql = "SELECT * FROM sun_data_realtime ORDER BY timestamp DESC LIMIT 1"
+        cursor.execute(sql)
+        return cursor.fetchone()
+
+# 서버 시작 시 최신 센서 데이터 캐시 채우기
+@handle_errors("Sensor Data")
+def warm_latest_sensor_cache():
+    """
+    서버 시작 시 DB의 최신 센서 데이터로 캐시 초기화
+    """
+    sensor_data = _fetch_latest_sensor_data()
+    if sensor_data:
+        _update_latest_cache(sensor_data)
+    logger.info("최신 센서 데이터 캐시 : 초기화 완료")
+    return True, None, 200
+
+# 센서 데이터 버전 (ETag 용)
+def get_sensor_version(sensor_data):
+    """
+    최신 센서 데이터의 timestamp + id 로 만든 버전 문자열
+    """
+    return f"{sensor_data['timestamp']:%Y%m%d%H%M%S}-{sensor_data.get('id') or 0}"
 
 # 최신 센서 데이터 조회
 @handle_errors("Sensor Data")
 def get_latest_sensor_data():
     """
     최신 센서 데이터 조회
+    캐시가 SENSOR_CACHE_TTL 이내에 확인된 경우 DB 조회 없이 반환
     """
-    with db_transaction() as (_, cursor):
-        # 데이터 조회
-        sql = "SELECT * FROM sun_data_realtime ORDER BY timestamp DESC LIMIT 1"
-        cursor.execute(sql)
-        sensor_data = cursor.fetchone()
+    with _latest_lock:
+        cached = _latest_cache["data"]
+        fresh = time.monotonic() - _latest_cache["checked_at"] < SENSOR_CACHE_TTL
+
+    if cached is not None and fresh:
+        return dict(cached), None, 200
+
+    # 캐시 만료 시 DB 재조회
+    sensor_data = _fetch_latest_sensor_data()
 
-        if not sensor_data:
-            print("\n최신 센서 데이터 조회 : 데이터가 존재하지 않습니다.")
-            return None, "Sensor Data : Data not found", 404
+    if not sensor_data:
+        logger.warning("최신 센서 데이터 조회 : 데이터가 존재하지 않습니다.")
+        return None, "Sensor Data : Data not found", 404
 
-        print("\n최신 센서 데이터 조회 : 조회 성공")
-        return sensor_data, None, 200
+    _update_latest_cache(sensor_data)
+    logger.debug("최신 센서 데이터 조회 : 조회 성공")
+    return dict(sensor_data), None, 200
         
 # 센서 데이터 DB에 저장
 @handle_errors("Sensor Data")
 def save_sensor_data(soc, solar_w, lux):
     """
     센서 데이터 DB에 저장
+    커밋 후 최신 센서 데이터 캐시도 함께 갱신 (write-through)
     """
     with db_transaction() as (_, cursor):
-        # 서버 현재 시간을 timestamp로 사용
-        now = datetime.now()
+        # 서버 현재 시간을 timestamp로 사용 (DB datetime 정밀도에 맞춰 초 단위)
+        now = datetime.now().replace(microsecond=0)
 
         # 데이터 저장
         sql = "INSERT INTO sun_data_realtime (soc, solar_w, lux, timestamp) VALUES (%s, %s, %s, %s)"
         cursor.execute(sql, (soc, solar_w, lux, now))
+        row_id = cursor.lastrowid
+
+    # 커밋 완료 후 캐시 갱신 및 스트림 구독자에게 전송
+    sensor_data = {
+        "id": row_id,
+        "timestamp": now,
+        "soc": soc,
+        "solar_w": solar_w,
+        "lux": lux
+    }
+    _update_latest_cache(sensor_data)
+    feature_store.record_reading(now, solar_w, lux)
+    publish_event("sensor", sensor_data)
+
+    logger.debug("아두이노 데이터 수신 : 저장 성공")
+    return True, None, 201
+
+# 센서 데이터 1건 유효성 검사
+def _parse_sensor_reading(item, now):
+    if not isinstance(item, dict):
+        return None, "Invalid reading format"
+
+    soc = item.get("soc") # 현재 배터리 잔량
+    solar_w = item.get("solar_w") # 페널 전력 생산량
+    lux = item.get("lux") # 조도값
+
+    if soc is None or solar_w is None or lux is None:
+        return None, "Missing required fields"
+    if any(isinstance(v, bool) or not isinstance(v, (int, float)) for v in (soc, solar_w, lux)):
+        return None, "Invalid input values"
+    if not (0 <= soc <= 100) or solar_w < 0 or lux < 0:
+        return None, "Invalid input values"
+
+    # timestamp 미지정 시 서버 현재 시간 사용
+    timestamp = item.get("timestamp")
+    if timestamp is None:
+        timestamp = now
+    else:
+        try:
+            timestamp = datetime.fromisoformat(str(timestamp))
+        except ValueError:
+            return None, "Invalid timestamp"
+        # 타임존 포함 시 서버 로컬 시간으로 변환
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone().replace(tzinfo=None)
+        timestamp = timestamp.replace(microsecond=0)
+        if timestamp > now + SENSOR_FUTURE_TOLERANCE:
+            return None, "Timestamp is in the future"
 
-        print("\n아두이노 데이터 수신 : 저장 성공")
+    return (soc, solar_w, lux, timestamp), None
+
+# 센서 데이터 여러 건 유효성 검사 (한 번에 전체 검사)
+def parse_sensor_batch(items):
+    """
+    센서 데이터 목록을 한 번에 검사
+    반환값 : (저장할 행 리스트, 오류 리스트)
+    """
+    now = datetime.now().replace(microsecond=0)
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        row, message = _parse_sensor_reading(item, now)
+        if message:
+            errors.append({"index": index, "message": message})
+        else:
+            rows.append(row)
+    return rows, errors
+
+# 센서 데이터 여러 건 DB에 저장
+@handle_errors("Sensor Data")
+def save_sensor_data_batch(rows):
+    """
+    센서 데이터 여러 건을 하나의 트랜잭션으로 저장 (executemany)
+    rows : (soc, solar_w, lux, timestamp) 튜플 리스트
+    """
+    if not rows:
         return True, None, 201
 
+    newest = max(row[3] for row in rows)
+    with db_transaction() as (_, cursor):
+        sql = "INSERT INTO sun_data_realtime (soc, solar_w, lux, timestamp) VALUES (%s, %s, %s, %s)"
+        cursor.executemany(sql, rows)
+
+        # 저장 후 최신 행 조회 (id 포함, /api/data/latest 와 같은 형식)
+        sql = "SELECT * FROM sun_data_realtime ORDER BY timestamp DESC LIMIT 1"
+        cursor.execute(sql)
+        latest = cursor.fetchone()
+
+    for soc, solar_w, lux, timestamp in rows:
+        feature_store.record_reading(timestamp, solar_w, lux)
+
+    # 캐시보다 최신 데이터가 들어온 경우에만 캐시 갱신 및 스트림 구독자에게 전송
+    with _latest_lock:
+        cached = _latest_cache["data"]
+        is_newest = cached is None or newest >= cached["timestamp"]
+
+    if is_newest and latest:
+        _update_latest_cache(latest)
+        publish_event("sensor", latest)
+
+    logger.debug(f"센서 데이터 일괄 저장 : {len(rows)} 건 저장 성공")
+    return True, None, 201
+
+# 시간별 집계 작업 설정
+ROLLUP_JOB_NAME = "sun_data_hourly" # 워터마크 테이블의 작업 이름
+ROLLUP_RETENTION_HOURS = 24 # 원본 데이터 보관 시간
+ROLLUP_CHUNK_SIZE = int(os.getenv("ROLLUP_CHUNK_SIZE", 5000)) # 한 트랜잭션에서 처리할 최대 행 수
+
+# 마지막 집계 작업 결과
+_rollup_stats = {
+    "last_run_at": None, # 마지막 실행 시각
+    "rows": 0, # 처리한 원본 행 수
+    "hours": 0, # 처리한 시간 구간 수
+    "late_rows": 0, # 워터마크 이전에 늦게 들어온 행 수
+    "archived_rows": 0, # 삭제 전 보관소에 저장한 행 수
+    "duration": 0.0, # 소요 시간 (초)
+    "watermark": None # 집계 완료 시각 (이 시각 이전 데이터는 집계 완료)
+}
+
+# 저장된 워터마크 조회
+def _get_rollup_watermark(cursor):
+    cursor.execute("SELECT watermark FROM rollup_watermark WHERE job_name = %s", (ROLLUP_JOB_NAME,))
+    row = cursor.fetchone()
+    return row["watermark"] if row else None
+
+# 집계 대상 구간 집계 (청크 단위)
+def _rollup_range(cutoff, watermark):
+    """
+    cutoff 이전 원본 데이터를 id 순 청크 단위로 집계 후 삭제 (청크 하나가 여러 시간 구간을 포함할 수 있음)
+    실행 시작 시점의 대상 id 범위만 처리 (실행 중 들어온 과거 시각 데이터는 다음 실행에서 처리)
+    청크마다 집계(병합), 보관소 저장(청크당 1회), 삭제를 한 트랜잭션으로 처리하므로 중간에 중단되어도 재실행 시 안전
+    마지막 청크와 함께 워터마크를 처리한 마지막 시간 구간 끝으로 갱신
+    watermark : 실행 전 워터마크 (이전 시간 구간 행 = 늦게 수신된 데이터)
+    반환 : (처리 행 수, 시간 구간 수, 늦게 수신된 행 수, 보관소 저장 행 수, 새 워터마크)
+    """
+    processed, late_rows, archived = 0, 0, 0
+    hour_starts = set()
+
+    # 처리할 id 범위 상한 (idx_timestamp 로 조회, 잠금 없음)
+    # 청크 조회를 id <= max_id 로 제한해 PK 스캔이 마지막 행 뒤(supremum) 구간까지 잠그지 않도록 함
+    # -> 잠금은 이미 저장된 행에만 걸리고 새 행 INSERT(AUTO_INCREMENT, max_id 이후)는 대기하지 않음
+    with db_transaction() as (_, cursor):
+        cursor.execute("SELECT MAX(id) as max_id FROM sun_data_realtime WHERE timestamp < %s", (cutoff,))
+        row = cursor.fetchone()
+    max_id = row["max_id"] if row else None
+    if max_id is None:
+        return 0, 0, 0, 0, watermark
+
+    while True:
+        with db_transaction() as (_, cursor):
+            # 처리할 청크 잠금 (max_id 이하 범위만 스캔)
+            sql_chunk = """
+                SELECT id, timestamp, soc, solar_w, lux FROM sun_data_realtime
+                WHERE id <= %s AND timestamp < %s
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE
+            """
+            cursor.execute(sql_chunk, (max_id, cutoff, ROLLUP_CHUNK_SIZE))
+            chunk = cursor.fetchall()
+            if chunk:
+                last_id = chunk[-1]["id"]
+
+                # 청크의 시간 구간별 행 수 (처리 구간 수, 늦게 수신된 행 수 계산용)
+                sql_hours = """
+                    SELECT DATE(timestamp) as date, HOUR(timestamp) as hour, COUNT(*) as count
+                    FROM sun_data_realtime
+                    WHERE timestamp < %s AND id <= %s
+                    GROUP BY DATE(timestamp), HOUR(timestamp)
+                """
+                cursor.execute(sql_hours, (cutoff, last_id))
+                hour_counts = cursor.fetchall()
+
+                # 기존 집계값과 표본 수 기준 가중 평균으로 병합 (시간 구간별)
+                sql_merge = """
+                    INSERT INTO sun_data_hourly (date, hour, avg_soc, avg_solar_w, avg_lux, sample_count)
+                    SELECT
+                        DATE(timestamp) as date,
+                        HOUR(timestamp) as hour,
+                        AVG(soc) as avg_soc,
+                        AVG(solar_w) as avg_solar_w,
+                        AVG(lux) as avg_lux,
+                        COUNT(*) as sample_count
+                    FROM sun_data_realtime
+                    WHERE timestamp < %s AND id <= %s
+                    GROUP BY DATE(timestamp), HOUR(timestamp)
+                    ON DUPLICATE KEY UPDATE
+                        avg_soc = (avg_soc * sample_count + VALUES(avg_soc) * VALUES(sample_count)) / (sample_count + VALUES(sample_count)),
+                        avg_solar_w = (avg_solar_w * sample_count + VALUES(avg_solar_w) * VALUES(sample_count)) / (sample_count + VALUES(sample_count)),
+                        avg_lux = (avg_lux * sample_count + VALUES(avg_lux) * VALUES(sample_count)) / (sample_count + VALUES(sample_count)),
+                        sample_count = sample_count + VALUES(sample_count)
+                """
+                cursor.execute(sql_merge, (cutoff, last_id))
+
+                # 삭제 전 원본 데이터 보관 (저장 실패 시 롤백되어 삭제되지 않음)
+                archived += archive_rows(chunk)
+
+                # 집계한 원본 데이터 제거
+                sql_delete = """
+                    DELETE FROM sun_data_realtime
+                    WHERE timestamp < %s AND id <= %s
+                """
+                cursor.execute(sql_delete, (cutoff, last_id))
+
+                processed += len(chunk)
+                for row in hour_counts:
+                    hour_start = datetime.combine(row["date"], datetime.min.time()) + timedelta(hours=row["hour"])
+                    hour_starts.add(hour_start)
+                    # 워터마크 이전 구간 = 늦게 수신된 데이터 (기존 집계값에 병합됨)
+                    if watermark is not None and hour_start + timedelta(hours=1) <= watermark:
+                        late_rows += row["count"]
+
+            # 구간 처리 완료 시 워터마크 갱신 (마지막 청크와 같은 트랜잭션)
+            done = len(chunk) < ROLLUP_CHUNK_SIZE
+            if done and hour_starts:
+                last_hour_end = max(hour_starts) + timedelta(hours=1)
+                watermark = last_hour_end if watermark is None else max(watermark, last_hour_end)
+                sql_watermark = """
+                    INSERT INTO rollup_watermark (job_name, watermark) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE watermark = GREATEST(COALESCE(watermark, VALUES(watermark)), VALUES(watermark))
+                """
+                cursor.execute(sql_watermark, (ROLLUP_JOB_NAME, watermark))
+
+        if done:
+            return processed, len(hour_starts), late_rows, archived, watermark
+
 # 일정 시간 이후 데이터를 1시간 평균으로 저장
 @handle_errors("Sensor Data")
 def aggregate_old_data():
     """
     일정 시간 이후 데이터를 1시간 평균으로 집계하여 저장
+    집계 대상 구간 전체를 id 순 청크로 나누어 처리 (청크마다 트랜잭션 1회, 보관소 저장 1회)
     """
+    start = time.monotonic()
+
+    # 집계 기준 시각 (이 시각 이전의 완료된 시간 구간만 집계)
+    cutoff = (datetime.now() - timedelta(hours=ROLLUP_RETENTION_HOURS - 1)).replace(minute=0, second=0, microsecond=0)
+
     with db_transaction() as (_, cursor):
-        # 시간 지정
-        hours = 24
+        watermark = _get_rollup_watermark(cursor)
 
-        # 데이터 저장
-        sql_select = """
-            INSERT INTO sun_data_hourly (date, hour, avg_soc, avg_solar_w, avg_lux)
-            SELECT
-                DATE(timestamp) as date,
-                HOUR(timestamp) as hour,
-                AVG(soc) as avg_soc,
-                AVG(solar_w) as avg_solar_w,
-                AVG(lux) as avg_lux
-            FROM sun_data_realtime
-            WHERE timestamp <= DATE_FORMAT(NOW() - INTERVAL %s HOUR, '%Y-%m-%d %H:00:00')
-            GROUP BY DATE(timestamp), HOUR(timestamp)
+    rows, hours, late_rows, archived, watermark = _rollup_range(cutoff, watermark)
+
+    duration = time.monotonic() - start
+
+    # 실행 기록 저장 (처리할 데이터가 없던 첫 실행도 기록, 워터마크는 집계 전까지 NULL)
+    with db_transaction() as (_, cursor):
+        sql_record = """
+            INSERT INTO rollup_watermark (job_name, last_run_at, last_rows, last_duration_ms)
+            VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE
-                avg_soc = VALUES(avg_soc),
-                avg_solar_w = VALUES(avg_solar_w),
-                avg_lux = VALUES(avg_lux)
+                last_run_at = VALUES(last_run_at),
+                last_rows = VALUES(last_rows),
+                last_duration_ms = VALUES(last_duration_ms)
         """
+        cursor.execute(sql_record, (ROLLUP_JOB_NAME, datetime.now().replace(microsecond=0), rows, int(duration * 1000)))
 
-        # 저장한 원본 데이터 제거
-        sql_delete = """
-            DELETE FROM sun_data_realtime
-            WHERE timestamp <= DATE_FORMAT(NOW() - INTERVAL %s HOUR, '%Y-%m-%d %H:00:00')
-        """
-        cursor.execute(sql_select, (hours-1,))
-        cursor.execute(sql_delete, (hours-1,))
+    _rollup_stats.update({
+        "last_run_at": datetime.now().replace(microsecond=0),
+        "rows": rows,
+        "hours": hours,
+        "late_rows": late_rows,
+        "archived_rows": archived,
+        "duration": duration,
+        "watermark": watermark
+    })
+
+    logger.info(f"데이터 집계 : 성공 ({hours} 시간 구간, {rows} 행, {duration:.2f} 초)")
 
-        print("\n데이터 집계 : 성공")
-        return True, None, 201
\ No newline at end of file
+    # 후속 작업 (집계는 이미 커밋됨 : 실패해도 로그만 남기고 집계 결과는 성공 처리)
+    # 새 시간별 평균을 모델 특성 저장소에 반영
+    try:
+        warm_feature_store(datetime.now())
+    except Exception as e:
+        logger.exception(f"데이터 집계 : 특성 저장소 갱신 실패 - {e}")
+
+    # 집계가 끝난 날짜의 보관소 part 병합
+    try:
+        compact_archive(cutoff.date())
+    except Exception as e:
+        logger.exception(f"데이터 집계 : 보관소 병합 실패 - {e}")
+    return True, None, 201
+
+# 마지막 집계 작업 결과 조회
+def get_rollup_stats():
+    """
+    마지막 시간별 집계 작업의 처리 행 수 및 소요 시간 반환
+    """
+    return dict(_rollup_stats)
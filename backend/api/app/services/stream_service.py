@@ -0,0 +1,180 @@
+from flask import json
+import os
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 스트림 설정
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", 100)) # 최대 동시 구독자 수
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 100)) # 구독자별 대기 이벤트 최대 개수
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", 15)) # 하트비트 전송 주기 (초)
+LONGPOLL_MAX_WAIT = float(os.getenv("LONGPOLL_MAX_WAIT", 60)) # long-poll 최대 대기 시간 (초)
+
+# SSE 메시지 형식 변환
+def format_event(event, data, event_id=None):
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    message += f"data: {json.dumps(data)}\n\n"
+    return message
+
+# 이벤트 분배(fan-out) 클래스
+class EventHub:
+    """
+    발행된 이벤트 1건을 모든 구독자 큐에 분배
+    - 메시지는 발행 시 1회만 직렬화 (구독자별 DB 조회/직렬화 없음)
+    - 구독자 수 제한, 느린 구독자는 오래된 이벤트부터 버림
+    """
+    def __init__(self, max_subscribers, queue_size):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._listeners = [] # 프로세스 내부 콜백 (캐시 무효화 등)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock) # long-poll 대기용
+        self._seq = 0 # 이벤트 일련번호
+        self._event_counts = {} # 이벤트 종류별 발행 수
+        self._stats = {
+            "published": 0, # 발행 이벤트 수
+            "dropped": 0, # 느린 구독자에게서 버려진 이벤트 수
+            "rejected": 0 # 구독자 수 초과로 거부된 연결 수
+        }
+
+    def subscribe(self):
+        """
+        구독 등록 (구독자 수 초과 시 None 반환)
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self._stats["rejected"] += 1
+                return None
+            subscriber = queue.Queue(maxsize=self.queue_size)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def is_full(self):
+        """
+        구독자 수 제한 도달 여부 (연결 수락 전 확인용, 초과 시 거부 수 집계)
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self._stats["rejected"] += 1
+                return True
+            return False
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def add_listener(self, callback):
+        """
+        프로세스 내부 콜백 등록 (callback(event, data), 발행 스레드에서 바로 실행)
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def publish(self, event, data):
+        """
+        이벤트 발행 (내부 콜백 실행 후 모든 구독자 큐에 전달)
+        """
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(event, data)
+            except Exception as e:
+                logger.exception(f"이벤트 콜백 : 오류 - {e}")
+
+        with self._lock:
+            self._seq += 1
+            self._stats["published"] += 1
+            self._event_counts[event] = self._event_counts.get(event, 0) + 1
+            self._changed.notify_all()
+            seq = self._seq
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        message = format_event(event, data, seq)
+
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(message)
+                    break
+                except queue.Full:
+                    # 가장 오래된 이벤트를 버리고 재시도
+                    try:
+                        subscriber.get_nowait()
+                        with self._lock:
+                            self._stats["dropped"] += 1
+                    except queue.Empty:
+                        pass
+
+    def event_count(self, events):
+        """
+        지정한 이벤트 종류의 누적 발행 수 (wait_for 기준값)
+        """
+        with self._lock:
+            return sum(self._event_counts.get(event, 0) for event in events)
+
+    def wait_for(self, events, since, timeout):
+        """
+        since 이후 지정한 이벤트가 발행될 때까지 최대 timeout 초 대기 (발행되면 True)
+        """
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: sum(self._event_counts.get(event, 0) for event in events) > since,
+                timeout
+            )
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+            result["subscribers"] = len(self._subscribers)
+        result["max_subscribers"] = self.max_subscribers
+        return result
+
+# 전역 이벤트 허브
+hub = EventHub(STREAM_MAX_SUBSCRIBERS, STREAM_QUEUE_SIZE)
+
+# 프로세스 내부 콜백 등록
+def add_event_listener(callback):
+    """
+    이벤트 발행 시 실행할 콜백 등록 (callback(event, data))
+    """
+    hub.add_listener(callback)
+
+# 이벤트 발행
+def publish_event(event, data):
+    """
+    스트림 구독자에게 이벤트 발행 (event : "sensor" / "relay")
+    """
+    hub.publish(event, data)
+
+# long-poll 대기 시간 변환
+def parse_wait(value):
+    """
+    ?wait= 값을 대기 시간(초)으로 변환 (없거나 잘못된 값이면 0, 최대 LONGPOLL_MAX_WAIT)
+    """
+    try:
+        wait = float(value) if value else 0
+    except ValueError:
+        return 0
+    return max(0, min(wait, LONGPOLL_MAX_WAIT))
+
+# long-poll 조회
+def long_poll(events, load, if_none_match, wait):
+    """
+    load() -> (result, message, status_code, etag)
+    클라이언트가 가진 ETag(If-None-Match)가 현재 ETag와 같으면
+    지정한 이벤트가 발행되거나 wait 초가 지날 때까지 대기 후 다시 조회
+    """
+    since = hub.event_count(events)
+    result = load()
+    etag = result[3]
+    if wait and etag is not None and if_none_match.contains(etag):
+        hub.wait_for(events, since, wait)
+        result = load()
+    return result
@@ -0,0 +1,138 @@
+from app.services.common_service import db_transaction, handle_errors
+from collections import OrderedDict
+from datetime import datetime, date as date_type, timedelta
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 거래 요약 조회 설정
+SUMMARY_PERIODS = ("day", "week", "month")
+SUMMARY_DEFAULT_DAYS = 30 # 기간 미지정 시 조회 일수 (오늘 포함)
+SUMMARY_MAX_DAYS = int(os.getenv("SUMMARY_MAX_DAYS", 3660)) # 한 번에 조회 가능한 최대 일수
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", 256)) # 지난 기간 요약 캐시 최대 개수
+SUMMARY_SETTLE_SECONDS = int(os.getenv("SUMMARY_SETTLE_SECONDS", 300)) # 자정 이후 전날 거래가 확정되기까지 대기 시간 (초)
+
+# 거래 내역을 일별 요약에 반영 (거래 내역 INSERT와 같은 트랜잭션에서 호출)
+def add_trades_to_summary(cursor, trades):
+    """
+    trades : [(date, buyer_id, amount), ...]
+    """
+    sql = """
+        INSERT INTO trade_daily_summary (date, buyer_id, total_amount, trade_count)
+        VALUES (%s, %s, %s, 1)
+        ON DUPLICATE KEY UPDATE
+            total_amount = total_amount + VALUES(total_amount),
+            trade_count = trade_count + 1
+    """
+    cursor.executemany(sql, trades)
+
+# 요약 조회 조건 검사 및 변환
+def parse_summary_filters(args, today=None):
+    """
+    쿼리 파라미터(period, start_date, end_date, user_id)를 검사해 변환
+    반환 : (filters, error) - 오류가 있으면 filters는 None
+    """
+    today = today or date_type.today()
+
+    period = args.get("period", "day")
+    if period not in SUMMARY_PERIODS:
+        return None, f"Invalid period ({', '.join(SUMMARY_PERIODS)})"
+
+    user_id = args.get("user_id")
+    if user_id:
+        if not str(user_id).isdigit():
+            return None, "Invalid user_id"
+        user_id = int(user_id)
+    else:
+        user_id = None
+
+    try:
+        end = date_type.fromisoformat(args["end_date"]) if args.get("end_date") else today
+        start = date_type.fromisoformat(args["start_date"]) if args.get("start_date") else end - timedelta(days=SUMMARY_DEFAULT_DAYS - 1)
+    except ValueError:
+        return None, "Invalid date format (YYYY-MM-DD)"
+    if start > end:
+        return None, "start_date must be before end_date"
+    if (end - start).days + 1 > SUMMARY_MAX_DAYS:
+        return None, f"Date range too long (max {SUMMARY_MAX_DAYS} days)"
+
+    return {"period": period, "start": start, "end": end, "user_id": user_id}, None
+
+# 기간 시작일 계산 (주 : 월요일 시작)
+def _period_start(day, period):
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+# 지난 기간 여부 (더 이상 거래가 추가되지 않는 기간)
+def is_settled(filters, now=None):
+    now = now or datetime.now()
+    return filters["end"] < (now - timedelta(seconds=SUMMARY_SETTLE_SECONDS)).date()
+
+# 지난 기간 요약 캐시 (결과가 바뀌지 않으므로 만료 없이 LRU로만 제거)
+_summary_cache = OrderedDict()
+_summary_lock = threading.Lock()
+
+# 구매채널별 기간 거래 요약 조회
+@handle_errors("DB Trade Summary")
+def get_trade_summary(filters):
+    """
+    일별 요약 테이블에서 기간(day/week/month)별, 구매채널별 거래 합계 조회
+    조회 비용은 거래 건수가 아닌 일수 x 구매채널 수에 비례
+    반환 : {"period": .., "start_date": .., "end_date": .., "items": [{"period_start", "buyer_id", "total_amount", "trade_count"}]}
+    """
+    key = (filters["period"], filters["start"], filters["end"], filters["user_id"])
+    with _summary_lock:
+        if key in _summary_cache:
+            _summary_cache.move_to_end(key)
+            return _summary_cache[key], None, 200
+
+    with db_transaction() as (_, cursor):
+        sql = """
+            SELECT date, buyer_id, total_amount, trade_count
+            FROM trade_daily_summary
+            WHERE date >= %s AND date <= %s
+        """
+        params = [filters["start"], filters["end"]]
+        if filters["user_id"] is not None:
+            sql += " AND buyer_id = %s"
+            params.append(filters["user_id"])
+        sql += " ORDER BY date, buyer_id"
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    # 기간별로 합산 (기간 시작일은 조회 시작일 이전일 수 있으나 합계는 조회 범위 내 거래만 포함)
+    totals = {}
+    for row in rows:
+        group = (_period_start(row["date"], filters["period"]), row["buyer_id"])
+        total = totals.setdefault(group, {"total_amount": 0.0, "trade_count": 0})
+        total["total_amount"] += row["total_amount"]
+        total["trade_count"] += row["trade_count"]
+
+    result = {
+        "period": filters["period"],
+        "start_date": filters["start"].isoformat(),
+        "end_date": filters["end"].isoformat(),
+        "items": [
+            {
+                "period_start": period_start.isoformat(),
+                "buyer_id": buyer_id,
+                "total_amount": round(total["total_amount"], 3),
+                "trade_count": total["trade_count"]
+            }
+            for (period_start, buyer_id), total in sorted(totals.items())
+        ]
+    }
+
+    if is_settled(filters):
+        with _summary_lock:
+            _summary_cache[key] = result
+            if len(_summary_cache) > SUMMARY_CACHE_SIZE:
+                _summary_cache.popitem(last=False)
+
+    logger.debug("거래 요약 조회 : 조회 성공")
+    return result, None, 200
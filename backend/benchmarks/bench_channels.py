@@ -0,0 +1,82 @@
+# 최적 채널 조합 탐색 벤치마크 (기존 전체 조합 탐색 vs 비트셋 DP / 분기 한정법)
+#
+# 실행 : cd backend && python benchmarks/bench_channels.py [--max-old 20] [--repeat 5] [--weighted]
+# --weighted : 채널별 가중치를 주고 분기 한정법 경로만 측정 (기존 구현은 가중치 미지원)
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from itertools import combinations
+from pathlib import Path
+
+# backend/api 경로 추가 (app 패키지 임포트용)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from app.services.channels_service import _solve_optimal_channels, EPS
+
+# 기존 구현 (모든 조합 생성 후 최대값 선택)
+def exhaustive_combination(channel_config, available_power):
+    channels = list(channel_config)
+    best = None
+    for i in range(1, len(channels) + 1):
+        for combi in combinations(channels, i):
+            total_power = sum(channel_config[ch] for ch in combi)
+            if total_power <= available_power:
+                key = (len(combi), total_power)
+                if best is None or key > best[0]:
+                    best = (key, list(combi))
+    return best[1] if best else []
+
+# 테스트용 채널 설정 생성
+def make_case(n, rng):
+    channel_config = {f"CH{i:02d}": round(rng.uniform(0.3, 2.0), 2) for i in range(n)}
+    available_power = sum(channel_config.values()) * rng.uniform(0.2, 0.6)
+    return channel_config, available_power
+
+# 실행 시간 측정 (중앙값, 초)
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+def main():
+    parser = argparse.ArgumentParser(description="최적 채널 조합 탐색 벤치마크")
+    parser.add_argument("--min-n", type=int, default=4, help="최소 채널 수")
+    parser.add_argument("--max-n", type=int, default=30, help="최대 채널 수")
+    parser.add_argument("--max-old", type=int, default=20, help="기존 구현을 실행할 최대 채널 수 (2^n 조합)")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 측정 횟수")
+    parser.add_argument("--seed", type=int, default=42, help="난수 시드")
+    parser.add_argument("--weighted", action="store_true", help="채널별 가중치 사용")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    print(f"{'n':>3} | {'old (ms)':>12} | {'new (ms)':>10} | {'speedup':>9} | result")
+    print("-" * 55)
+    for n in range(args.min_n, args.max_n + 1):
+        channel_config, available_power = make_case(n, rng)
+
+        channel_weights = None
+        if args.weighted:
+            channel_weights = {ch: rng.choice([0.5, 1.0, 1.5, 2.0]) for ch in channel_config}
+
+        new_time, new_result = measure(lambda: _solve_optimal_channels(channel_config, available_power, channel_weights), args.repeat)
+
+        if n <= args.max_old and not args.weighted:
+            old_time, old_result = measure(lambda: exhaustive_combination(channel_config, available_power), 1)
+            # 채널 수와 소비 전력 합이 같으면 동일한 최적해로 판단
+            same = (
+                len(old_result) == len(new_result)
+                and abs(sum(channel_config[ch] for ch in old_result) - sum(channel_config[ch] for ch in new_result)) <= EPS
+            )
+            print(f"{n:>3} | {old_time * 1000:>12.3f} | {new_time * 1000:>10.3f} | {old_time / new_time:>8.1f}x | {'OK' if same else 'MISMATCH'}")
+        else:
+            print(f"{n:>3} | {'skipped':>12} | {new_time * 1000:>10.3f} | {'-':>9} | {len(new_result)} ch")
+
+if __name__ == "__main__":
+    main()
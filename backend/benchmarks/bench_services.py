@@ -0,0 +1,231 @@
+# 서비스 계층 주요 경로 벤치마크 (임시 SQLite 저장소 사용, MySQL 불필요)
+#
+# 실행 : cd backend && python benchmarks/bench_services.py [--only relay] [--threshold 0.5]
+# 기준값 저장 : python benchmarks/bench_services.py --save-baseline
+#
+# 경로별 ops/s, p50, p99 를 출력하고 benchmarks/baselines.json 의 p50 과 비교
+# p50 이 기준값보다 threshold 이상 느려진 경로가 있으면 종료 코드 1 반환
+# 기준값은 실행 환경마다 다르므로 같은 머신에서 저장한 값과 비교
+# 지연 예산 (LATENCY_BUDGETS) : 같은 실행에서 측정한 기준 경로 p50 의 배수를 넘으면 종료 코드 1 반환
+
+import argparse
+import json
+import logging
+import random
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# backend/api 경로 추가 (app 패키지 임포트용)
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "api"))
+
+BASELINE_PATH = BENCH_DIR / "baselines.json"
+ML_CONFIG_PATH = BENCH_DIR.parent.parent / "ml" / "config.json"
+
+# 지연 예산 : 경로 -> (기준 경로, 허용 배수) - p50 비교
+LATENCY_BUDGETS = {
+    "energy.predict_interval": ("energy.predict_solar_generation", 2.0)
+}
+
+# 임시 SQLite 저장소 사용 (app 임포트 전에 호출)
+def use_local_sqlite(path=None):
+    """
+    DB_BACKEND=sqlite 로 설정해 MySQL 서버 없이 실행
+    원본 보관소(ARCHIVE_DIR), 재학습 모델(RETRAIN_DIR)도 같은 임시 디렉토리 사용 (앱 데이터 디렉토리 변경 없음)
+    반환 : DB 파일 경로
+    """
+    if path is None:
+        path = str(Path(tempfile.mkdtemp(prefix="ess-bench-")) / "bench.db")
+    if "app" in sys.modules:
+        raise RuntimeError("use_local_sqlite() must be called before importing app")
+    data_dir = Path(path).parent
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = path
+    os.environ["ARCHIVE_DIR"] = str(data_dir / "archive")
+    os.environ["RETRAIN_DIR"] = str(data_dir / "retrained")
+    return path
+
+# 측정 (호출별 소요 시간 기록)
+def measure(op, iterations, warmup, setup=None):
+    """
+    setup : 호출 전마다 실행할 준비 함수 (측정 시간에서 제외)
+    반환 : {"iterations", "ops_per_sec", "p50_ms", "p99_ms"}
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        op()
+
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        op()
+        samples.append(time.perf_counter() - start)
+
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / sum(samples),
+        "p50_ms": statistics.median(samples) * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+    }
+
+# 예측 벤치마크용 모델 (ml/config.json 하이퍼파라미터 + 합성 데이터)
+def build_model(seed):
+    from sklearn.ensemble import RandomForestRegressor
+    from app.services.forest_service import CompactForest
+
+    with open(ML_CONFIG_PATH) as f:
+        config = json.load(f)
+
+    rng = np.random.default_rng(seed)
+    n = 5000
+    X = np.column_stack([
+        np.full(n, 2024), rng.integers(1, 13, n), rng.integers(1, 29, n), rng.integers(6, 16, n),
+        rng.uniform(0, 3000, n), rng.uniform(0, 3000, n), rng.uniform(0, 3000, n), rng.uniform(0, 4, n)
+    ])
+    y = np.column_stack([X[:, 4] * 0.9, X[:, 4] * 0.7, X[:, 4] * 0.5]) + rng.normal(0, 50, (n, 3))
+    model = RandomForestRegressor(random_state=seed, n_jobs=1, **config).fit(X, y)
+    return CompactForest.from_model(model)
+
+# 벤치마크 목록 생성
+def build_cases(seed):
+    from app.services import energy_service
+    from app.services.channels_service import get_optimal_combination, get_available_channels
+    from app.services.energy_service import predict_solar_generation
+    from app.services.relay_service import apply_relay_update
+    from app.services.sensor_service import save_sensor_data, aggregate_old_data
+    from app.db import get_connection, close_connection
+
+    rng = random.Random(seed)
+
+    # 모델 로드 대신 합성 모델 사용
+    model = build_model(seed)
+    energy_service.set_model(model, "synthetic")
+
+    # 집계 대상 원본 데이터 (2일 전 6시간, 10초 간격)
+    def seed_old_rows():
+        base = (datetime.now() - timedelta(days=2)).replace(minute=0, second=0, microsecond=0)
+        rows = [
+            (rng.uniform(20, 100), rng.uniform(0, 5), rng.randint(0, 60000), base + timedelta(seconds=10 * i))
+            for i in range(6 * 360)
+        ]
+        conn, cursor = get_connection()
+        cursor.executemany("INSERT INTO sun_data_realtime (soc, solar_w, lux, timestamp) VALUES (%s, %s, %s, %s)", rows)
+        conn.commit()
+        close_connection(conn, cursor)
+
+    # 릴레이 상태 번갈아 변경 (OFF -> ON 거래 발생 포함)
+    relay_states = [
+        {"A": True, "B": False, "C": True, "D": False},
+        {"A": False, "B": True, "C": False, "D": True}
+    ]
+    relay_index = [0]
+    def relay_update():
+        relay_index[0] ^= 1
+        apply_relay_update(relay_states[relay_index[0]])
+
+    def predict(quantiles=None):
+        predict_solar_generation({
+            "year": 2024, "month": 6, "day": 15, "time": 11,
+            "generation": 1800.0, "lux": 42000,
+            "prev_generation": 1500.0, "yesterday_generation": 1700.0
+        }, quantiles)
+
+    return {
+        "channels.get_optimal_combination": dict(
+            op=lambda: get_optimal_combination(battery=rng.uniform(20, 100), power=rng.uniform(0, 5)),
+            iterations=2000, warmup=50
+        ),
+        "channels.get_available_channels": dict(
+            op=lambda: get_available_channels(battery=rng.uniform(20, 100), power=rng.uniform(0, 5), selected_channels=["A"]),
+            iterations=2000, warmup=50
+        ),
+        "energy.predict_solar_generation": dict(op=predict, iterations=500, warmup=20),
+        "energy.predict_interval": dict(
+            op=lambda: predict(energy_service.FORECAST_QUANTILES), iterations=500, warmup=20
+        ),
+        "sensor.save_sensor_data": dict(
+            op=lambda: save_sensor_data(rng.uniform(20, 100), rng.uniform(0, 5), rng.randint(0, 60000)),
+            iterations=500, warmup=20
+        ),
+        "sensor.aggregate_old_data": dict(op=aggregate_old_data, setup=seed_old_rows, iterations=5, warmup=1),
+        "relay.apply_relay_update": dict(op=relay_update, iterations=500, warmup=20)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="서비스 계층 벤치마크")
+    parser.add_argument("--only", help="이름에 이 문자열이 포함된 경로만 실행")
+    parser.add_argument("--threshold", type=float, default=0.5, help="허용 성능 저하 비율 (p50 기준, 0.5 = 50%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="측정 결과를 기준값으로 저장")
+    parser.add_argument("--seed", type=int, default=42, help="난수 시드")
+    args = parser.parse_args()
+
+    # 서비스 로그는 오류만 출력
+    logging.basicConfig(level=logging.ERROR)
+
+    db_path = use_local_sqlite()
+    print(f"SQLite 저장소 : {db_path}\n")
+
+    cases = build_cases(args.seed)
+    baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<36} | {'ops/s':>10} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'base p50':>9} | change")
+    print("-" * 95)
+    for name, case in cases.items():
+        if args.only and args.only not in name:
+            continue
+        result = measure(case["op"], case["iterations"], case["warmup"], case.get("setup"))
+        results[name] = result
+
+        baseline = baselines.get(name)
+        change = ""
+        base_p50 = "-"
+        if baseline:
+            base_p50 = f"{baseline['p50_ms']:.3f}"
+            ratio = result["p50_ms"] / baseline["p50_ms"] - 1
+            change = f"{ratio:+.1%}"
+            if ratio > args.threshold:
+                change += "  REGRESSION"
+                regressions.append(name)
+        print(f"{name:<36} | {result['ops_per_sec']:>10.1f} | {result['p50_ms']:>9.3f} | {result['p99_ms']:>9.3f} | {base_p50:>9} | {change}")
+
+    # 지연 예산 확인 (기준 경로도 측정한 경우만)
+    over_budget = []
+    for name, (reference, factor) in LATENCY_BUDGETS.items():
+        if name not in results or reference not in results:
+            continue
+        ratio = results[name]["p50_ms"] / results[reference]["p50_ms"]
+        status = "OK" if ratio <= factor else "OVER BUDGET"
+        print(f"\n지연 예산 : {name} = {reference} x {ratio:.2f} (허용 x {factor:.2f}) {status}")
+        if ratio > factor:
+            over_budget.append(name)
+
+    if args.save_baseline:
+        baselines.update({
+            name: {key: round(value, 4) for key, value in result.items()}
+            for name, result in results.items()
+        })
+        BASELINE_PATH.write_text(json.dumps(baselines, indent=4) + "\n")
+        print(f"\n기준값 저장 : {BASELINE_PATH}")
+        return 0
+
+    if regressions:
+        print(f"\n성능 저하 ({args.threshold:.0%} 초과) : {', '.join(regressions)}")
+    if over_budget:
+        print(f"\n지연 예산 초과 : {', '.join(over_budget)}")
+    return 1 if regressions or over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
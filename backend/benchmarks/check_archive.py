@@ -0,0 +1,121 @@
+# 원본 보관소 무손실 확인 (임시 SQLite 저장소 사용, MySQL 불필요)
+#
+# 실행 : cd backend && python benchmarks/check_archive.py
+#
+# 시간별 집계 후 보관소에서 읽은 행이 DB에 저장했던 행과 같은지 확인
+# - 과거 시각 데이터가 늦게 수신되어 id 순서와 시각 순서가 다른 경우 (일괄 수신 backfill)
+# - 한 part의 id 범위가 다른 part의 id 범위를 포함하는 경우
+# - 지난 날짜 part 병합, 병합 후 기존 part 삭제 전에 중단된 경우
+# - 저장 후 DB 커밋 실패로 같은 행이 겹친 part가 생긴 경우
+# 실패 시 종료 코드 1 반환
+
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "api"))
+
+from bench_services import use_local_sqlite
+
+failures = []
+
+def check(name, condition, detail=""):
+    print(f"{'OK  ' if condition else 'FAIL'} {name} {detail}")
+    if not condition:
+        failures.append(name)
+
+def insert_rows(timestamps):
+    from app.db import get_connection, close_connection
+
+    conn, cursor = get_connection()
+    cursor.executemany(
+        "INSERT INTO sun_data_realtime (soc, solar_w, lux, timestamp) VALUES (%s, %s, %s, %s)",
+        [(50.0, 1.0, 100, timestamp) for timestamp in timestamps]
+    )
+    conn.commit()
+    close_connection(conn, cursor)
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    db_path = use_local_sqlite()
+    print(f"SQLite 저장소 : {db_path}\n")
+
+    # 모든 part 병합 대상 (기본값은 하루 24 part 이상), 청크 여러 개로 나누어 집계
+    os.environ["ARCHIVE_COMPACT_MIN_PARTS"] = "2"
+    os.environ["ROLLUP_CHUNK_SIZE"] = "40"
+
+    from app.services import archive_service
+    from app.services.sensor_service import aggregate_old_data
+
+    day = (datetime.now() - timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+    hour10, hour11 = day + timedelta(hours=10), day + timedelta(hours=11)
+
+    # 10시 60행 (id 1-60) -> 11시 60행 (id 61-120) -> 10시 늦은 데이터 30행 (id 121-150)
+    insert_rows([hour10 + timedelta(seconds=10 * i) for i in range(60)])
+    insert_rows([hour11 + timedelta(seconds=10 * i) for i in range(60)])
+    insert_rows([hour10 + timedelta(seconds=10 * i + 5) for i in range(30)])
+    aggregate_old_data()
+
+    start, end = day, day + timedelta(days=1)
+    data = archive_service.read_archive(start, end)
+    check("backfill : 시간별 집계 후 전체 행 조회", len(data["timestamp"]) == 150, f"({len(data['timestamp'])} / 150)")
+    check("backfill : 시간순 정렬", bool((data["timestamp"][1:] >= data["timestamp"][:-1]).all()))
+
+    # id 범위가 겹치는 part : 10시 part (id 1-60, 121-150) 가 11시 part (id 61-120) 의 id 범위를 포함
+    day = day - timedelta(days=1)
+    hour10, hour11 = day + timedelta(hours=10), day + timedelta(hours=11)
+    rows = [{"id": i + 1, "timestamp": hour10 + timedelta(seconds=10 * i), "soc": 50.0, "solar_w": 1.0, "lux": 100} for i in range(60)]
+    rows += [{"id": i + 121, "timestamp": hour10 + timedelta(seconds=10 * i + 5), "soc": 50.0, "solar_w": 1.0, "lux": None} for i in range(30)]
+    archive_service.archive_rows(rows)
+    archive_service.archive_rows([
+        {"id": i + 61, "timestamp": hour11 + timedelta(seconds=10 * i), "soc": 50.0, "solar_w": 1.0, "lux": 100} for i in range(60)
+    ])
+    start, end = day, day + timedelta(days=1)
+    count = len(archive_service.read_archive(start, end)["timestamp"])
+    check("id 범위 겹침 : 병합 전 전체 행 조회", count == 150, f"({count} / 150)")
+
+    archive_service.compact_archive(end.date())
+    count = len(archive_service.read_archive(start, end)["timestamp"])
+    check("id 범위 겹침 : 병합 후 전체 행 조회", count == 150, f"({count} / 150)")
+
+    day_dir = archive_service.ARCHIVE_DIR / day.date().isoformat()
+    parts, _ = archive_service._list_parts(day_dir)
+    check("병합 : 지난 날짜 1개 part", len(parts) == 1, f"({len(parts)} parts)")
+
+    # 병합 후 기존 part 삭제 전 중단 : 병합 part의 sources 에 기록된 part가 남아있는 상태
+    merged = parts[0]
+    sources = sorted(archive_service._read_sources(merged))
+    leftover = day_dir / sources[0]
+    shutil.copytree(merged, leftover)
+    (leftover / archive_service.SOURCES_FILE).unlink()
+    count = len(archive_service.read_archive(start, end)["timestamp"])
+    check("중단 : 병합 part에 포함된 part 중복 조회 안 함", count == 150, f"({count} / 150)")
+
+    # 같은 행이 겹친 part (저장 후 DB 커밋 실패로 재실행) : id 1-60 만 다시 저장
+    columns = {name: archive_service._load_column(merged, name)[:] for name in archive_service.COLUMN_DTYPES}
+    overlap = columns["id"] <= 60
+    archive_service._write_part(day_dir, {name: values[overlap] for name, values in columns.items()})
+    count = len(archive_service.read_archive(start, end)["timestamp"])
+    check("겹친 part : 같은 id 1행만 조회", count == 150, f"({count} / 150)")
+
+    # 재병합 후 남은 part 정리
+    archive_service.compact_archive(end.date() + timedelta(days=1))
+    parts, covered = archive_service._list_parts(day_dir)
+    count = len(archive_service.read_archive(start, end)["timestamp"])
+    check("재병합 : 전체 행 유지", count == 150, f"({count} / 150)")
+    check("재병합 : 1개 part, 포함된 part 삭제", len(parts) == 1 and not covered, f"({len(parts)} parts, {len(covered)} covered)")
+    ids = archive_service._load_column(parts[0], "id")
+    check("재병합 : id 1-150 모두 저장", sorted(ids.tolist()) == list(range(1, 151)))
+
+    if failures:
+        print(f"\n실패 : {', '.join(failures)}")
+        return 1
+    print("\n모든 확인 통과")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
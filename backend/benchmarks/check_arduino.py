@@ -0,0 +1,214 @@
+# 아두이노 명령 전송기(ArduinoDispatcher) 동작 확인 (가상 아두이노 보드 사용, 실제 보드 불필요)
+#
+# 실행 : cd backend && python benchmarks/check_arduino.py
+#
+# http.server 로 띄운 가상 보드가 경로별로 정해진 응답(성공, 500 오류, 응답 지연, 응답 보류)을 돌려주고
+# 전송기의 재시도 횟수, 타임아웃 처리, 장치별 최종 상태, 보드가 실제로 받은 명령을 확인
+# - 첫 전송 성공
+# - 500 오류 후 재시도로 전송 성공
+# - 응답 지연(타임아웃) 후 재시도로 전송 성공
+# - 재시도 횟수 초과로 전송 포기, 보드 연결 불가
+# - 전송 중 새 명령이 쌓이면 마지막 명령만 전송
+# - 종료 시 재시도 대기 중인 명령 1회 전송
+# 실패 시 종료 코드 1 반환
+
+import json
+import logging
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "api"))
+
+from bench_services import use_local_sqlite
+
+TIMEOUT = 0.3 # 요청 1회 응답 대기 시간 (초)
+RETRY_BASE = 0.05 # 첫 재시도 대기 시간 (초)
+
+failures = []
+
+def check(name, condition, detail=""):
+    print(f"{'OK  ' if condition else 'FAIL'} {name} {detail}")
+    if not condition:
+        failures.append(name)
+
+# 가상 아두이노 보드
+class StubBoard:
+    """
+    경로별 응답 목록을 차례로 사용 (목록이 비면 200)
+    - "ok" : 200
+    - 정수 : 해당 상태 코드
+    - ("sleep", 초) : 지연 후 200 (타임아웃 확인용)
+    - ("block", Event) : Event 가 설정될 때까지 응답 보류 후 200
+    """
+    def __init__(self):
+        self.received = [] # (path, body)
+        self._actions = {}
+        self._lock = threading.Lock()
+        board = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+                with board._lock:
+                    board.received.append((self.path, body))
+                    actions = board._actions.get(self.path)
+                    action = actions.pop(0) if actions else "ok"
+                status = 200
+                if isinstance(action, int):
+                    status = action
+                elif isinstance(action, tuple) and action[0] == "sleep":
+                    time.sleep(action[1])
+                elif isinstance(action, tuple) and action[0] == "block":
+                    action[1].wait(5)
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                except OSError:
+                    pass # 타임아웃으로 전송기가 먼저 연결을 끊은 경우
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def script(self, path, actions):
+        with self._lock:
+            self._actions[path] = list(actions)
+
+    def bodies(self, path):
+        with self._lock:
+            return [body for received_path, body in self.received if received_path == path]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def wait_for_state(dispatcher, url, states, timeout=5):
+    # 장치 상태가 states 중 하나가 될 때까지 대기
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = dispatcher.stats()["devices"].get(url)
+        if status and status["state"] in states:
+            return status
+        time.sleep(0.01)
+    return dispatcher.stats()["devices"].get(url)
+
+def new_dispatcher(max_retries):
+    from app.services.arduino_service import ArduinoDispatcher
+
+    dispatcher = ArduinoDispatcher(TIMEOUT, max_retries, RETRY_BASE, 1.0)
+    dispatcher.start()
+    return dispatcher
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    use_local_sqlite()
+    board = StubBoard()
+
+    # 첫 전송 성공
+    dispatcher = new_dispatcher(max_retries=3)
+    url = board.url("/ok")
+    dispatcher.submit(url, {"channel": 1, "state": True})
+    status = wait_for_state(dispatcher, url, ("delivered", "failed"))
+    check("성공 : delivered", status["state"] == "delivered", f"({status['state']})")
+    check("성공 : 1회 전송, 재시도 없음", status["attempts"] == 1 and dispatcher.stats()["retries"] == 0, f"({status['attempts']}회)")
+    check("성공 : 보드가 받은 명령", board.bodies("/ok") == [{"channel": 1, "state": True}])
+
+    # 500 오류 2회 후 성공
+    url = board.url("/error")
+    board.script("/error", [500, 500])
+    dispatcher.submit(url, {"channel": 2, "state": True})
+    status = wait_for_state(dispatcher, url, ("delivered", "failed"))
+    check("500 오류 : 재시도 후 delivered", status["state"] == "delivered" and status["last_error"] is None, f"({status['state']})")
+    check("500 오류 : 3회 전송", status["attempts"] == 3 and len(board.bodies("/error")) == 3, f"({status['attempts']}회)")
+    check("500 오류 : 재시도 2회 집계", dispatcher.stats()["retries"] == 2, f"({dispatcher.stats()['retries']})")
+
+    # 응답 지연 (타임아웃) 후 성공
+    url = board.url("/slow")
+    board.script("/slow", [("sleep", TIMEOUT * 3)])
+    start = time.monotonic()
+    dispatcher.submit(url, {"channel": 3, "state": False})
+    status = wait_for_state(dispatcher, url, ("retrying", "failed"))
+    check("타임아웃 : 재시도 대기", status["state"] == "retrying" and status["last_error"] == "timeout", f"({status['state']}, {status['last_error']})")
+    status = wait_for_state(dispatcher, url, ("delivered", "failed"))
+    elapsed = time.monotonic() - start
+    check("타임아웃 : 재시도 후 delivered", status["state"] == "delivered" and status["attempts"] == 2, f"({status['state']}, {status['attempts']}회)")
+    check("타임아웃 : 응답 대기 시간 제한", elapsed < TIMEOUT * 3, f"({elapsed:.2f}s)")
+    dispatcher.close()
+
+    # 재시도 횟수 초과 (max_retries=2 : 최초 1회 + 재시도 2회)
+    dispatcher = new_dispatcher(max_retries=2)
+    url = board.url("/broken")
+    board.script("/broken", [500] * 10)
+    dispatcher.submit(url, {"channel": 4, "state": True})
+    status = wait_for_state(dispatcher, url, ("delivered", "failed"))
+    stats = dispatcher.stats()
+    check("재시도 초과 : failed", status["state"] == "failed", f"({status['state']})")
+    check("재시도 초과 : 3회 전송 후 포기", status["attempts"] == 3 and len(board.bodies("/broken")) == 3, f"({len(board.bodies('/broken'))}회)")
+    check("재시도 초과 : 실패 1건, 재시도 2회 집계", stats["failed"] == 1 and stats["retries"] == 2, f"({stats['failed']}, {stats['retries']})")
+    check("재시도 초과 : 마지막 오류 기록", status["last_error"] == "response error (status: 500)", f"({status['last_error']})")
+
+    # 보드 연결 불가 (닫힌 포트)
+    closed = ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    url = f"http://127.0.0.1:{closed.server_port}/relay"
+    closed.server_close()
+    dispatcher.submit(url, {"channel": 5, "state": True})
+    status = wait_for_state(dispatcher, url, ("delivered", "failed"))
+    check("연결 불가 : failed", status["state"] == "failed" and status["last_error"] == "connection failed", f"({status['state']}, {status['last_error']})")
+    dispatcher.close()
+
+    # 전송 중 새 명령 : 보류된 첫 명령 전송 중에 3개 접수 -> 마지막 명령만 전송
+    dispatcher = new_dispatcher(max_retries=2)
+    url = board.url("/coalesce")
+    release = threading.Event()
+    board.script("/coalesce", [("block", release)])
+    dispatcher.submit(url, {"seq": 1})
+    while not board.bodies("/coalesce"):
+        time.sleep(0.01)
+    for seq in (2, 3, 4):
+        dispatcher.submit(url, {"seq": seq})
+    release.set()
+    status = wait_for_state(dispatcher, url, ("delivered", "failed"))
+    time.sleep(0.1)
+    stats = dispatcher.stats()
+    check("명령 교체 : 첫 명령과 마지막 명령만 전송", board.bodies("/coalesce") == [{"seq": 1}, {"seq": 4}], f"({board.bodies('/coalesce')})")
+    check("명령 교체 : 교체 2건 집계, 마지막 명령 delivered", stats["coalesced"] == 2 and status["delivered_seq"] == status["submitted_seq"], f"({stats['coalesced']})")
+    dispatcher.close()
+
+    # 종료 : 재시도 대기 중인 명령은 백오프 무시하고 1회 전송 후 종료
+    from app.services.arduino_service import ArduinoDispatcher
+
+    dispatcher = ArduinoDispatcher(TIMEOUT, 5, 10.0, 10.0)
+    dispatcher.start()
+    url = board.url("/close")
+    board.script("/close", [500])
+    dispatcher.submit(url, {"channel": 6, "state": True})
+    wait_for_state(dispatcher, url, ("retrying",))
+    start = time.monotonic()
+    dispatcher.close()
+    elapsed = time.monotonic() - start
+    status = dispatcher.stats()["devices"][url]
+    check("종료 : 재시도 대기 명령 전송", status["state"] == "delivered" and len(board.bodies("/close")) == 2, f"({status['state']})")
+    check("종료 : 백오프 대기 없이 종료", elapsed < 2, f"({elapsed:.2f}s)")
+    ok, message, code = dispatcher.submit(url, {"channel": 6, "state": False})
+    check("종료 : 이후 명령 거부 (503)", not ok and code == 503, f"({code})")
+
+    board.close()
+    if failures:
+        print(f"\n실패 : {', '.join(failures)}")
+        return 1
+    print("\n모든 확인 통과")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
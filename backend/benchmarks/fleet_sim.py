@@ -0,0 +1,343 @@
+# 가상 ESS 보드 + 대시보드 부하 시뮬레이터 (하드웨어 규모 산정용)
+#
+# 실행 : cd backend && python benchmarks/fleet_sim.py --boards 50 --dashboards 20 --duration 60
+# 외부 서버 대상 : python benchmarks/fleet_sim.py --url http://localhost:5000 ...
+#
+# --url 이 없으면 앱을 같은 프로세스에서 임시 SQLite 저장소(DB_BACKEND=sqlite)로 실행
+# 보드 : 일사량 곡선(일출~일몰 사인 곡선 + 구름 변동)으로 /api/data/solar 전송, /api/relay/control 폴링
+# 대시보드 : 조회 API(최신 데이터, 릴레이 상태, 선택 가능 채널, 최적 조합, 예측) 폴링
+#            첫 번째 대시보드는 주기적으로 릴레이 변경(/api/relay/update)
+# 엔드포인트별 처리량, 오류율, 지연 시간(p50/p95/p99/max) 출력
+# 전체 오류율이 --max-error-rate 를 넘으면 종료 코드 1 반환
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import requests
+
+# backend/api 경로 추가 (app 패키지 임포트용)
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "api"))
+sys.path.insert(0, str(BENCH_DIR))
+
+# 일사량 곡선 (시뮬레이션 시각 기준)
+SUNRISE_HOUR = 6
+SUNSET_HOUR = 19
+PEAK_SOLAR_W = 5.0
+PEAK_LUX = 60000
+
+# 엔드포인트별 요청 결과 기록
+class FleetStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._not_modified = defaultdict(int)
+
+    def record(self, name, seconds, status):
+        """
+        status : HTTP 상태 코드 (연결 실패/타임아웃은 None)
+        2xx, 304 외에는 오류로 집계
+        """
+        with self._lock:
+            self._latencies[name].append(seconds)
+            if status == 304:
+                self._not_modified[name] += 1
+            elif status is None or not 200 <= status < 300:
+                self._errors[name] += 1
+
+    def report(self, elapsed):
+        """
+        반환 : {엔드포인트: {"requests", "rps", "errors", "error_rate", "not_modified", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}
+        """
+        with self._lock:
+            latencies = {name: sorted(values) for name, values in self._latencies.items()}
+            errors = dict(self._errors)
+            not_modified = dict(self._not_modified)
+
+        all_samples = sorted(value for values in latencies.values() for value in values)
+        latencies["total"] = all_samples
+        errors["total"] = sum(errors.values())
+        not_modified["total"] = sum(not_modified.values())
+
+        result = {}
+        for name, samples in latencies.items():
+            if not samples:
+                continue
+            count = len(samples)
+            result[name] = {
+                "requests": count,
+                "rps": count / elapsed,
+                "errors": errors.get(name, 0),
+                "error_rate": errors.get(name, 0) / count,
+                "not_modified": not_modified.get(name, 0),
+                "p50_ms": statistics.median(samples) * 1000,
+                "p95_ms": samples[min(count - 1, int(count * 0.95))] * 1000,
+                "p99_ms": samples[min(count - 1, int(count * 0.99))] * 1000,
+                "max_ms": samples[-1] * 1000
+            }
+        return result
+
+# 시뮬레이션 시계 (실제 1초 = speed 초)
+class SimClock:
+    def __init__(self, start_hour, speed):
+        self._wall_start = time.monotonic()
+        self._start_hours = start_hour
+        self._speed = speed
+
+    def hour(self):
+        """
+        반환 : 시뮬레이션 시각 (0 ~ 24, 소수)
+        """
+        elapsed_hours = (time.monotonic() - self._wall_start) * self._speed / 3600
+        return (self._start_hours + elapsed_hours) % 24
+
+# 가상 보드 센서값 (보드마다 패널 용량, 구름 변동, 배터리 잔량이 다름)
+class BoardState:
+    def __init__(self, rng):
+        self._rng = rng
+        self.capacity = rng.uniform(0.8, 1.2)
+        self.cloud = 1.0
+        self.soc = rng.uniform(40, 90)
+
+    def reading(self, hour):
+        # 구름 변동 (0.3 ~ 1.0 사이 랜덤 워크)
+        self.cloud = min(1.0, max(0.3, self.cloud + self._rng.gauss(0, 0.05)))
+
+        daylight = 0.0
+        if SUNRISE_HOUR < hour < SUNSET_HOUR:
+            daylight = math.sin(math.pi * (hour - SUNRISE_HOUR) / (SUNSET_HOUR - SUNRISE_HOUR))
+        solar_w = PEAK_SOLAR_W * self.capacity * daylight * self.cloud
+        lux = int(PEAK_LUX * daylight * self.cloud)
+
+        # 발전량만큼 충전, 부하만큼 방전
+        self.soc = min(100.0, max(20.0, self.soc + (solar_w - 1.5) * 0.05))
+        return {"soc": round(self.soc, 1), "solar_w": round(solar_w, 3), "lux": lux}
+
+# 요청 실행 및 결과 기록
+def timed_request(session, stats, name, method, url, timeout, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = session.request(method, url, timeout=timeout, **kwargs)
+        stats.record(name, time.perf_counter() - start, response.status_code)
+        return response
+    except requests.RequestException:
+        stats.record(name, time.perf_counter() - start, None)
+        return None
+
+# 가상 보드 (센서 전송 + 릴레이 제어 폴링)
+def run_board(index, args, stats, clock, stop, seed):
+    rng = random.Random(seed + index)
+    state = BoardState(rng)
+    session = requests.Session()
+    etag = None
+
+    # 보드마다 전송 시점 분산
+    now = time.monotonic()
+    next_post = now + rng.uniform(0, args.post_interval)
+    next_poll = now + rng.uniform(0, args.poll_interval)
+
+    while not stop.is_set():
+        now = time.monotonic()
+        if now >= next_post:
+            timed_request(
+                session, stats, "POST /api/data/solar", "POST", f"{args.url}/api/data/solar",
+                args.timeout, json=state.reading(clock.hour())
+            )
+            next_post += args.post_interval
+        if now >= next_poll:
+            # 조건부 요청 보드 (ETag 사용, 첫 요청은 빈 값) / 기존 보드 (매번 전체 응답)
+            headers = {"If-None-Match": etag or '""'} if args.conditional else {}
+            response = timed_request(
+                session, stats, "GET /api/relay/control", "GET", f"{args.url}/api/relay/control",
+                args.timeout, headers=headers
+            )
+            if response is not None and response.status_code == 200:
+                etag = response.headers.get("ETag", etag)
+            next_poll += args.poll_interval
+        stop.wait(max(0.0, min(next_post, next_poll) - time.monotonic()))
+    session.close()
+
+# 가상 대시보드 (조회 API 폴링, 0번 대시보드는 릴레이 변경 포함)
+def run_dashboard(index, args, stats, stop, seed):
+    rng = random.Random(seed + 100000 + index)
+    session = requests.Session()
+    etags = {}
+    reads = [
+        ("GET /api/data/latest", "/api/data/latest"),
+        ("GET /api/relay/status", "/api/relay/status"),
+        ("GET /api/channels/available", "/api/channels/available"),
+        ("GET /api/channels/optimal", "/api/channels/optimal"),
+        ("GET /api/energy/predicted", "/api/energy/predicted")
+    ]
+
+    now = time.monotonic()
+    next_read = now + rng.uniform(0, args.dashboard_interval)
+    next_toggle = now + args.relay_toggle_interval
+
+    while not stop.is_set():
+        now = time.monotonic()
+        if now >= next_read:
+            for name, path in reads:
+                headers = {"If-None-Match": etags[path]} if path in etags else {}
+                response = timed_request(session, stats, name, "GET", f"{args.url}{path}", args.timeout, headers=headers)
+                if response is not None and response.status_code == 200 and "ETag" in response.headers:
+                    etags[path] = response.headers["ETag"]
+            next_read += args.dashboard_interval
+        if index == 0 and args.relay_toggle_interval > 0 and now >= next_toggle:
+            relays = {channel: rng.random() < 0.5 for channel in "ABCD"}
+            timed_request(session, stats, "POST /api/relay/update", "POST", f"{args.url}/api/relay/update", args.timeout, json=relays)
+            next_toggle += args.relay_toggle_interval
+
+        wake = next_read
+        if index == 0 and args.relay_toggle_interval > 0:
+            wake = min(wake, next_toggle)
+        stop.wait(max(0.0, wake - time.monotonic()))
+    session.close()
+
+# 과거 데이터 저장 (어제 시간별 집계 + 최근 2시간 원본)
+def seed_history(rng):
+    from app.db import get_connection, close_connection
+
+    now = datetime.now()
+    yesterday = (now - timedelta(days=1)).date()
+    hourly = []
+    for hour in range(24):
+        reading = BoardState(rng).reading(hour)
+        hourly.append((yesterday, hour, reading["soc"], reading["solar_w"], reading["lux"], 360))
+
+    state = BoardState(rng)
+    realtime = []
+    for i in range(12):
+        timestamp = now - timedelta(minutes=10 * (12 - i))
+        reading = state.reading(timestamp.hour + timestamp.minute / 60)
+        realtime.append((reading["soc"], reading["solar_w"], reading["lux"], timestamp))
+
+    conn, cursor = get_connection()
+    cursor.executemany(
+        "INSERT INTO sun_data_hourly (date, hour, avg_soc, avg_solar_w, avg_lux, sample_count) VALUES (%s, %s, %s, %s, %s, %s)",
+        hourly
+    )
+    cursor.executemany("INSERT INTO sun_data_realtime (soc, solar_w, lux, timestamp) VALUES (%s, %s, %s, %s)", realtime)
+    conn.commit()
+    close_connection(conn, cursor)
+
+# 로컬 앱 실행 (임시 SQLite 저장소 + 합성 모델)
+def start_local_app(seed):
+    """
+    반환 : (서버 URL, DB 파일 경로, 서버 객체)
+    """
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    from werkzeug.serving import make_server
+    from bench_services import build_model, use_local_sqlite
+
+    db_path = use_local_sqlite()
+
+    from app import create_app
+    from app.services import energy_service
+    from app.services.relay_service import reset_relay
+
+    # 모델 파일 대신 합성 모델 사용
+    model = build_model(seed)
+    energy_service.set_model(model, "synthetic")
+
+    # 예측 API 입력(1시간 전, 어제 같은 시간) 및 첫 조회용 과거 데이터
+    seed_history(random.Random(seed))
+
+    app = create_app()
+    reset_relay()
+
+    # 요청별 접근 로그 출력 안 함
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", db_path, server
+
+def print_report(report):
+    print(f"{'endpoint':<30} | {'req':>7} | {'req/s':>8} | {'err %':>6} | {'304':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 113)
+    for name, row in report.items():
+        print(
+            f"{name:<30} | {row['requests']:>7} | {row['rps']:>8.1f} | {row['error_rate']:>6.2%} | {row['not_modified']:>6} | "
+            f"{row['p50_ms']:>8.2f} | {row['p95_ms']:>8.2f} | {row['p99_ms']:>8.2f} | {row['max_ms']:>8.2f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="가상 ESS 보드 + 대시보드 부하 시뮬레이터")
+    parser.add_argument("--url", help="대상 서버 주소 (없으면 로컬 앱 + 임시 SQLite 저장소로 실행)")
+    parser.add_argument("--boards", type=int, default=10, help="가상 보드 수")
+    parser.add_argument("--dashboards", type=int, default=5, help="가상 대시보드 수")
+    parser.add_argument("--duration", type=float, default=30, help="실행 시간 (초)")
+    parser.add_argument("--post-interval", type=float, default=10, help="보드 센서 전송 주기 (초)")
+    parser.add_argument("--poll-interval", type=float, default=2, help="보드 릴레이 제어 폴링 주기 (초)")
+    parser.add_argument("--dashboard-interval", type=float, default=5, help="대시보드 조회 주기 (초)")
+    parser.add_argument("--relay-toggle-interval", type=float, default=30, help="릴레이 변경 주기 (초, 0 이면 변경 안 함)")
+    parser.add_argument("--conditional", action="store_true", help="보드 폴링에 If-None-Match 사용 (304 응답)")
+    parser.add_argument("--sim-start-hour", type=float, default=6, help="시뮬레이션 시작 시각 (시)")
+    parser.add_argument("--sim-speed", type=float, default=1440, help="시뮬레이션 배속 (1440 = 실제 1분에 하루)")
+    parser.add_argument("--timeout", type=float, default=10, help="요청 타임아웃 (초)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="허용 오류율 (초과 시 종료 코드 1)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    parser.add_argument("--seed", type=int, default=42, help="난수 시드")
+    args = parser.parse_args()
+
+    server = None
+    if not args.url:
+        args.url, db_path, server = start_local_app(args.seed)
+        print(f"로컬 앱 실행 : {args.url} (SQLite 저장소 : {db_path})")
+    args.url = args.url.rstrip("/")
+
+    stats = FleetStats()
+    stop = threading.Event()
+    clock = SimClock(args.sim_start_hour, args.sim_speed)
+    threads = [
+        threading.Thread(target=run_board, args=(i, args, stats, clock, stop, args.seed), daemon=True)
+        for i in range(args.boards)
+    ] + [
+        threading.Thread(target=run_dashboard, args=(i, args, stats, stop, args.seed), daemon=True)
+        for i in range(args.dashboards)
+    ]
+
+    print(f"보드 {args.boards}대, 대시보드 {args.dashboards}개, {args.duration:.0f}초 실행\n")
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    try:
+        stop.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for thread in threads:
+        thread.join(args.timeout + 1)
+    elapsed = time.monotonic() - start
+
+    if server is not None:
+        server.shutdown()
+
+    report = stats.report(elapsed)
+    print_report(report)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"config": vars(args), "elapsed": elapsed, "endpoints": report}, indent=4) + "\n")
+        print(f"\n결과 저장 : {args.json}")
+
+    total = report.get("total")
+    if total and total["error_rate"] > args.max_error_rate:
+        print(f"\n오류율 초과 ({total['error_rate']:.2%} > {args.max_error_rate:.2%})")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@ CREATE DATABASE IF NOT EXISTS realtime_db CHARACTER SET utf8mb4 COLLATE utf8mb4_
 
 USE realtime_db;
 
-# 테이블 생성
+# 테이블 생성 (DB_BACKEND=sqlite 는 app/db_sqlite.py 의 같은 구조 스키마를 자동 생성)
 CREATE TABLE sun_data_realtime (
     id INT PRIMARY KEY AUTO_INCREMENT,
     timestamp  datetime not null,
@@ -20,9 +20,18 @@ CREATE TABLE sun_data_hourly (
     avg_soc FLOAT,
     avg_solar_w FLOAT,
     avg_lux INT,
+    sample_count INT NOT NULL DEFAULT 0, -- 집계에 사용된 원본 행 수 (가중 평균 병합용)
     UNIQUE KEY unique_datetime (date, hour)
 );
 
+CREATE TABLE rollup_watermark (
+    job_name VARCHAR(50) PRIMARY KEY, -- 집계 작업 이름
+    watermark DATETIME, -- 이 시각 이전 데이터는 집계 완료 (첫 집계 전 NULL)
+    last_run_at DATETIME, -- 마지막 실행 시각
+    last_rows INT, -- 마지막 실행 시 처리한 행 수
+    last_duration_ms INT -- 마지막 실행 소요 시간 (ms)
+);
+
 CREATE TABLE relay_status (
     id INT PRIMARY KEY AUTO_INCREMENT,
     relay_name char(5) not null,
@@ -34,11 +43,21 @@ CREATE TABLE trade_history (
     buyer_id INT NOT NULL,  -- 구매채널 ID
     amount FLOAT NOT NULL,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_timestamp_id (timestamp, id), -- 최신순 키셋 페이지네이션
+    INDEX idx_buyer_timestamp_id (buyer_id, timestamp, id), -- 구매채널별 조회
     FOREIGN KEY (buyer_id) REFERENCES relay_status (id)
     ON DELETE CASCADE
     ON UPDATE CASCADE
 );
 
+CREATE TABLE trade_daily_summary (
+    date DATE NOT NULL,
+    buyer_id INT NOT NULL, -- 구매채널 ID
+    total_amount DOUBLE NOT NULL DEFAULT 0, -- 일별 거래 전력량 합계
+    trade_count INT NOT NULL DEFAULT 0, -- 일별 거래 건수
+    PRIMARY KEY (date, buyer_id)
+);
+
 # 초기 릴레이 상태 추가
 INSERT INTO relay_status (relay_name, status) VALUES
     ('A', 'off'),
@@ -46,15 +65,30 @@ INSERT INTO relay_status (relay_name, status) VALUES
     ('C', 'off'),
     ('D', 'off');
 
+# 기존 DB 마이그레이션
+# ALTER TABLE sun_data_hourly ADD COLUMN sample_count INT NOT NULL DEFAULT 0;
+# 기존 집계 행의 표본 수 채우기 (sample_count 추가 후 1회 실행, 10초 주기 수집 기준 시간당 360건)
+# 0 으로 두면 늦게 수신된 데이터 병합 시 기존 평균이 늦은 데이터 평균으로 대체됨
+# UPDATE sun_data_hourly SET sample_count = 360 WHERE sample_count = 0;
+# ALTER TABLE rollup_watermark MODIFY watermark DATETIME NULL;
+# ALTER TABLE trade_history ADD INDEX idx_timestamp_id (timestamp, id), ADD INDEX idx_buyer_timestamp_id (buyer_id, timestamp, id);
+# 기존 거래 내역으로 일별 요약 채우기 (trade_daily_summary 생성 후 1회 실행)
+# INSERT INTO trade_daily_summary (date, buyer_id, total_amount, trade_count)
+#     SELECT DATE(timestamp), buyer_id, SUM(amount), COUNT(*) FROM trade_history GROUP BY DATE(timestamp), buyer_id
+#     ON DUPLICATE KEY UPDATE total_amount = VALUES(total_amount), trade_count = VALUES(trade_count);
+
 # 테이블 조회
 SELECT * FROM sun_data_realtime;
 SELECT * FROM sun_data_hourly;
 SELECT * FROM relay_status;
 SELECT * FROM trade_history;
+SELECT * FROM trade_daily_summary;
+SELECT * FROM rollup_watermark;
 
 # 테이블 초기화(테스트 데이터 삭제)
 # TRUNCATE TABLE sun_data_realtime;
 # TRUNCATE TABLE sun_data_hourly;
 # TRUNCATE TABLE trade_history;
+# TRUNCATE TABLE trade_daily_summary;
 # TRUNCATE TABLE relay_status;
 # UPDATE relay_status SET status = 'off';
@@ -1,143 +1,288 @@
 # RandomForest 모델 테스트
+#
+# 학습 : python model_train_rf.py
+# 하이퍼 파라미터 탐색 : python model_train_rf.py --tune [--search random --n-iter 30] [--jobs 8]
+#   - 시계열 교차검증(rolling-origin, 과거 데이터로 학습 -> 바로 다음 구간 검증)
+#   - (파라미터 조합 x 폴드) 학습을 프로세스 풀로 모든 코어에 분산
+#   - 전처리한 X/y 행렬은 data/cache 에 저장해 다음 실행부터 재사용 (원본 CSV가 바뀌면 다시 생성)
+#   - 최고 점수 파라미터를 config.json 에 같은 형식으로 저장
 
 # 라이브러리 불러오기
 import pandas as pd
-from sklearn.model_selection import train_test_split, GridSearchCV # Train / Valid / Test 데이터 분할, 최적 파라이터 값 자동 찾기
+import numpy as np
+from sklearn.model_selection import train_test_split, TimeSeriesSplit, ParameterGrid, ParameterSampler # 데이터 분할, 파라미터 조합 생성
 from sklearn.ensemble import RandomForestRegressor # 모델 생성 / 학습
 from sklearn.metrics import root_mean_squared_error, r2_score # 예측 / 평가
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import argparse
+import hashlib
+import os
 import pickle # 모델 저장
 import json
+import time
 
-# config.json 불러오기
-with open("config.json") as f:
-    config = json.load(f)
+ML_DIR = Path(__file__).resolve().parent
+CONFIG_PATH = ML_DIR / "config.json"
+DATA_PATH = ML_DIR / "data" / "total_data.csv"
+CACHE_DIR = ML_DIR / "data" / "cache"
+MODEL_OUTPUT_PATH = ML_DIR / "data" / "model" / "rf_best_model.pkl"
+
+# config.json 키 (저장 형식 유지)
+CONFIG_KEYS = ("n_estimators", "max_depth", "min_samples_split", "min_samples_leaf")
 
-# config 데이터 가져오기
-n_estimators = config["n_estimators"] # 사용되는 트리 개수
-max_depth = config["max_depth"] # 트리의 깊이
-min_samples_split = config["min_samples_split"] # 노드 분할을 위한 샘플 수
-min_samples_leaf = config["min_samples_leaf"] # 트리 끝 노드의 최소 샘플 수
+# 탐색 범위
+PARAM_SPACE = {
+    "n_estimators": [50, 100, 200, 400], # 사용되는 트리 개수
+    "max_depth": [10, 15, 20, 30, None], # 트리의 깊이
+    "min_samples_split": [2, 5, 10], # 노드 분할을 위한 샘플 수
+    "min_samples_leaf": [1, 2, 5, 10] # 트리 끝 노드의 최소 샘플 수
+}
 
-# 데이터 불러오기
-df = pd.read_csv("data/total_data.csv")
-print("========== 데이터 로드 성공 ==========\n")
+# X/y 생성 방식이 바뀌면 올려서 기존 캐시 무효화
+FEATURE_VERSION = 1
 
-# 데이터 확인
-print("[ 원본 데이터 확인 ]\n\n")
-print(df.head())
-# df.info()
-# print(df.describe())
+# config.json 불러오기
+def load_config(path=CONFIG_PATH):
+    with open(path) as f:
+        config = json.load(f)
+    return {key: config[key] for key in CONFIG_KEYS}
+
+# config.json 저장 (기존과 같은 형식)
+def save_config(config, path=CONFIG_PATH):
+    with open(path, "w") as f:
+        json.dump({key: config[key] for key in CONFIG_KEYS}, f, indent=4)
+        f.write("\n")
 
 # Feature / Target 분리
+def build_xy(df):
+    # y를 DataFrame으로 생성
+    y = pd.DataFrame({
+        "1h": df["generation"].shift(-1),
+        "2h": df["generation"].shift(-2),
+        "3h": df["generation"].shift(-3)
+    })
+
+    # NaN 값 필터링
+    mask = df["time"] <= 15
+    return df[mask], y[mask]
+
+# 전처리한 X/y 불러오기 (캐시 사용)
+def load_xy(data_path=DATA_PATH, cache_dir=CACHE_DIR):
+    """
+    원본 CSV 경로, 크기, 수정 시각으로 캐시 키 생성
+    캐시가 있으면 CSV 읽기/전처리 없이 .npy 를 메모리 매핑으로 로드
+    반환 : (X, y, columns, cache_path)
+    """
+    stat = os.stat(data_path)
+    key = hashlib.sha1(f"{Path(data_path).resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{FEATURE_VERSION}".encode()).hexdigest()[:16]
+    cache_path = Path(cache_dir) / f"xy_{key}"
+
+    if not (cache_path / "meta.json").exists():
+        df = pd.read_csv(data_path)
+        X, y = build_xy(df)
+        tmp_path = cache_path.with_name(cache_path.name + f".tmp-{os.getpid()}")
+        tmp_path.mkdir(parents=True, exist_ok=True)
+        np.save(tmp_path / "X.npy", X.to_numpy(dtype=np.float64))
+        np.save(tmp_path / "y.npy", y.to_numpy(dtype=np.float64))
+        with open(tmp_path / "meta.json", "w") as f:
+            json.dump({"columns": list(X.columns), "data_path": str(data_path)}, f)
+        try:
+            os.rename(tmp_path, cache_path)
+        except OSError:
+            pass # 다른 프로세스가 먼저 생성함
+
+    with open(cache_path / "meta.json") as f:
+        columns = json.load(f)["columns"]
+    X = np.load(cache_path / "X.npy", mmap_mode="r")
+    y = np.load(cache_path / "y.npy", mmap_mode="r")
+    return X, y, columns, cache_path
+
+# 시계열 교차검증 폴드 (rolling-origin : 학습 구간을 늘려가며 바로 다음 구간으로 검증)
+def rolling_origin_splits(n_rows, n_splits):
+    return list(TimeSeriesSplit(n_splits=n_splits).split(np.arange(n_rows)))
+
+# 작업 프로세스 전역 데이터 (프로세스마다 캐시 파일을 메모리 매핑으로 1회 로드)
+_worker_data = {}
+
+def _init_worker(cache_path):
+    _worker_data["X"] = np.load(Path(cache_path) / "X.npy", mmap_mode="r")
+    _worker_data["y"] = np.load(Path(cache_path) / "y.npy", mmap_mode="r")
+
+# 파라미터 조합 1개 x 폴드 1개 학습 및 검증
+def _fit_fold(params, train_index, valid_index, random_state):
+    X, y = _worker_data["X"], _worker_data["y"]
+    model = RandomForestRegressor(**params, n_jobs=1, random_state=random_state)
+    model.fit(X[train_index], y[train_index])
+    y_pred = model.predict(X[valid_index])
+    return r2_score(y[valid_index], y_pred), root_mean_squared_error(y[valid_index], y_pred)
+
+# 하이퍼 파라미터 탐색
+def tune(search="grid", n_iter=30, n_splits=5, jobs=None, random_state=42, write=True, data_path=DATA_PATH):
+    """
+    Test 구간(마지막 15%)은 제외하고 Train + Valid 구간으로 시계열 교차검증
+    평균 R2 최고 조합을 config.json 에 저장 (write=False 이면 출력만)
+    반환 : (최고 파라미터, 결과 목록)
+    """
+    start = time.perf_counter()
+    X, y, columns, cache_path = load_xy(data_path)
+    n_tune = len(X) - int(np.ceil(len(X) * 0.15))
+    folds = rolling_origin_splits(n_tune, n_splits)
+    print(f"========== 데이터 로드 성공 ({time.perf_counter() - start:.2f} 초, 캐시 : {cache_path.name}) ==========\n")
+    print(f"탐색 구간 : {n_tune} 행 / 폴드 : {n_splits} (rolling-origin)")
+
+    if search == "random":
+        candidates = list(ParameterSampler(PARAM_SPACE, n_iter=n_iter, random_state=random_state))
+    else:
+        candidates = list(ParameterGrid(PARAM_SPACE))
+    jobs = jobs or os.cpu_count()
+    print(f"파라미터 조합 : {len(candidates)} 개 x 폴드 {n_splits} = {len(candidates) * n_splits} 회 학습 ({jobs} 프로세스)\n")
+
+    scores = {index: [] for index in range(len(candidates))}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(str(cache_path),)) as executor:
+        futures = {
+            executor.submit(_fit_fold, candidates[index], train_index, valid_index, random_state): index
+            for index in range(len(candidates))
+            for train_index, valid_index in folds
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            scores[futures[future]].append(future.result())
+            if done % max(1, len(futures) // 10) == 0:
+                print(f"진행 : {done} / {len(futures)} ({time.perf_counter() - start:.1f} 초)")
+
+    results = []
+    for index, fold_scores in scores.items():
+        r2_values, rmse_values = zip(*fold_scores)
+        results.append({
+            "params": candidates[index],
+            "r2_mean": float(np.mean(r2_values)),
+            "r2_std": float(np.std(r2_values)),
+            "rmse_mean": float(np.mean(rmse_values))
+        })
+    results.sort(key=lambda result: result["r2_mean"], reverse=True)
+
+    print("\n========== 탐색 결과 (상위 5개) ==========\n")
+    for result in results[:5]:
+        print(f"R2 : {result['r2_mean']:.4f} (±{result['r2_std']:.4f}) / RMSE : {result['rmse_mean']:.4f} / {result['params']}")
+
+    best = {key: results[0]["params"][key] for key in CONFIG_KEYS}
+    print(f"\n최적 파라미터 : {best}")
+    print(f"소요 시간 : {time.perf_counter() - start:.1f} 초")
+
+    if write:
+        save_config(best)
+        print(f"\n[ config 저장 완료! ] {CONFIG_PATH}")
+    return best, results
+
+# config.json 파라미터로 학습 및 평가
+def train(data_path=DATA_PATH):
+    config = load_config()
+
+    # config 데이터 가져오기
+    n_estimators = config["n_estimators"] # 사용되는 트리 개수
+    max_depth = config["max_depth"] # 트리의 깊이
+    min_samples_split = config["min_samples_split"] # 노드 분할을 위한 샘플 수
+    min_samples_leaf = config["min_samples_leaf"] # 트리 끝 노드의 최소 샘플 수
+
+    # 데이터 불러오기
+    df = pd.read_csv(data_path)
+    print("========== 데이터 로드 성공 ==========\n")
+
+    # 데이터 확인
+    print("[ 원본 데이터 확인 ]\n\n")
+    print(df.head())
+
+    X, y = build_xy(df)
+
+    print("\n[ 예측용 데이터 확인 ]\n")
+    print(X.shape)
+    print(X.columns, "\n")
+    print("[ 정답 라벨 데이터 확인 ]\n")
+    print(y.shape)
+
+    # 데이터 분할 (Train(70), Valid(15), Test(15))
+    # 시계열 데이터 = 순서 유지(shuffle=False)
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.3, shuffle=False)
+    X_valid, X_test, y_valid, y_test = train_test_split(X_temp, y_temp, test_size=0.5, shuffle=False)
+    print("\n[ 분할 데이터 확인 ]\n")
+    print("Train :", X_train.shape)
+    print("Valid :", X_valid.shape)
+    print("Test :", X_test.shape)
+
+    # 모델 생성 (모든 코어 사용)
+    model = RandomForestRegressor(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        min_samples_split=min_samples_split,
+        min_samples_leaf=min_samples_leaf,
+        n_jobs=-1,
+        random_state=42
+    )
+
+    # 학습 시작
+    model.fit(X_train, y_train)
+
+    print("\n========== 모델 생성 완료 ==========\n")
+
+    # 예측 시작
+    y_pred_train = model.predict(X_train)
+    y_pred_valid = model.predict(X_valid)
+    y_pred_test = model.predict(X_test)
+
+    # RMSE : 예측 오차 크기(낮을수록 좋음)
+    # R2 : 모델 설명력(1에 가까울수록 )
+
+    print("[ 결과 출력 ]\n")
+
+    print("========== 하이퍼 파라미터 ==========\n")
+
+    print(f"n_estimators : {n_estimators}")
+    print(f"max_depth : {max_depth}")
+    print(f"min_samples_split : {min_samples_split}")
+    print(f"min_samples_leaf : {min_samples_leaf}")
+
+    # Train 평가
+    print("\n========== Train 성능 ==========")
+    print(f"RMSE : {root_mean_squared_error(y_train, y_pred_train):.4f}")
+    print(f"R2 : {r2_score(y_train, y_pred_train):.4f}")
+
+    # Valid 평가
+    print("\n========== Valid 성능 ==========")
+    print(f"RMSE : {root_mean_squared_error(y_valid, y_pred_valid):.4f}")
+    print(f"R2 : {r2_score(y_valid, y_pred_valid):.4f}")
+
+    # Test 평가
+    print("\n========== Test 성능 ==========")
+    print(f"RMSE : {root_mean_squared_error(y_test, y_pred_test):.4f}")
+    print(f"R2 : {r2_score(y_test, y_pred_test):.4f}")
+
+    # 각 시간별 평가
+    for i, label in enumerate(["1h", "2h", "3h"]):
+        rmse = root_mean_squared_error(y_test.iloc[:, i], y_pred_test[:, i])
+        r2 = r2_score(y_test.iloc[:, i], y_pred_test[:, i])
+        print(f"\n========== [ {label} ] 시간별 성능 ==========")
+        print(f"RMSE : {rmse:.4f}")
+        print(f"R2 : {r2:.4f}")
+
+    # 모델 저장
+    MODEL_OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(MODEL_OUTPUT_PATH, "wb") as f:
+        pickle.dump(model, f)
+    print("\n[ 모델 저장 완료! ]")
+    return model
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RandomForest 발전량 예측 모델 학습")
+    parser.add_argument("--tune", action="store_true", help="하이퍼 파라미터 탐색 후 config.json 저장")
+    parser.add_argument("--search", choices=("grid", "random"), default="grid", help="탐색 방식")
+    parser.add_argument("--n-iter", type=int, default=30, help="random 탐색 시 조합 수")
+    parser.add_argument("--splits", type=int, default=5, help="시계열 교차검증 폴드 수")
+    parser.add_argument("--jobs", type=int, help="프로세스 수 (기본 : 전체 코어)")
+    parser.add_argument("--no-write", action="store_true", help="탐색 결과를 config.json 에 저장하지 않음")
+    parser.add_argument("--data", default=str(DATA_PATH), help="학습 데이터 CSV 경로")
+    args = parser.parse_args()
 
-# y를 DataFrame으로 생성
-y = pd.DataFrame({
-    "1h": df["generation"].shift(-1),
-    "2h": df["generation"].shift(-2),
-    "3h": df["generation"].shift(-3)
-})
-
-# NaN 값 필터링
-mask = df["time"] <= 15
-X = df[mask]
-y = y[mask]
-
-print("\n[ 예측용 데이터 확인 ]\n")
-print(X.shape)
-print(X.columns, "\n")
-print("[ 정답 라벨 데이터 확인 ]\n")
-print(y.shape)
-
-# 데이터 분할 (Train(70), Valid(15), Test(15))
-# 시계열 데이터 = 순서 유지(shuffle=False)
-X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.3, shuffle=False)
-X_valid, X_test, y_valid, y_test = train_test_split(X_temp, y_temp, test_size=0.5, shuffle=False)
-print("\n[ 분할 데이터 확인 ]\n")
-print("Train :", X_train.shape)
-print("Valid :", X_valid.shape)
-print("Test :", X_test.shape)
-
-# 모델 생성
-model = RandomForestRegressor(
-    n_estimators=n_estimators,
-    max_depth=max_depth,
-    min_samples_split=min_samples_split,
-    min_samples_leaf=min_samples_leaf,
-    verbose=2,
-    random_state=42
-)
-
-# 파라미터 그리드 정의
-# param_grid = {
-#     "n_estimators": n_estimators,
-#     "max_depth": max_depth,
-#     "min_samples_split": min_samples_split,
-#     "min_samples_leaf": min_samples_leaf
-# }
-
-# # 그리드 서치 생성
-# grid_search = GridSearchCV(
-#     model,
-#     param_grid,
-#     cv=5,
-#     scoring="r2",
-#     verbose=2
-# )
-
-# print("\n========== GridSearch 시작 ==========\n")
-# print("최적 파라미터 탐색 중....\n")
-
-# 학습 시작
-model.fit(X_train, y_train)
-
-# 최적 모델 가져오기
-# model = grid_search.best_estimator_
-# print(f"최적 파라미터 : {grid_search.best_params_}")
-# print(f"최고 CV 점수 : {grid_search.best_score_:.4f}")
-
-print("\n========== 모델 생성 완료 ==========\n")
-
-# 예측 시작
-y_pred_train = model.predict(X_train)
-y_pred_valid = model.predict(X_valid)
-y_pred_test = model.predict(X_test)
-
-# RMSE : 예측 오차 크기(낮을수록 좋음)
-# R2 : 모델 설명력(1에 가까울수록 )
-
-print("[ 결과 출력 ]\n")
-
-print("========== 하이퍼 파라미터 ==========\n")
-
-print(f"n_estimators : {n_estimators}")
-print(f"max_depth : {max_depth}")
-print(f"min_samples_split : {min_samples_split}")
-print(f"min_samples_leaf : {min_samples_leaf}")
-
-# Train 평가
-print("\n========== Train 성능 ==========")
-print(f"RMSE : {root_mean_squared_error(y_train, y_pred_train):.4f}")
-print(f"R2 : {r2_score(y_train, y_pred_train):.4f}")
-
-# Valid 평가
-print("\n========== Valid 성능 ==========")
-print(f"RMSE : {root_mean_squared_error(y_valid, y_pred_valid):.4f}")
-print(f"R2 : {r2_score(y_valid, y_pred_valid):.4f}")
-
-# Test 평가
-print("\n========== Test 성능 ==========")
-print(f"RMSE : {root_mean_squared_error(y_test, y_pred_test):.4f}")
-print(f"R2 : {r2_score(y_test, y_pred_test):.4f}")
-
-# 각 시간별 평가
-for i, label in enumerate(["1h", "2h", "3h"]):
-    rmse = root_mean_squared_error(y_test.iloc[:, i], y_pred_test[:, i])
-    r2 = r2_score(y_test.iloc[:, i], y_pred_test[:, i])
-    print(f"\n========== [ {label} ] 시간별 성능 ==========")
-    print(f"RMSE : {rmse:.4f}")
-    print(f"R2 : {r2:.4f}")
-
-# 모델 저장
-with open("data/model/rf_best_model.pkl", "wb") as f:
-    pickle.dump(model, f)
-print("\n[ 모델 저장 완료! ]")
\ No newline at end of file
+    if args.tune:
+        tune(args.search, args.n_iter, args.splits, args.jobs, write=not args.no_write, data_path=args.data)
+    else:
+        train(args.data)